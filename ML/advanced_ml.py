@@ -16,6 +16,62 @@ from sklearn.pipeline import Pipeline
 import joblib
 import os
 
+# Brand aliases applied after cleaning; one compiled alternation replaces the chain of str.replace calls
+BRAND_REPLACEMENTS = {
+    'starbucks': 'coffee shop',
+    'mcdonalds': 'fast food',
+    'amazon': 'online shopping',
+    'flipkart': 'online shopping',
+    'uber': 'ride sharing',
+    'ola': 'ride sharing',
+    'netflix': 'streaming service',
+    'hotstar': 'streaming service',
+    'paytm': 'digital payment',
+    'gpay': 'digital payment',
+    'phonepe': 'digital payment'
+}
+BRAND_RE = re.compile('|'.join(sorted(BRAND_REPLACEMENTS, key=len, reverse=True)))
+BRAND_TOKENS = ['coffee shop', 'fast food', 'online shopping', 'ride sharing',
+                'streaming service', 'digital payment']
+SUSPICIOUS_WORDS = ['unknown', 'suspicious', 'unauthorized', 'fake', 'fraud']
+NUMERIC_COLS = ['word_count', 'char_count', 'amount', 'amount_log',
+                'has_numbers', 'has_brand', 'has_suspicious']
+
+
+def extract_feature_frame(texts, amounts=None):
+    """Vectorized feature extraction over a whole column of descriptions.
+
+    Produces the same columns as AdvancedTransactionClassifier.extract_features, using
+    pandas string ops for cleaning and a single brand-substitution pass.
+    """
+    s = pd.Series(texts, dtype=object)
+    s = s.where(s.notna() & s.astype(bool), '').astype(str).str.lower()
+    s = s.str.replace(r'[^a-zA-Z0-9\s]', ' ', regex=True)
+    s = s.str.replace(r'\s+', ' ', regex=True).str.strip()
+    s = s.str.replace(BRAND_RE, lambda m: BRAND_REPLACEMENTS[m.group(0)], regex=True)
+
+    n = len(s)
+    if amounts is None or len(amounts) == 0:
+        amount = np.zeros(n)
+    else:
+        amount = pd.to_numeric(pd.Series(amounts), errors='coerce').fillna(0).to_numpy(dtype=float)
+    char_count = s.str.len().to_numpy()
+    # cleaned text is single-space separated, so words = spaces + 1 for non-empty text
+    word_count = s.str.count(' ').to_numpy() + (char_count > 0)
+    amount_log = np.log1p(np.where(amount > 0, amount, 0.0))
+
+    return pd.DataFrame({
+        'text_clean': s.to_numpy(),
+        'word_count': word_count,
+        'char_count': char_count,
+        'amount': amount,
+        'amount_log': amount_log,
+        'has_numbers': s.str.contains(r'\d', regex=True).to_numpy(),
+        'has_brand': s.str.contains('|'.join(BRAND_TOKENS), regex=True).to_numpy(),
+        'has_suspicious': s.str.contains('|'.join(SUSPICIOUS_WORDS), regex=True).to_numpy(),
+    })
+
+
 class AdvancedTransactionClassifier:
     def __init__(self):
         self.category_model = None
@@ -23,6 +79,7 @@ class AdvancedTransactionClassifier:
         self.vectorizer = None
         self.scaler = None
         self.label_encoder = None
+        self.serving = None
         
     def preprocess_text(self, text):
         """Advanced text preprocessing"""
@@ -39,65 +96,56 @@ class AdvancedTransactionClassifier:
         text = re.sub(r'\s+', ' ', text).strip()
         
         # Handle common abbreviations and variations
-        replacements = {
-            'starbucks': 'coffee shop',
-            'mcdonalds': 'fast food',
-            'amazon': 'online shopping',
-            'flipkart': 'online shopping',
-            'uber': 'ride sharing',
-            'ola': 'ride sharing',
-            'netflix': 'streaming service',
-            'hotstar': 'streaming service',
-            'paytm': 'digital payment',
-            'gpay': 'digital payment',
-            'phonepe': 'digital payment'
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        return text
+        return BRAND_RE.sub(lambda m: BRAND_REPLACEMENTS[m.group(0)], text)
     
     def extract_features(self, texts, amounts=None):
         """Extract advanced features from transaction data"""
-        features = []
+        return extract_feature_frame(texts, amounts).to_dict('records')
+    
+    def transform(self, feature_df):
+        """Combined TF-IDF + scaled numeric matrix for a feature frame (fitted models)"""
+        from scipy.sparse import hstack
+        text_features = self.vectorizer.transform(feature_df['text_clean'])
+        numeric_features_scaled = self.scaler.transform(feature_df[NUMERIC_COLS].values)
+        return hstack([text_features, numeric_features_scaled]).tocsr()
+    
+    def serving_models(self):
+        """(category, fraud) models used for prediction: the serving tier when built, else the ensembles"""
+        if self.serving:
+            return self.serving['category'], self.serving['fraud']
+        return self.category_model, self.fraud_model
+    
+    def build_serving_tier(self, data_path='data/training_data.csv', budget_ms=None, test_size=0.2):
+        """Train latency-bounded replacements for the ensembles (see serving_tier.py)
+
+        The fitted ensembles have seen every row of ``data_path``, so the teacher used for
+        distillation and the accuracy comparison is a clone refit on the training split only.
+        """
+        from sklearn.base import clone
+        try:
+            from .serving_tier import DEFAULT_BUDGET_MS, build_serving_tier
+        except ImportError:
+            from serving_tier import DEFAULT_BUDGET_MS, build_serving_tier
+        budget_ms = budget_ms or DEFAULT_BUDGET_MS
         
-        for i, text in enumerate(texts):
-            text_clean = self.preprocess_text(text)
-            amount = amounts[i] if amounts else 0
-            
-            # Text features
-            word_count = len(text_clean.split())
-            char_count = len(text_clean)
-            
-            # Amount features
-            amount_log = np.log1p(amount) if amount > 0 else 0
-            
-            # Pattern features
-            has_numbers = bool(re.search(r'\d', text_clean))
-            has_brand = any(brand in text_clean for brand in [
-                'coffee shop', 'fast food', 'online shopping', 'ride sharing',
-                'streaming service', 'digital payment'
-            ])
-            
-            # Suspicious patterns
-            suspicious_words = ['unknown', 'suspicious', 'unauthorized', 'fake', 'fraud']
-            has_suspicious = any(word in text_clean for word in suspicious_words)
-            
-            features.append({
-                'text_clean': text_clean,
-                'word_count': word_count,
-                'char_count': char_count,
-                'amount': amount,
-                'amount_log': amount_log,
-                'has_numbers': has_numbers,
-                'has_brand': has_brand,
-                'has_suspicious': has_suspicious
-            })
-        
-        return features
+        df = pd.read_csv(data_path)
+        X = self.transform(extract_feature_frame(df['text'], df['amount']))
+        targets = {
+            'category': (self.label_encoder.transform(df['category']), self.category_model),
+            'fraud': (df['fraud'].values, self.fraud_model),
+        }
+        serving = {'budget_ms': budget_ms}
+        report = {'budget_ms': budget_ms, 'tasks': {}}
+        for task, (y, teacher) in targets.items():
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+            teacher = clone(teacher).fit(X_train, y_train)
+            chosen, model, reports = build_serving_tier(X_train, y_train, X_test, y_test, teacher=teacher, budget_ms=budget_ms)
+            serving[task] = model
+            report['tasks'][task] = {'chosen': chosen, 'candidates': reports}
+        self.serving = serving
+        return report
     
-    def train_models(self, data_path='data/training_data.csv'):
+    def train_models(self, data_path='data/training_data.csv', serving_budget_ms=None, n_jobs=-1):
         """Train advanced ML models"""
         print("🤖 Training Advanced ML Models")
         print("=" * 40)
@@ -107,8 +155,7 @@ class AdvancedTransactionClassifier:
         print(f"Loaded {len(df)} transactions")
         
         # Extract features
-        features = self.extract_features(df['text'].tolist(), df['amount'].tolist())
-        feature_df = pd.DataFrame(features)
+        feature_df = extract_feature_frame(df['text'], df['amount'])
         
         # Prepare text vectorization
         self.vectorizer = TfidfVectorizer(
@@ -123,16 +170,14 @@ class AdvancedTransactionClassifier:
         text_features = self.vectorizer.fit_transform(feature_df['text_clean'])
         
         # Prepare numeric features
-        numeric_cols = ['word_count', 'char_count', 'amount', 'amount_log', 
-                       'has_numbers', 'has_brand', 'has_suspicious']
-        numeric_features = feature_df[numeric_cols].values
+        numeric_features = feature_df[NUMERIC_COLS].values
         
         self.scaler = StandardScaler()
         numeric_features_scaled = self.scaler.fit_transform(numeric_features)
         
-        # Combine features
+        # Combine features (CSR once, shared by both models and every CV fold)
         from scipy.sparse import hstack
-        combined_features = hstack([text_features, numeric_features_scaled])
+        combined_features = hstack([text_features, numeric_features_scaled]).tocsr()
         
         # Train Category Model
         print("\n📊 Training Category Classifier...")
@@ -148,7 +193,7 @@ class AdvancedTransactionClassifier:
         )
         
         # Cross validation
-        cv_scores = cross_val_score(self.category_model, combined_features, y_category, cv=3)
+        cv_scores = cross_val_score(self.category_model, combined_features, y_category, cv=3, n_jobs=n_jobs)
         print(f"Category CV Accuracy: {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
         
         self.category_model.fit(combined_features, y_category)
@@ -164,11 +209,18 @@ class AdvancedTransactionClassifier:
             random_state=42
         )
         
-        cv_fraud = cross_val_score(self.fraud_model, combined_features, y_fraud, cv=3)
+        cv_fraud = cross_val_score(self.fraud_model, combined_features, y_fraud, cv=3, n_jobs=n_jobs)
         print(f"Fraud CV Accuracy: {cv_fraud.mean():.3f} ± {cv_fraud.std():.3f}")
         
         self.fraud_model.fit(combined_features, y_fraud)
         
+        # Optional latency-bounded serving models distilled from / benchmarked against the ensembles
+        if serving_budget_ms:
+            print("\n⏱️ Building serving tier...")
+            report = self.build_serving_tier(data_path, budget_ms=serving_budget_ms)
+            for task, info in report['tasks'].items():
+                print(f"{task} serving model: {info['chosen']}")
+        
         # Save models
         self.save_models()
         
@@ -179,36 +231,24 @@ class AdvancedTransactionClassifier:
     
     def predict(self, text, amount=None):
         """Make advanced predictions"""
-        if not self.category_model or not self.fraud_model:
+        category_model, fraud_model = self.serving_models()
+        if not category_model or not fraud_model:
             return self.fallback_predict(text, amount)
         
         try:
             # Extract features
-            features = self.extract_features([text], [amount] if amount else [0])
-            feature_df = pd.DataFrame(features)
-            
-            # Vectorize text
-            text_features = self.vectorizer.transform(feature_df['text_clean'])
-            
-            # Scale numeric features
-            numeric_cols = ['word_count', 'char_count', 'amount', 'amount_log', 
-                           'has_numbers', 'has_brand', 'has_suspicious']
-            numeric_features = feature_df[numeric_cols].values
-            numeric_features_scaled = self.scaler.transform(numeric_features)
-            
-            # Combine features
-            from scipy.sparse import hstack
-            combined_features = hstack([text_features, numeric_features_scaled])
+            feature_df = extract_feature_frame([text], [amount] if amount else [0])
+            combined_features = self.transform(feature_df)
             
             # Category prediction
-            cat_pred = self.category_model.predict(combined_features)[0]
-            cat_proba = self.category_model.predict_proba(combined_features)[0]
+            cat_pred = category_model.predict(combined_features)[0]
+            cat_proba = category_model.predict_proba(combined_features)[0]
             category = self.label_encoder.inverse_transform([cat_pred])[0]
             confidence = np.max(cat_proba)
             
             # Fraud prediction
-            fraud_pred = self.fraud_model.predict(combined_features)[0]
-            fraud_proba = self.fraud_model.predict_proba(combined_features)[0]
+            fraud_pred = fraud_model.predict(combined_features)[0]
+            fraud_proba = fraud_model.predict_proba(combined_features)[0]
             fraud_confidence = fraud_proba[1] if len(fraud_proba) > 1 else fraud_proba[0]
             
             # Risk level
@@ -238,6 +278,40 @@ class AdvancedTransactionClassifier:
             print(f"Advanced prediction error: {e}")
             return self.fallback_predict(text, amount)
     
+    def predict_batch(self, texts, amounts=None, groups=None):
+        """Predictions for many transactions using one feature pass and one model call each
+
+        ``groups`` is an optional (first, inverse) pair from grouping identical rows: the
+        category model then scores only the ``first`` rows and every row takes its group's
+        category. Fraud is always scored per row.
+        """
+        if amounts is None:
+            amounts = [None] * len(texts)
+        category_model, fraud_model = self.serving_models()
+        if not category_model or not fraud_model:
+            return [self.fallback_predict(t, a) for t, a in zip(texts, amounts)]
+        
+        combined_features = self.transform(extract_feature_frame(texts, [a or 0 for a in amounts]))
+        first, inverse = groups if groups is not None else (np.arange(len(texts)), np.arange(len(texts)))
+        cat_proba = category_model.predict_proba(combined_features[first])
+        categories = self.label_encoder.inverse_transform(category_model.classes_[cat_proba.argmax(axis=1)])[inverse]
+        cat_conf = cat_proba.max(axis=1)[inverse]
+        fraud_pred = fraud_model.predict(combined_features)
+        fraud_proba = fraud_model.predict_proba(combined_features)
+        fraud_conf = fraud_proba[:, 1] if fraud_proba.shape[1] > 1 else fraud_proba[:, 0]
+        risk_levels = np.select([fraud_conf > 0.8, fraud_conf > 0.6, fraud_conf > 0.4],
+                                ['CRITICAL', 'HIGH', 'MEDIUM'], 'LOW')
+        
+        return [{
+            'category': categories[i],
+            'category_confidence': float(cat_conf[i]),
+            'fraud_probability': float(fraud_conf[i]),
+            'fraud_risk_level': str(risk_levels[i]),
+            'is_fraud': bool(fraud_pred[i]),
+            'amount_formatted': self.format_rupees(amounts[i]) if amounts[i] else None,
+            'model_version': 'advanced_ml'
+        } for i in range(len(texts))]
+    
     def fallback_predict(self, text, amount):
         """Fallback prediction using rules"""
         text_lower = text.lower()
@@ -290,26 +364,30 @@ class AdvancedTransactionClassifier:
         else:
             return f"₹{amount:,.0f}"
     
-    def save_models(self):
+    def save_models(self, model_dir='models'):
         """Save trained models"""
-        os.makedirs('models', exist_ok=True)
+        os.makedirs(model_dir, exist_ok=True)
         
-        joblib.dump(self.vectorizer, 'models/advanced_vectorizer.pkl')
-        joblib.dump(self.category_model, 'models/advanced_category.pkl')
-        joblib.dump(self.fraud_model, 'models/advanced_fraud.pkl')
-        joblib.dump(self.scaler, 'models/advanced_scaler.pkl')
-        joblib.dump(self.label_encoder, 'models/advanced_encoder.pkl')
+        joblib.dump(self.vectorizer, os.path.join(model_dir, 'advanced_vectorizer.pkl'))
+        joblib.dump(self.category_model, os.path.join(model_dir, 'advanced_category.pkl'))
+        joblib.dump(self.fraud_model, os.path.join(model_dir, 'advanced_fraud.pkl'))
+        joblib.dump(self.scaler, os.path.join(model_dir, 'advanced_scaler.pkl'))
+        joblib.dump(self.label_encoder, os.path.join(model_dir, 'advanced_encoder.pkl'))
+        if self.serving:
+            joblib.dump(self.serving, os.path.join(model_dir, 'advanced_serving.pkl'))
         
         print("✅ Advanced models saved successfully")
     
-    def load_models(self):
-        """Load trained models"""
+    def load_models(self, model_dir='models'):
+        """Load trained models from ``model_dir`` (relative paths resolve against the cwd)"""
         try:
-            self.vectorizer = joblib.load('models/advanced_vectorizer.pkl')
-            self.category_model = joblib.load('models/advanced_category.pkl')
-            self.fraud_model = joblib.load('models/advanced_fraud.pkl')
-            self.scaler = joblib.load('models/advanced_scaler.pkl')
-            self.label_encoder = joblib.load('models/advanced_encoder.pkl')
+            self.vectorizer = joblib.load(os.path.join(model_dir, 'advanced_vectorizer.pkl'))
+            self.category_model = joblib.load(os.path.join(model_dir, 'advanced_category.pkl'))
+            self.fraud_model = joblib.load(os.path.join(model_dir, 'advanced_fraud.pkl'))
+            self.scaler = joblib.load(os.path.join(model_dir, 'advanced_scaler.pkl'))
+            self.label_encoder = joblib.load(os.path.join(model_dir, 'advanced_encoder.pkl'))
+            if os.path.exists(os.path.join(model_dir, 'advanced_serving.pkl')):
+                self.serving = joblib.load(os.path.join(model_dir, 'advanced_serving.pkl'))
             print("✅ Advanced models loaded successfully")
             return True
         except Exception as e:
@@ -338,6 +416,12 @@ class AdvancedTransactionClassifier:
             print("-" * 40)
 
 if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("--data-path", default="data/training_data.csv")
+    p.add_argument("--serving-budget-ms", type=float, default=None, help="Also build latency-bounded serving models")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel jobs for cross-validation")
+    args = p.parse_args()
     classifier = AdvancedTransactionClassifier()
-    classifier.train_models()
+    classifier.train_models(args.data_path, serving_budget_ms=args.serving_budget_ms, n_jobs=args.n_jobs)
     print("\n🎉 Advanced ML system ready!")
\ No newline at end of file
@@ -5,6 +5,8 @@ Reads `ML/data/example_multi.csv`, calls the project's `augment_data` helper,
 and writes `ML/data/extended_multi.csv` (original kept as backup). This uses the
 same augmentation methods implemented in `ML/data_preprocessing.py` (e.g.
 typos). You can control `--n-augments` (per-row) and whether to shuffle/dedupe.
+Without `--dedupe` the output is streamed to disk chunk by chunk, so large augment
+factors do not have to fit in memory.
 
 Usage:
   python -m ML.augment_dataset --input ML/data/example_multi.csv --n-augments 2
@@ -15,9 +17,9 @@ import os
 import pandas as pd
 
 try:
-    from .data_preprocessing import augment_data
+    from .data_preprocessing import augment_data, augment_to_csv
 except Exception:
-    from ML.data_preprocessing import augment_data
+    from ML.data_preprocessing import augment_data, augment_to_csv
 
 
 def main():
@@ -27,6 +29,9 @@ def main():
     p.add_argument("--n-augments", type=int, default=2, help="Number of augmentations per row")
     p.add_argument("--methods", nargs="+", default=["typo"], help="Augmentation methods to use (see data_preprocessing)")
     p.add_argument("--dedupe", action="store_true", help="Drop duplicate texts after augmentation")
+    p.add_argument("--chunk-size", type=int, default=50000, help="Rows augmented per chunk")
+    p.add_argument("--n-jobs", type=int, default=1, help="Parallel chunk workers")
+    p.add_argument("--random-state", type=int, default=42, help="Seed; each chunk gets its own derived stream")
     args = p.parse_args()
 
     if not os.path.exists(args.input):
@@ -42,14 +47,19 @@ def main():
         df['text_clean'] = df['text'].astype(str)
 
     print(f"Loaded {len(df)} rows from {args.input}")
-    aug_df = augment_data(df, text_col='text_clean', label_col=None, n_augments=args.n_augments, methods=args.methods)
-
-    # Merge original + augmented
-    combined = pd.concat([df, aug_df], ignore_index=True)
-    if args.dedupe:
-        before = len(combined)
-        combined = combined.drop_duplicates(subset=['text_clean'])
-        print(f"Deduped {before - len(combined)} rows")
+    opts = dict(text_col='text_clean', n_augments=args.n_augments, methods=args.methods,
+                random_state=args.random_state, chunk_size=args.chunk_size, n_jobs=args.n_jobs)
+
+    if not args.dedupe:
+        written = augment_to_csv(df, args.output, **opts)
+        print(f"Wrote {written} rows to {args.output}")
+        return
+
+    # augment_data returns original + augmented rows
+    combined = augment_data(df, label_col=None, **opts)
+    before = len(combined)
+    combined = combined.drop_duplicates(subset=['text_clean'])
+    print(f"Deduped {before - len(combined)} rows")
 
     combined.to_csv(args.output, index=False)
     print(f"Wrote {len(combined)} rows to {args.output}")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Post-training compaction of a compact export (see export_compact.py).
+
+Most rows of the ``features x classes`` coefficient matrices are near zero. For every
+vectorizer this step:
+
+1. drops the features whose |coefficient| stays below ``--threshold`` for every class
+   of every model reading that vectorizer;
+2. remaps the vectorizer to the kept features. By default, ``feature_map`` is written
+   and the full vocabulary/IDF is kept, so TF-IDF norms (computed over all terms)
+   and therefore scores stay exact. With ``--drop-terms``, pruned terms are also
+   removed from a TF-IDF vocabulary. That is smaller, but rows are normalized over the
+   kept terms only;
+3. stores the weights as float32, or as int8 with one scale per class (``--dtype``).
+
+Given labelled data, it reports accuracy and agreement against the original export.
+
+Usage (from repo root):
+    python -m ML.compact_models --src ML/models/compact --out ML/models/compact_small \
+        --threshold 1e-3 --dtype int8 --data-path data/training_data.csv --text-col text --category-col category
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import numpy as np
+
+_backend = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if _backend not in sys.path:
+    sys.path.append(_backend)
+
+from models.predict import clean_text, load_compact  # noqa: E402
+
+DTYPES = ["float32", "int8", "float64"]
+
+
+def prune_mask(weights, threshold):
+    """Features to keep: any |w| >= threshold in any class of any of the given matrices."""
+    keep = np.zeros(weights[0].shape[0], dtype=bool)
+    for W in weights:
+        keep |= (np.abs(W) >= threshold).any(axis=1)
+    return keep
+
+
+def quantize(W, dtype):
+    """(stored array, per-class scale or None) for ``features x classes`` weights."""
+    if dtype == "int8":
+        scale = np.abs(W).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.clip(np.round(W / scale), -127, 127).astype(np.int8), scale.astype(np.float64)
+    return np.asarray(W, dtype=dtype), None
+
+
+def _save(out_dir, name, arr):
+    np.save(os.path.join(out_dir, name), np.ascontiguousarray(arr))
+    return name
+
+
+def _nbytes(export_dir):
+    return sum(os.path.getsize(os.path.join(export_dir, f)) for f in os.listdir(export_dir) if f.endswith(".npy"))
+
+
+def compact_export(src, out, threshold=1e-3, dtype="float32", drop_terms=False):
+    """Write a pruned/quantized copy of the export ``src`` to ``out``; returns its manifest."""
+    with open(os.path.join(src, "manifest.json")) as fh:
+        manifest = json.load(fh)
+    if "compaction" in manifest:
+        raise ValueError(f"{src} is already compacted; start from the original export")
+    os.makedirs(out, exist_ok=True)
+    weights = {name: np.load(os.path.join(src, spec["coef"])) for name, spec in manifest["models"].items()}
+    summary = {"threshold": threshold, "dtype": dtype, "drop_terms": drop_terms, "vectorizers": {}}
+
+    for vname, vspec in manifest["vectorizers"].items():
+        users = [m for m, spec in manifest["models"].items() if spec["vectorizer"] == vname]
+        keep = prune_mask([weights[m] for m in users], threshold) if users else np.ones(vspec["n_features"], bool)
+        if keep.sum() == 0:
+            keep[np.argmax(np.abs(np.vstack([weights[m].T for m in users])).max(axis=0))] = True
+        new_index = np.where(keep, np.cumsum(keep) - 1, -1).astype(np.int32)
+        for key in ("vocab", "columns", "idf"):
+            if vspec.get(key):
+                shutil.copyfile(os.path.join(src, vspec[key]), os.path.join(out, vspec[key]))
+
+        if drop_terms and vspec["kind"] == "tfidf":
+            vocab = np.load(os.path.join(src, vspec["vocab"]))
+            columns = np.load(os.path.join(src, vspec["columns"]))
+            kept_terms = keep[columns]
+            vspec["vocab"] = _save(out, vspec["vocab"], vocab[kept_terms])
+            vspec["columns"] = _save(out, vspec["columns"], new_index[columns[kept_terms]])
+            if vspec.get("idf"):
+                vspec["idf"] = _save(out, vspec["idf"], np.load(os.path.join(src, vspec["idf"]))[keep])
+            vspec["n_features"] = int(keep.sum())
+        else:
+            vspec["feature_map"] = _save(out, f"{vname}_feature_map.npy", new_index)
+            vspec["n_output"] = int(keep.sum())
+        summary["vectorizers"][vname] = {"features": int(keep.size), "kept": int(keep.sum())}
+
+        for m in users:
+            spec = manifest["models"][m]
+            stored, scale = quantize(weights[m][keep], dtype)
+            spec["coef"] = _save(out, spec["coef"], stored)
+            spec.pop("coef_scale", None)
+            if scale is not None:
+                spec["coef_scale"] = _save(out, f"{m}_coef_scale.npy", scale)
+            spec["dtype"] = dtype
+
+    for spec in manifest["models"].values():
+        shutil.copyfile(os.path.join(src, spec["intercept"]), os.path.join(out, spec["intercept"]))
+        if spec.get("numeric"):
+            shutil.copyfile(os.path.join(src, spec["numeric"]["coef"]), os.path.join(out, spec["numeric"]["coef"]))
+
+    summary["bytes_before"] = _nbytes(src)
+    manifest["compaction"] = dict(summary, created_at=datetime.utcnow().isoformat() + "Z")
+    tmp = os.path.join(out, "manifest.json.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(out, "manifest.json"))
+    return manifest
+
+
+def evaluate(original, compacted, texts, labels=None):
+    """Category-model comparison of two loaded exports on ``texts`` (already cleaned)."""
+    report = {"n": len(texts)}
+    if original["cat_model"] is None or not len(texts):
+        return report
+    p0 = original["cat_model"].predict_proba(original["vectorizer"].transform(texts))
+    p1 = compacted["cat_model"].predict_proba(compacted["vectorizer"].transform(texts))
+    classes = original["cat_model"].classes_
+    y0, y1 = classes[p0.argmax(axis=1)], classes[p1.argmax(axis=1)]
+    report.update(agreement=float(np.mean(y0 == y1)), max_proba_diff=float(np.abs(p0 - p1).max()))
+    if labels is not None:
+        labels = np.asarray(labels)
+        report.update(accuracy_before=float(np.mean(y0 == labels)), accuracy_after=float(np.mean(y1 == labels)))
+        report["accuracy_delta"] = report["accuracy_after"] - report["accuracy_before"]
+    return report
+
+
+def compact(src, out=None, threshold=1e-3, dtype="float32", drop_terms=False, texts=None, labels=None):
+    """Compact ``src`` into ``out`` (in place when ``out`` is None or equal); returns a report."""
+    out = os.path.abspath(out or src)
+    staging = out.rstrip(os.sep) + ".compacting"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = compact_export(src, staging, threshold, dtype, drop_terms)
+    report = dict(manifest["compaction"], bytes_after=_nbytes(staging))
+    if texts is not None:
+        report["evaluation"] = evaluate(load_compact(src, mmap_mode=None), load_compact(staging, mmap_mode=None),
+                                        [clean_text(t) for t in texts], labels)
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(staging, out)
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description="Prune and quantize a compact model export")
+    p.add_argument("--src", default="ML/models/compact", help="Compact export to read")
+    p.add_argument("--out", default=None, help="Output directory (default: rewrite --src in place)")
+    p.add_argument("--threshold", type=float, default=1e-3, help="Drop features with |w| below this for every class")
+    p.add_argument("--dtype", choices=DTYPES, default="float32", help="Stored weight type (int8 uses per-class scales)")
+    p.add_argument("--drop-terms", action="store_true", help="Also remove pruned terms from the TF-IDF vocabulary")
+    p.add_argument("--data-path", default=None, help="CSV used to report the accuracy delta")
+    p.add_argument("--text-col", default="text")
+    p.add_argument("--category-col", default=None)
+    args = p.parse_args()
+
+    texts = labels = None
+    if args.data_path:
+        import pandas as pd
+        df = pd.read_csv(args.data_path)
+        texts = df[args.text_col].astype(str).tolist()
+        labels = df[args.category_col].astype(str).tolist() if args.category_col else None
+    report = compact(args.src, args.out, args.threshold, args.dtype, args.drop_terms, texts, labels)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
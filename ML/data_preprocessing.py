@@ -1,5 +1,7 @@
+import os
 import re
 import unicodedata
+import warnings
 import random
 import hashlib
 from typing import List, Tuple, Optional, Dict
@@ -10,7 +12,10 @@ from thefuzz import process
 from langdetect import detect
 import nltk
 
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.neighbors import NearestNeighbors
 from imblearn.over_sampling import SMOTE
 
 try:
@@ -120,6 +125,79 @@ def _synonym_swap(text: str, synonym_map: Dict[str, List[str]], random_state: Op
     return " ".join(tokens)
 
 
+def _typo_swap_array(texts: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Swap two random characters in every string at once (same effect as _random_typo, n_swaps=1)."""
+    arr = np.asarray(texts, dtype=str)
+    n = len(arr)
+    if n == 0 or arr.dtype.itemsize == 0:
+        return arr
+    width = arr.dtype.itemsize // 4
+    codes = np.ascontiguousarray(arr).view(np.uint32).reshape(n, width).copy()
+    lens = np.char.str_len(arr)
+    i = (rng.random(n) * lens).astype(np.int64)
+    j = (rng.random(n) * lens).astype(np.int64)
+    rows = np.flatnonzero(lens >= 2)
+    ci, cj = codes[rows, i[rows]], codes[rows, j[rows]]
+    codes[rows, i[rows]] = cj
+    codes[rows, j[rows]] = ci
+    return codes.view(arr.dtype).ravel()
+
+
+def _synonym_swap_array(texts: np.ndarray, synonym_map: Dict[str, List[str]], rng: np.random.Generator) -> np.ndarray:
+    """Replace every word that has synonyms with a random choice, one compiled pass per chunk."""
+    keys = [k for k, v in synonym_map.items() if v]
+    if not keys or len(texts) == 0:
+        return np.asarray(texts, dtype=object)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(keys, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+    pick = lambda m: synonym_map[m.group(0).lower()][rng.integers(len(synonym_map[m.group(0).lower()]))]
+    return pd.Series(texts, dtype=object).str.replace(pattern, pick, regex=True).to_numpy()
+
+
+def augment_texts(
+    texts,
+    n_augments: int = 1,
+    methods: List[str] = None,
+    synonym_map: Dict[str, List[str]] = None,
+    seed=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Column-wise augmentation of a block of texts.
+
+    Returns (source_index, augmented_texts): ``n_augments`` variants per input, in input
+    order. ``seed`` may be an int or a np.random.SeedSequence; the same seed always
+    yields the same output.
+    """
+    if methods is None:
+        methods = ["typo"]
+    if synonym_map is None:
+        synonym_map = {}
+    rng = np.random.default_rng(seed)
+    base = np.asarray(texts, dtype=object).astype(str)
+    src = np.repeat(np.arange(len(base)), n_augments)
+    out = base[src].astype(object)
+    choice = rng.integers(0, len(methods), len(src))
+    for m, method in enumerate(methods):
+        sel = np.flatnonzero(choice == m)
+        if not len(sel):
+            continue
+        if method == "typo":
+            out[sel] = _typo_swap_array(out[sel], rng)
+        elif method == "synonym":
+            out[sel] = _synonym_swap_array(out[sel], synonym_map, rng)
+    return src, out
+
+
+def _augment_chunk(df: pd.DataFrame, text_col: str, n_augments: int, methods, synonym_map, seed) -> pd.DataFrame:
+    src, aug_texts = augment_texts(df[text_col].to_numpy(), n_augments, methods, synonym_map, seed)
+    aug_df = df.iloc[src].reset_index(drop=True)
+    aug_df[text_col] = aug_texts
+    return aug_df
+
+
+def _chunk_seeds(random_state: Optional[int], n_chunks: int):
+    # one independent stream per chunk, so results do not depend on n_jobs or scheduling
+    return np.random.SeedSequence(random_state).spawn(n_chunks)
+
+
 def augment_data(
     df: pd.DataFrame,
     text_col: str = "text",
@@ -128,35 +206,64 @@ def augment_data(
     methods: List[str] = None,
     synonym_map: Dict[str, List[str]] = None,
     random_state: Optional[int] = None,
+    chunk_size: int = 50000,
+    n_jobs: int = 1,
 ) -> pd.DataFrame:
     """Perform simple data augmentation on text column.
 
     Supported methods: 'typo', 'synonym'. Returns DataFrame with augmented rows appended.
+    Rows are processed column-wise in chunks (optionally in parallel with ``n_jobs``),
+    each chunk seeded from ``random_state`` so the output is reproducible.
     """
-    if methods is None:
-        methods = ["typo"]
-    if synonym_map is None:
-        synonym_map = {}
-    rng = random.Random(random_state)
-    aug_rows = []
-    for _, row in df.iterrows():
-        text = str(row.get(text_col, ""))
-        label = row.get(label_col)
-        for i in range(n_augments):
-            method = rng.choice(methods)
-            if method == "typo":
-                aug_text = _random_typo(text, n_swaps=1, random_state=rng.randint(0, 2 ** 31 - 1))
-            elif method == "synonym":
-                aug_text = _synonym_swap(text, synonym_map, random_state=rng.randint(0, 2 ** 31 - 1))
-            else:
-                aug_text = text
-            new_row = row.copy()
-            new_row[text_col] = aug_text
-            aug_rows.append(new_row)
-    if aug_rows:
-        aug_df = pd.DataFrame(aug_rows)
-        return pd.concat([df, aug_df], ignore_index=True)
-    return df
+    if n_augments <= 0 or len(df) == 0:
+        return df
+    starts = list(range(0, len(df), chunk_size))
+    seeds = _chunk_seeds(random_state, len(starts))
+    from joblib import Parallel, delayed
+    parts = Parallel(n_jobs=n_jobs)(
+        delayed(_augment_chunk)(df.iloc[s:s + chunk_size], text_col, n_augments, methods, synonym_map, seed)
+        for s, seed in zip(starts, seeds)
+    )
+    return pd.concat([df] + parts, ignore_index=True)
+
+
+def augment_to_csv(
+    df: pd.DataFrame,
+    path: str,
+    text_col: str = "text",
+    n_augments: int = 1,
+    methods: List[str] = None,
+    synonym_map: Dict[str, List[str]] = None,
+    random_state: Optional[int] = None,
+    chunk_size: int = 50000,
+    n_jobs: int = 1,
+    include_original: bool = True,
+) -> int:
+    """Stream augmentation to a CSV chunk by chunk, for augment factors too large for RAM.
+
+    Uses the same per-chunk seeding as augment_data. Returns the number of rows written.
+    """
+    from joblib import Parallel, delayed
+    starts = list(range(0, len(df), chunk_size))
+    seeds = _chunk_seeds(random_state, len(starts))
+    parts = Parallel(n_jobs=n_jobs, return_as="generator")(
+        delayed(_augment_chunk)(df.iloc[s:s + chunk_size], text_col, n_augments, methods, synonym_map, seed)
+        for s, seed in zip(starts, seeds)
+    )
+    written = 0
+    tmp = path + ".tmp"
+    header = True
+    if include_original:
+        df.to_csv(tmp, index=False)
+        written, header = len(df), False
+    for part in parts:
+        part.to_csv(tmp, mode="w" if header else "a", header=header, index=False)
+        written += len(part)
+        header = False
+    if header:
+        df.iloc[:0].to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return written
 
 
 def vectorize_texts(texts: List[str], max_features: int = 50000, ngram_range: Tuple[int, int] = (1, 2)) -> Tuple[TfidfVectorizer, np.ndarray]:
@@ -169,12 +276,87 @@ def vectorize_texts(texts: List[str], max_features: int = 50000, ngram_range: Tu
     return vec, X
 
 
-def balance_smote(X, y, random_state: int = 42):
+# Largest dense matrix (bytes) balance_smote may materialize before downgrading to svd_smote
+DENSE_BUDGET_BYTES = int(os.getenv("ML_DENSE_BUDGET_BYTES", str(2 * 1024 ** 3)))
+BALANCE_METHODS = ["none", "class_weight", "oversample", "undersample", "smote", "svd_smote"]
+
+
+def dense_nbytes(X, dtype=np.float64) -> int:
+    """Bytes X would take as a dense array."""
+    return int(X.shape[0]) * int(X.shape[1]) * np.dtype(dtype).itemsize
+
+
+def _class_targets(y, mode: str):
+    classes, counts = np.unique(y, return_counts=True)
+    target = counts.max() if mode == "over" else counts.min()
+    return classes, counts, target
+
+
+def random_oversample(X, y, random_state: int = 42):
+    """Duplicate minority rows (by index, so sparse X stays sparse) up to the majority count."""
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    classes, counts, target = _class_targets(y, "over")
+    idx = [np.arange(len(y))]
+    for c, n in zip(classes, counts):
+        if n < target:
+            idx.append(rng.choice(np.flatnonzero(y == c), target - n, replace=True))
+    idx = np.concatenate(idx)
+    return X[idx], y[idx]
+
+
+def random_undersample(X, y, random_state: int = 42):
+    """Keep a random subset of each class down to the minority count."""
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    classes, _, target = _class_targets(y, "under")
+    idx = np.sort(np.concatenate([rng.choice(np.flatnonzero(y == c), target, replace=False) for c in classes]))
+    return X[idx], y[idx]
+
+
+def svd_smote(X, y, n_components: int = 100, k_neighbors: int = 5, random_state: int = 42):
+    """SMOTE with neighbours found in a TruncatedSVD projection.
+
+    Only the projection (rows x n_components) is dense. Synthetic rows are interpolated
+    between the original sparse rows, so the output keeps X's sparse feature space.
+    """
+    y = np.asarray(y)
+    X = sparse.csr_matrix(X)
+    rng = np.random.default_rng(random_state)
+    n_components = max(1, min(n_components, X.shape[1] - 1))
+    Z = TruncatedSVD(n_components=n_components, random_state=random_state).fit_transform(X)
+    classes, counts, target = _class_targets(y, "over")
+    new_X, new_y = [X], [y]
+    for c, n in zip(classes, counts):
+        need = target - n
+        members = np.flatnonzero(y == c)
+        if need <= 0 or len(members) < 2:
+            continue
+        k = min(k_neighbors, len(members) - 1)
+        nn = NearestNeighbors(n_neighbors=k + 1).fit(Z[members])
+        neigh = nn.kneighbors(Z[members], return_distance=False)[:, 1:]
+        base = rng.integers(0, len(members), need)
+        other = neigh[base, rng.integers(0, k, need)]
+        lam = rng.random(need)
+        synth = sparse.diags(1.0 - lam) @ X[members[base]] + sparse.diags(lam) @ X[members[other]]
+        new_X.append(synth)
+        new_y.append(np.full(need, c, dtype=y.dtype))
+    return sparse.vstack(new_X).tocsr(), np.concatenate(new_y)
+
+
+def balance_smote(X, y, random_state: int = 42, budget_bytes: Optional[int] = None):
     """Apply SMOTE to balance classes. Accepts sparse or dense X. Returns X_res, y_res.
 
-    Note: SMOTE operates on dense arrays; convert if needed.
+    Note: SMOTE operates on dense arrays. When densifying X would exceed ``budget_bytes``
+    (DENSE_BUDGET_BYTES by default) it downgrades to svd_smote, which stays sparse.
     """
-    # If sparse, convert to dense (note: for large matrices this is memory-heavy)
+    budget = DENSE_BUDGET_BYTES if budget_bytes is None else budget_bytes
+    if sparse.issparse(X) and dense_nbytes(X) > budget:
+        warnings.warn(
+            f"SMOTE would densify X to {dense_nbytes(X) / 1024 ** 3:.1f} GiB (budget {budget / 1024 ** 3:.1f} GiB); using svd_smote instead."
+        )
+        return svd_smote(X, y, random_state=random_state)
+    # If sparse, convert to dense (within budget)
     try:
         if hasattr(X, "toarray"):
             X_dense = X.toarray()
@@ -187,6 +369,27 @@ def balance_smote(X, y, random_state: int = 42):
     return X_res, y_res
 
 
+def balance_classes(X, y, method: str = "none", random_state: int = 42, budget_bytes: Optional[int] = None):
+    """Balance a training set without densifying it (except 'smote', which is memory-guarded).
+
+    Returns (X_res, y_res, class_weight); class_weight is 'balanced' for the
+    'class_weight' method (pass it to the estimator) and None otherwise.
+    """
+    if method in (None, "none"):
+        return X, np.asarray(y), None
+    if method == "class_weight":
+        return X, np.asarray(y), "balanced"
+    if method == "oversample":
+        return (*random_oversample(X, y, random_state), None)
+    if method == "undersample":
+        return (*random_undersample(X, y, random_state), None)
+    if method == "smote":
+        return (*balance_smote(X, np.asarray(y), random_state=random_state, budget_bytes=budget_bytes), None)
+    if method == "svd_smote":
+        return (*svd_smote(X, y, random_state=random_state), None)
+    raise ValueError(f"Unknown balance method: {method}")
+
+
 def save_preprocessed(df: pd.DataFrame, path: str) -> None:
     """Save preprocessed DataFrame to CSV (overwrites)."""
     df.to_csv(path, index=False)
@@ -204,8 +407,15 @@ __all__ = [
     "fuzzy_standardize",
     "tokenize_multilingual",
     "augment_data",
+    "augment_texts",
+    "augment_to_csv",
     "vectorize_texts",
     "balance_smote",
+    "balance_classes",
+    "random_oversample",
+    "random_undersample",
+    "svd_smote",
+    "dense_nbytes",
     "save_preprocessed",
     "dataset_hash",
 ]
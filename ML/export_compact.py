@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Export trained artifacts to the compact, memory-mappable model format.
+
+The pickled TfidfVectorizer keeps its vocabulary as a Python dict of strings, which is
+slow to unpickle and gets copied into every worker. The compact format stores:
+
+- the vocabulary as a sorted fixed-width string table (``*_vocab.npy``) plus the column
+  of each term (``*_columns.npy``), looked up with binary search;
+- IDF weights and model coefficients as ``.npy`` arrays (coefficients transposed to
+  features x classes), all loadable with ``np.load(..., mmap_mode='r')``;
+- a ``manifest.json`` describing tokenizer settings, classes and how scores become
+  probabilities.
+
+backend/models/predict.py (load_compact / ModelPredictor) reads it back read-only.
+
+Usage (from repo root):
+    python -m ML.export_compact --model-dir ML/models --out ML/models/compact
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+FORMAT_NAME = "ghci-compact"
+FORMAT_VERSION = 1
+ANALYZER_PARAMS = ["lowercase", "strip_accents", "token_pattern", "ngram_range", "stop_words", "analyzer"]
+
+
+def _unwrap(step):
+    """The fitted object behind a FunctionTransformer(obj.transform) wrapper, or the step itself."""
+    if isinstance(step, FunctionTransformer) and hasattr(step.func, "__self__"):
+        return step.func.__self__
+    return step
+
+
+def _analyzer_spec(vec):
+    for attr in ("preprocessor", "tokenizer"):
+        if getattr(vec, attr, None) is not None:
+            raise ValueError(f"Cannot export a vectorizer with a custom {attr}")
+    if callable(vec.analyzer):
+        raise ValueError("Cannot export a vectorizer with a custom analyzer")
+    params = {k: getattr(vec, k) for k in ANALYZER_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    if params["stop_words"] is not None and not isinstance(params["stop_words"], str):
+        params["stop_words"] = sorted(params["stop_words"])
+    return params
+
+
+def _save(out_dir, name, arr):
+    np.save(os.path.join(out_dir, name), np.ascontiguousarray(arr))
+    return name
+
+
+def export_vectorizer(vec, out_dir, prefix):
+    """Write one text vectorizer; returns its manifest entry."""
+    idf = None
+    hasher = None
+    if isinstance(vec, Pipeline):
+        steps = [s for _, s in vec.steps]
+        hasher = steps[0]
+        idf = steps[1].idf_ if len(steps) > 1 else None
+        norm = steps[1].norm if len(steps) > 1 else hasher.norm
+        sublinear_tf = getattr(steps[1], "sublinear_tf", False) if len(steps) > 1 else False
+    elif isinstance(vec, HashingVectorizer):
+        hasher, norm, sublinear_tf = vec, vec.norm, False
+    elif isinstance(vec, TfidfVectorizer):
+        norm, sublinear_tf = vec.norm, vec.sublinear_tf
+        idf = vec.idf_ if vec.use_idf else None
+    else:
+        raise ValueError(f"Unsupported vectorizer: {type(vec).__name__}")
+
+    spec = {"norm": norm, "sublinear_tf": bool(sublinear_tf), "idf": None}
+    if hasher is not None:
+        spec.update({
+            "kind": "hashing",
+            "analyzer": _analyzer_spec(hasher),
+            "n_features": int(hasher.n_features),
+            "binary": bool(hasher.binary),
+            "alternate_sign": bool(hasher.alternate_sign),
+        })
+    else:
+        terms = np.array(sorted(vec.vocabulary_), dtype=str)
+        columns = np.array([vec.vocabulary_[t] for t in terms], dtype=np.int32)
+        spec.update({
+            "kind": "tfidf",
+            "analyzer": _analyzer_spec(vec),
+            "n_features": len(terms),
+            "binary": bool(vec.binary),
+            "vocab": _save(out_dir, f"{prefix}_vocab.npy", terms),
+            "columns": _save(out_dir, f"{prefix}_columns.npy", columns),
+        })
+    if idf is not None:
+        spec["idf"] = _save(out_dir, f"{prefix}_idf.npy", np.asarray(idf, dtype=np.float64))
+    return spec
+
+
+def _linear_parts(clf):
+    """(W features x classes, intercept, link) such that scores = X @ W + b."""
+    if isinstance(clf, MultinomialNB):
+        return clf.feature_log_prob_.T, clf.class_log_prior_, "softmax"
+    if isinstance(clf, (LogisticRegression, SGDClassifier)):
+        if len(clf.classes_) == 2:
+            return clf.coef_.T, clf.intercept_, "logistic"
+        multi = getattr(clf, "multi_class", "auto")
+        ovr = isinstance(clf, SGDClassifier) or multi == "ovr" or (multi != "multinomial" and clf.solver == "liblinear")
+        return clf.coef_.T, clf.intercept_, "ovr" if ovr else "softmax"
+    raise ValueError(f"Unsupported model: {type(clf).__name__}")
+
+
+def export_model(clf, out_dir, prefix, vectorizer_name, n_text, numeric=None):
+    W, b, link = _linear_parts(clf)
+    spec = {
+        "vectorizer": vectorizer_name,
+        "classes": [c.item() if hasattr(c, "item") else c for c in clf.classes_],
+        "link": link,
+        "coef": _save(out_dir, f"{prefix}_coef.npy", np.asarray(W[:n_text], dtype=np.float64)),
+        "intercept": _save(out_dir, f"{prefix}_intercept.npy", np.asarray(b, dtype=np.float64)),
+    }
+    if numeric:
+        spec["numeric"] = {
+            "columns": numeric["columns"],
+            "mean": numeric["mean"],
+            "scale": numeric["scale"],
+            "coef": _save(out_dir, f"{prefix}_num_coef.npy", np.asarray(W[n_text:], dtype=np.float64)),
+        }
+    return spec
+
+
+def _fingerprint(spec, out_dir):
+    h = hashlib.sha256(json.dumps({k: v for k, v in spec.items() if k not in ("vocab", "columns", "idf")}, sort_keys=True).encode())
+    for key in ("vocab", "columns", "idf"):
+        if spec.get(key):
+            h.update(np.load(os.path.join(out_dir, spec[key])).tobytes())
+    return h.hexdigest()
+
+
+def export_compact(out_dir, vectorizer=None, cat_model=None, fraud_pipeline=None, text_col="text_clean"):
+    """Write the compact format for whichever artifacts are given. Returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "vectorizers": {},
+        "models": {},
+    }
+    if vectorizer is not None and cat_model is not None:
+        manifest["vectorizers"]["text"] = export_vectorizer(vectorizer, out_dir, "text")
+        n_text = manifest["vectorizers"]["text"]["n_features"]
+        manifest["models"]["category"] = export_model(cat_model, out_dir, "category", "text", n_text)
+
+    if fraud_pipeline is not None:
+        pre = fraud_pipeline.named_steps["pre"]
+        clf = fraud_pipeline.named_steps["clf"]
+        text_vec, numeric = None, None
+        for name, trans, cols in pre.transformers_:
+            if name == "text":
+                text_vec = _unwrap(trans.steps[-1][1]) if isinstance(trans, Pipeline) else _unwrap(trans)
+                text_col = cols[0]
+            elif name == "num":
+                scaler = _unwrap(trans)
+                if not isinstance(scaler, StandardScaler):
+                    raise ValueError("Fraud numeric branch must be a StandardScaler")
+                numeric = {"columns": list(cols), "mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+        spec = export_vectorizer(text_vec, out_dir, "fraud_text")
+        vec_name = "fraud_text"
+        # the fraud pipeline usually shares the category vectorizer; keep one copy
+        if "text" in manifest["vectorizers"] and _fingerprint(spec, out_dir) == _fingerprint(manifest["vectorizers"]["text"], out_dir):
+            for key in ("vocab", "columns", "idf"):
+                if spec.get(key):
+                    os.remove(os.path.join(out_dir, spec[key]))
+            vec_name = "text"
+        else:
+            manifest["vectorizers"]["fraud_text"] = spec
+        model = export_model(clf, out_dir, "fraud", vec_name, spec["n_features"], numeric)
+        model["text_col"] = text_col
+        manifest["models"]["fraud"] = model
+
+    tmp = os.path.join(out_dir, "manifest.json.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(out_dir, "manifest.json"))
+    return manifest
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export pickled models to the compact mmap format")
+    p.add_argument("--model-dir", default="ML/models", help="Directory with vectorizer.pkl, cat_model.pkl, fraud_pipeline.pkl")
+    p.add_argument("--out", default=None, help="Output directory (default <model-dir>/compact)")
+    args = p.parse_args()
+
+    def load(name):
+        path = os.path.join(args.model_dir, name)
+        return joblib.load(path) if os.path.exists(path) else None
+
+    out = args.out or os.path.join(args.model_dir, "compact")
+    manifest = export_compact(out, load("vectorizer.pkl"), load("cat_model.pkl"), load("fraud_pipeline.pkl"))
+    print(f"Exported {sorted(manifest['models'])} to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Incremental model updates from user corrections (feedback_logs).
+
+Instead of a full retrain, every run:
+1. reads feedback rows newer than the watermark stored with the active model version;
+2. vectorizes their transaction text with the frozen serving vectorizer (the compact
+   export in the model store, so the vocabulary and IDF never change);
+3. applies a few SGD passes of the model's own log-loss (softmax, one-vs-rest or logistic,
+   as recorded in the manifest) to the category weights, with an L2 pull back towards
+   the previous weights so a handful of corrections cannot wreck the rest of the model;
+4. publishes the result as a new version (see backend/models/shared_hosting.py), which
+   serving workers hot-swap in.
+
+Only the coefficient and intercept arrays are rewritten (in the parent version's stored
+dtype, re-quantized with ML/compact_models.py); cost is proportional to the
+number of corrections, not the corpus. Categories seen only in feedback are added as new
+classes.
+
+Usage (from repo root, e.g. every few minutes from cron):
+    python -m ML.feedback_retrain --database-url sqlite:///./ghci.db --store-dir ML/models/store
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+_backend = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if _backend not in sys.path:
+    sys.path.append(_backend)
+
+from models.predict import clean_text, load_compact  # noqa: E402
+from ML.compact_models import quantize  # noqa: E402
+from models.shared_hosting import publish_version, read_current, version_dir, version_info  # noqa: E402
+
+WATERMARK_KEY = "feedback_watermark"
+
+
+def load_feedback(session, after_id=0, limit=None):
+    """(last feedback_id, texts, corrected labels) for corrections after ``after_id``.
+
+    When a transaction was corrected more than once, only the latest correction counts.
+    """
+    from sqlalchemy import func, select
+    from integration.db.models import FeedbackLog, Transaction
+
+    stmt = (
+        select(
+            FeedbackLog.feedback_id,
+            FeedbackLog.transaction_id,
+            FeedbackLog.corrected_category,
+            func.coalesce(func.nullif(Transaction.description_clean, ""), Transaction.description_raw, ""),
+        )
+        .join(Transaction, Transaction.transaction_id == FeedbackLog.transaction_id)
+        .where(FeedbackLog.feedback_id > after_id, FeedbackLog.corrected_category.isnot(None))
+        .order_by(FeedbackLog.feedback_id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = session.execute(stmt).all()
+    latest = {}
+    for fid, tid, label, text in rows:
+        latest[tid] = (clean_text(text), label)
+    last_id = rows[-1][0] if rows else after_id
+    texts = [t for t, _ in latest.values()]
+    labels = [l for _, l in latest.values()]
+    return last_id, texts, labels
+
+
+def _proba(scores, link):
+    if link == "softmax":
+        scores = scores - scores.max(axis=1, keepdims=True)
+        e = np.exp(scores)
+        return e / e.sum(axis=1, keepdims=True)
+    return 1.0 / (1.0 + np.exp(-scores))
+
+
+class IncrementalLinearUpdater:
+    """SGD on the log-loss of an exported linear model, anchored to its starting weights."""
+
+    def __init__(self, coef, intercept, classes, link, lr=0.5, alpha=1e-3, epochs=10, random_state=42):
+        self.coef = np.array(coef, dtype=np.float64)          # features x classes
+        self.intercept = np.array(intercept, dtype=np.float64)
+        self.classes = list(classes)
+        self.link = link
+        self.lr = lr
+        self.alpha = alpha
+        self.epochs = epochs
+        self.rng = np.random.default_rng(random_state)
+        self._anchor = self.coef.copy()
+
+    def add_classes(self, labels):
+        """Append zero-weight columns for unseen labels; returns how many were added."""
+        new = [l for l in dict.fromkeys(labels) if l not in self.classes]
+        if new and self.link == "logistic":
+            raise ValueError(f"Binary model cannot learn new classes: {new}")
+        if new:
+            floor = self.intercept.min() - 1.0
+            self.coef = np.hstack([self.coef, np.zeros((self.coef.shape[0], len(new)))])
+            self._anchor = np.hstack([self._anchor, np.zeros((self._anchor.shape[0], len(new)))])
+            self.intercept = np.concatenate([self.intercept, np.full(len(new), floor)])
+            self.classes.extend(new)
+        return len(new)
+
+    def _targets(self, labels):
+        idx = np.array([self.classes.index(l) for l in labels])
+        if self.link == "logistic":
+            return (idx == 1).astype(float)[:, None]
+        Y = np.zeros((len(labels), len(self.classes)))
+        Y[np.arange(len(labels)), idx] = 1.0
+        return Y
+
+    def partial_fit(self, X, labels, batch_size=64):
+        """A few shuffled mini-batch passes over (X, labels). Only touched feature rows move."""
+        self.add_classes(labels)
+        Y = self._targets(labels)
+        n = X.shape[0]
+        for _ in range(self.epochs):
+            order = self.rng.permutation(n)
+            for start in range(0, n, batch_size):
+                rows = order[start:start + batch_size]
+                Xb = X[rows]
+                grad = _proba(np.asarray(Xb @ self.coef) + self.intercept, self.link) - Y[rows]
+                cols = np.unique(Xb.indices)
+                step = self.lr / len(rows)
+                self.coef[cols] -= step * np.asarray(Xb[:, cols].T @ grad) + self.lr * self.alpha * (self.coef[cols] - self._anchor[cols])
+                self.intercept -= step * grad.sum(axis=0)
+        return self
+
+    def predict(self, X):
+        return np.asarray(self.classes)[np.argmax(np.asarray(X @ self.coef) + self.intercept, axis=1)]
+
+
+def publish_update(store_dir, parent, updater, watermark, n_feedback, version=None):
+    """Copy the parent version, overwrite the category weights and publish it as the new CURRENT."""
+    src = version_dir(store_dir, parent)
+    staging = os.path.join(store_dir, "versions", f".feedback.{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(src, staging, ignore=shutil.ignore_patterns("version.json"))
+    try:
+        with open(os.path.join(staging, "manifest.json")) as fh:
+            manifest = json.load(fh)
+        spec = manifest["models"]["category"]
+        # keep the parent's storage type (float32, or int8 with fresh per-class scales)
+        stored, scale = quantize(updater.coef, spec.get("dtype", "float64"))
+        np.save(os.path.join(staging, spec["coef"]), stored)
+        np.save(os.path.join(staging, spec["intercept"]), updater.intercept)
+        spec["classes"] = updater.classes
+        scale_file = spec.pop("coef_scale", None)
+        if scale is not None:
+            spec["coef_scale"] = scale_file or "category_coef_scale.npy"
+            np.save(os.path.join(staging, spec["coef_scale"]), scale)
+        elif scale_file:
+            os.remove(os.path.join(staging, scale_file))
+        with open(os.path.join(staging, "manifest.json"), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        return publish_version(store_dir, staging, version, metadata={
+            "parent": parent,
+            WATERMARK_KEY: int(watermark),
+            "n_feedback": n_feedback,
+            "kind": "feedback_update",
+        })
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def update_from_feedback(session, store_dir, lr=0.5, alpha=1e-3, epochs=10, min_feedback=1, limit=None, version=None):
+    """One incremental step. Returns a summary; ``published`` is the new version or None."""
+    parent = read_current(store_dir)
+    if parent is None:
+        raise FileNotFoundError(f"No published model in {store_dir}")
+    info = version_info(store_dir, parent)
+    watermark = int(info.get(WATERMARK_KEY, 0))
+    last_id, texts, labels = load_feedback(session, watermark, limit)
+    summary = {"parent": parent, "watermark": watermark, "new_watermark": last_id, "n_feedback": len(texts), "published": None}
+    if len(texts) < min_feedback:
+        return summary
+
+    loaded = load_compact(version_dir(store_dir, parent), mmap_mode=None)
+    model = loaded["cat_model"]
+    X = loaded["vectorizer"].transform(texts)
+    updater = IncrementalLinearUpdater(model.dense_coef(), model.intercept, model.classes_.tolist(), model.link,
+                                       lr=lr, alpha=alpha, epochs=epochs)
+    before = float(np.mean(updater.predict(X) == np.asarray(labels)))
+    updater.partial_fit(X, labels)
+    after = float(np.mean(updater.predict(X) == np.asarray(labels)))
+    summary.update(feedback_accuracy_before=before, feedback_accuracy_after=after,
+                   new_classes=[c for c in updater.classes if c not in model.classes_.tolist()])
+    summary["published"] = publish_update(store_dir, parent, updater, last_id, len(texts), version)
+    return summary
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fold new feedback_logs corrections into the serving model")
+    p.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./ghci.db"))
+    p.add_argument("--store-dir", default=os.getenv("MODEL_STORE_DIR", "ML/models/store"))
+    p.add_argument("--lr", type=float, default=0.5, help="SGD step size")
+    p.add_argument("--alpha", type=float, default=1e-3, help="L2 pull towards the previous weights")
+    p.add_argument("--epochs", type=int, default=10, help="Passes over the new corrections")
+    p.add_argument("--min-feedback", type=int, default=1, help="Skip publishing below this many corrections")
+    p.add_argument("--limit", type=int, default=None, help="Max feedback rows per run")
+    args = p.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        summary = update_from_feedback(session, args.store_dir, args.lr, args.alpha, args.epochs, args.min_feedback, args.limit)
+    finally:
+        session.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Streaming prediction monitoring: confidence, category mix, fraud rate and drift.
+
+Every prediction updates the aggregates in O(1). An aggregate holds a fixed-bin confidence
+histogram, category and source counters and fraud counters. There is one aggregate for
+all time and one per time bucket (hourly by default, last week kept). Drift is PSI and
+KL divergence of the category distribution and of the confidence histogram against a
+training reference, written by train.py to ML/logs/monitoring_reference.json, plus the
+fraud rate of model-scored rows against the fraud model's predicted rate on the test split.
+It is computed on demand in O(#categories + #bins).
+
+The state is a small JSON file. It also records a byte offset into
+ML/logs/predictions.jsonl, so ``catch_up`` only reads lines appended since the last
+call; the log is never rescanned.
+
+The state file has a single owner, the cron CLI below. Gateway workers load it with
+``read_only=True``: served predictions are appended to the prediction log (``record``)
+instead of being folded into a private copy, and ``sync`` reloads the owner's state when
+it changes and then catches up on the log tail in memory. Every worker reports the same
+counts, nothing is lost when several processes serve, and no line is counted twice.
+
+Usage (from repo root, e.g. from cron; exits 1 when drift crosses the alert level):
+    python -m ML.monitoring --log-path ML/logs/predictions.jsonl --state-path ML/logs/monitoring.json \
+        --reference-path ML/logs/monitoring_reference.json --fail-on-alert
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+CONFIDENCE_BINS = 10
+HIGH_CONFIDENCE = 0.8
+LOW_CONFIDENCE = 0.5
+# conventional PSI levels: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+FRAUD_RATE_TOLERANCE = 0.05
+MIN_DRIFT_SAMPLES = 100
+EPS = 1e-4
+
+
+def confidence_bin(confidence):
+    return min(max(int(confidence * CONFIDENCE_BINS), 0), CONFIDENCE_BINS - 1)
+
+
+def _proportions(counts, keys):
+    p = np.array([counts.get(k, 0) for k in keys], dtype=float)
+    p = np.maximum(p / p.sum() if p.sum() > 0 else p, EPS)
+    return p / p.sum()
+
+
+def divergence(actual, expected):
+    """PSI and KL(actual || expected) of two count/probability mappings over their union of keys."""
+    keys = sorted(set(actual) | set(expected), key=str)
+    a, e = _proportions(actual, keys), _proportions(expected, keys)
+    return {"psi": float(np.sum((a - e) * np.log(a / e))), "kl": float(np.sum(a * np.log(a / e)))}
+
+
+def record_fields(record):
+    """(category, confidence, is_fraud, fraud_probability, source) from any prediction dict in the repo.
+
+    Fraud fields count only when the fraud model scored the row: rows without an amount
+    carry default fraud fields, and cascade-skipped or rule-scored rows (``fraud_stage``
+    other than 'model') are not comparable with the model-predicted reference rate.
+    """
+    category = record.get("category", record.get("predicted_category"))
+    confidence = record.get("category_confidence", record.get("confidence"))
+    is_fraud = record.get("is_fraud", record.get("predicted_fraud"))
+    fraud_probability = record.get("fraud_probability", record.get("fraud_confidence"))
+    if record.get("fraud_stage", "model") != "model" or ("amount" in record and record["amount"] is None):
+        is_fraud = fraud_probability = None
+    source = record.get("category_source", record.get("method"))
+    return (None if category is None else str(category), None if confidence is None else float(confidence),
+            None if is_fraud is None else bool(is_fraud),
+            None if fraud_probability is None else float(fraud_probability), source)
+
+
+def record_time(record):
+    """Epoch seconds of the record's ISO ``timestamp`` (naive times are taken as UTC), else now."""
+    ts = record.get("timestamp")
+    if ts:
+        try:
+            dt = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+            return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class Aggregate:
+    """Counters for a set of predictions; ``add`` with weight=-1 takes a prediction back out."""
+
+    def __init__(self):
+        self.n = 0
+        self.confidence_n = 0
+        self.confidence_sum = 0.0
+        self.confidence_hist = [0] * CONFIDENCE_BINS
+        self.high_confidence = 0
+        self.low_confidence = 0
+        self.categories = {}
+        self.sources = {}
+        self.fraud_n = 0
+        self.fraud_flagged = 0
+        self.fraud_probability_sum = 0.0
+
+    def add(self, category, confidence, is_fraud=None, fraud_probability=None, source=None, weight=1):
+        self.n += weight
+        if category is not None:
+            self.categories[category] = self.categories.get(category, 0) + weight
+        if source is not None:
+            self.sources[source] = self.sources.get(source, 0) + weight
+        if confidence is not None:
+            self.confidence_n += weight
+            self.confidence_sum += weight * confidence
+            self.confidence_hist[confidence_bin(confidence)] += weight
+            self.high_confidence += weight * (confidence > HIGH_CONFIDENCE)
+            self.low_confidence += weight * (confidence < LOW_CONFIDENCE)
+        if is_fraud is not None or fraud_probability is not None:
+            self.fraud_n += weight
+            self.fraud_flagged += weight * bool(is_fraud)
+            self.fraud_probability_sum += weight * (fraud_probability or 0.0)
+
+    def merge(self, other):
+        for key in ("n", "confidence_n", "confidence_sum", "high_confidence", "low_confidence",
+                    "fraud_n", "fraud_flagged", "fraud_probability_sum"):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        self.confidence_hist = [a + b for a, b in zip(self.confidence_hist, other.confidence_hist)]
+        for name in ("categories", "sources"):
+            counts = getattr(self, name)
+            for k, v in getattr(other, name).items():
+                counts[k] = counts.get(k, 0) + v
+        return self
+
+    def summary(self):
+        return {
+            "n": self.n,
+            "avg_confidence": self.confidence_sum / self.confidence_n if self.confidence_n else None,
+            "high_confidence": self.high_confidence,
+            "low_confidence": self.low_confidence,
+            "confidence_hist": list(self.confidence_hist),
+            "categories": {k: v for k, v in self.categories.items() if v},
+            "sources": {k: v for k, v in self.sources.items() if v},
+            "fraud_rate": self.fraud_flagged / self.fraud_n if self.fraud_n else None,
+            "avg_fraud_probability": self.fraud_probability_sum / self.fraud_n if self.fraud_n else None,
+        }
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.__dict__.update(data)
+        return agg
+
+
+def build_reference(categories, confidences, fraud=None):
+    """Training-time reference distributions (predicted categories, confidences and fraud on held-out data)."""
+    agg = Aggregate()
+    for category, confidence in zip(categories, confidences):
+        agg.add(str(category), float(confidence))
+    return {
+        "n": agg.n,
+        "categories": {k: v / agg.n for k, v in agg.categories.items()} if agg.n else {},
+        "confidence_hist": [v / agg.n for v in agg.confidence_hist] if agg.n else [],
+        "fraud_rate": float(np.mean(fraud)) if fraud is not None and len(fraud) else None,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def load_reference(path):
+    if path and os.path.exists(path):
+        with open(path) as fh:
+            return json.load(fh)
+    return None
+
+
+class PredictionMonitor:
+    """All-time and per-bucket aggregates over a prediction stream, with drift against a reference."""
+
+    def __init__(self, path=None, log_path=None, reference=None, bucket_seconds=3600, keep_buckets=168,
+                 read_only=False):
+        self.path = path
+        self.log_path = log_path
+        self.reference = reference
+        self.bucket_seconds = bucket_seconds
+        self.keep_buckets = keep_buckets
+        self.read_only = read_only
+        self.offset = 0
+        self.totals = Aggregate()
+        self._buckets = {}
+        self._state_mtime = None
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, log_path=None, reference=None, **kwargs):
+        monitor = cls(path, log_path, reference, **kwargs)
+        monitor._load_state()
+        return monitor
+
+    def _load_state(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        mtime = os.path.getmtime(self.path)
+        with open(self.path) as fh:
+            state = json.load(fh)
+        with self._lock:
+            self.bucket_seconds = state.get("bucket_seconds", self.bucket_seconds)
+            self.offset = state.get("offset", 0)
+            self.totals = Aggregate.from_dict(state["totals"])
+            self._buckets = {int(k): Aggregate.from_dict(v) for k, v in state.get("buckets", {}).items()}
+            self._state_mtime = mtime
+        return True
+
+    def save(self):
+        if not self.path or self.read_only:
+            return
+        with self._lock:
+            state = {"bucket_seconds": self.bucket_seconds, "offset": self.offset, "totals": self.totals.to_dict(),
+                     "buckets": {str(k): v.to_dict() for k, v in sorted(self._buckets.items())},
+                     "saved_at": datetime.utcnow().isoformat() + "Z"}
+        write_json(self.path, state)
+
+    def _bucket(self, ts):
+        key = int(ts // self.bucket_seconds) * self.bucket_seconds
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if self._buckets and key < min(self._buckets) and len(self._buckets) >= self.keep_buckets:
+                return None  # older than the retained window: all-time totals only
+            bucket = self._buckets[key] = Aggregate()
+            while len(self._buckets) > self.keep_buckets:
+                del self._buckets[min(self._buckets)]
+        return bucket
+
+    def observe(self, record, weight=1):
+        """Fold one prediction record in (weight=-1 retracts it, e.g. before re-observing a correction)."""
+        fields = record_fields(record)
+        ts = record_time(record)
+        with self._lock:
+            self.totals.add(*fields, weight=weight)
+            bucket = self._bucket(ts)
+            if bucket is not None:
+                bucket.add(*fields, weight=weight)
+
+    def revise(self, old, new):
+        """Replace a previously observed record (same timestamp) by its corrected version."""
+        self.observe(old, weight=-1)
+        self.observe(new)
+
+    def catch_up(self, max_bytes=None):
+        """Observe the lines appended to ``log_path`` since the last call; returns how many were read."""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return 0
+        if os.path.getsize(self.log_path) < self.offset:
+            self.offset = 0  # truncated or rotated
+        n = 0
+        with open(self.log_path, "rb") as fh:
+            fh.seek(self.offset)
+            chunk = fh.read(max_bytes) if max_bytes else fh.read()
+        end = chunk.rfind(b"\n") + 1  # a partially written last line waits for the next call
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.observe(record)
+            n += 1
+        self.offset += end
+        return n
+
+    def record(self, records):
+        """Account for served predictions: appended to the log when there is one (and
+        observed by whoever catches up on it), otherwise observed here directly."""
+        if not self.log_path:
+            for r in records:
+                self.observe(r)
+            return
+        now = datetime.utcnow().isoformat() + "Z"
+        lines = "".join(json.dumps({"timestamp": now, **r}, default=str) + "\n" for r in records)
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        # one O_APPEND write per call, so lines from concurrent processes never interleave
+        with self._log_lock, open(self.log_path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+
+    def sync(self):
+        """Bring the aggregates up to date with the log; returns the number of lines read.
+
+        A read-only monitor first reloads the owner's state when it has been rewritten (its
+        offset then matches its totals); the owner persists what it read.
+        """
+        if self.read_only and self.path and os.path.exists(self.path) \
+                and os.path.getmtime(self.path) != self._state_mtime:
+            self._load_state()
+        n = self.catch_up()
+        if n and not self.read_only:
+            self.save()
+        return n
+
+    def buckets(self, last=None):
+        with self._lock:
+            keys = sorted(self._buckets)[-last:] if last else sorted(self._buckets)
+            return [{"start": datetime.fromtimestamp(k, timezone.utc).isoformat().replace("+00:00", "Z"),
+                     **self._buckets[k].summary()} for k in keys]
+
+    def window(self, last=None):
+        """Aggregate of the last ``last`` buckets (all-time totals when None)."""
+        with self._lock:
+            if last is None:
+                return Aggregate().merge(self.totals)
+            agg = Aggregate()
+            for k in sorted(self._buckets)[-last:]:
+                agg.merge(self._buckets[k])
+            return agg
+
+    def drift(self, last=None):
+        """PSI/KL and fraud-rate shift of a window against the reference, with an overall status."""
+        agg = self.window(last)
+        out = {"n": agg.n, "window_buckets": last, "alerts": []}
+        if not self.reference:
+            out["status"] = "no_reference"
+            return out
+        if agg.n < MIN_DRIFT_SAMPLES:
+            out["status"] = "insufficient_data"
+            return out
+        ref = self.reference
+        out["categories"] = divergence(agg.categories, ref.get("categories", {}))
+        out["confidence"] = divergence(dict(enumerate(agg.confidence_hist)), dict(enumerate(ref.get("confidence_hist", []))))
+        levels = []
+        for name in ("categories", "confidence"):
+            psi = out[name]["psi"]
+            level = "alert" if psi >= PSI_ALERT else "warn" if psi >= PSI_WARN else "ok"
+            levels.append(level)
+            if level != "ok":
+                out["alerts"].append({"metric": f"{name}_psi", "value": psi, "level": level})
+        rate = agg.fraud_flagged / agg.fraud_n if agg.fraud_n else None
+        if rate is not None and ref.get("fraud_rate") is not None:
+            out["fraud_rate"] = {"current": rate, "reference": ref["fraud_rate"], "delta": rate - ref["fraud_rate"]}
+            if abs(rate - ref["fraud_rate"]) > FRAUD_RATE_TOLERANCE:
+                levels.append("alert")
+                out["alerts"].append({"metric": "fraud_rate", "value": rate, "level": "alert"})
+        out["status"] = "alert" if "alert" in levels else "warn" if "warn" in levels else "ok"
+        return out
+
+    def report(self, last=24):
+        return {"totals": self.totals.summary(), "buckets": self.buckets(last), "drift": self.drift(),
+                "recent_drift": self.drift(last), "bucket_seconds": self.bucket_seconds}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fold new prediction log lines into the monitoring state and report drift")
+    p.add_argument("--log-path", default=os.path.join("ML", "logs", "predictions.jsonl"))
+    p.add_argument("--state-path", default=os.path.join("ML", "logs", "monitoring.json"))
+    p.add_argument("--reference-path", default=os.path.join("ML", "logs", "monitoring_reference.json"))
+    p.add_argument("--buckets", type=int, default=24, help="Recent buckets in the report and its drift window")
+    p.add_argument("--fail-on-alert", action="store_true", help="Exit 1 when the drift status is 'alert'")
+    args = p.parse_args()
+
+    monitor = PredictionMonitor.load(args.state_path, args.log_path, load_reference(args.reference_path))
+    read = monitor.sync()
+    report = monitor.report(args.buckets)
+    report["lines_read"] = read
+    print(json.dumps(report, indent=2))
+    if args.fail_on_alert and "alert" in (report["drift"]["status"], report["recent_drift"]["status"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
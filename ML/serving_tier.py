@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Latency-bounded serving tier for the advanced classifier.
+
+The GradientBoosting / RandomForest ensembles trained by AdvancedTransactionClassifier are
+accurate but slow per row. This module trains cheaper candidates on the same combined
+TF-IDF + numeric features, benchmarks their latency and picks the most accurate one that
+fits a latency budget:
+
+- linear:    LogisticRegression on the sparse features
+- hist_gb:   TruncatedSVD projection + HistGradientBoostingClassifier
+- distilled: LogisticRegression fitted to the ensemble's own predictions (teacher labels,
+             weighted by teacher confidence), so it mimics the big model at linear cost
+
+Usage (from the ML directory, after advanced_ml.py has trained the ensembles):
+    python serving_tier.py --data data/training_data.csv --budget-ms 2
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import make_pipeline
+
+DEFAULT_BUDGET_MS = 2.0
+
+
+def candidate_models(random_state=42, svd_components=64):
+    """Unfitted serving candidates keyed by name."""
+    return {
+        'linear': LogisticRegression(max_iter=1000, C=4.0),
+        'hist_gb': make_pipeline(
+            TruncatedSVD(n_components=svd_components, random_state=random_state),
+            HistGradientBoostingClassifier(max_iter=100, random_state=random_state),
+        ),
+    }
+
+
+def distill(teacher, X, random_state=42):
+    """Fit a linear student to the teacher's labels on X, weighting rows by teacher confidence."""
+    proba = teacher.predict_proba(X)
+    y_teacher = teacher.classes_[proba.argmax(axis=1)]
+    student = LogisticRegression(max_iter=1000, C=4.0, random_state=random_state)
+    student.fit(X, y_teacher, sample_weight=proba.max(axis=1))
+    return student
+
+
+def _percentiles_ms(samples):
+    arr = np.asarray(samples) * 1000.0
+    return float(np.percentile(arr, 50)), float(np.percentile(arr, 99))
+
+
+def benchmark_latency(model, X, n_rows=200, batch_size=256, repeats=20):
+    """p50/p99 latency of predict_proba for single rows and for whole batches."""
+    X = X.tocsr() if hasattr(X, 'tocsr') else X
+    n = X.shape[0]
+    row_times = []
+    for i in range(min(n_rows, n)):
+        row = X[i:i + 1]
+        t0 = time.perf_counter()
+        model.predict_proba(row)
+        row_times.append(time.perf_counter() - t0)
+    batch = X[:min(batch_size, n)]
+    batch_times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict_proba(batch)
+        batch_times.append(time.perf_counter() - t0)
+    row_p50, row_p99 = _percentiles_ms(row_times)
+    batch_p50, batch_p99 = _percentiles_ms(batch_times)
+    return {
+        'row_p50_ms': row_p50,
+        'row_p99_ms': row_p99,
+        'batch_p50_ms': batch_p50,
+        'batch_p99_ms': batch_p99,
+        'batch_size': int(batch.shape[0]),
+    }
+
+
+def select_model(reports, budget_ms):
+    """Most accurate candidate whose per-row p99 fits the budget; the fastest one otherwise."""
+    within = [r for r in reports if r['row_p99_ms'] <= budget_ms]
+    if within:
+        return max(within, key=lambda r: r['accuracy'])['name']
+    return min(reports, key=lambda r: r['row_p99_ms'])['name']
+
+
+def build_serving_tier(X_train, y_train, X_test, y_test, teacher=None, budget_ms=DEFAULT_BUDGET_MS, random_state=42):
+    """Train, score and benchmark every candidate (and the teacher, for reference).
+
+    Returns (chosen_name, chosen_model, reports). The teacher is reported but never chosen.
+    """
+    models = {}
+    for name, est in candidate_models(random_state).items():
+        models[name] = est.fit(X_train, y_train)
+    if teacher is not None:
+        models['distilled'] = distill(teacher, X_train, random_state)
+
+    reports = []
+    for name, model in models.items():
+        r = {'name': name, 'accuracy': float(accuracy_score(y_test, model.predict(X_test)))}
+        r.update(benchmark_latency(model, X_test))
+        r['within_budget'] = r['row_p99_ms'] <= budget_ms
+        reports.append(r)
+    chosen = select_model(reports, budget_ms)
+
+    if teacher is not None:
+        r = {'name': 'teacher', 'accuracy': float(accuracy_score(y_test, teacher.predict(X_test)))}
+        r.update(benchmark_latency(teacher, X_test))
+        r['within_budget'] = r['row_p99_ms'] <= budget_ms
+        reports.append(r)
+    return chosen, models[chosen], reports
+
+
+def main():
+    p = argparse.ArgumentParser(description="Pick latency-bounded serving models for the advanced classifier")
+    p.add_argument("--data", default="data/training_data.csv", help="Labelled CSV with text, amount, category, fraud")
+    p.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Per-row p99 latency budget")
+    p.add_argument("--test-size", type=float, default=0.2)
+    p.add_argument("--report", default="logs/serving_benchmark.json")
+    args = p.parse_args()
+
+    try:
+        from .advanced_ml import AdvancedTransactionClassifier
+    except ImportError:
+        from advanced_ml import AdvancedTransactionClassifier
+
+    clf = AdvancedTransactionClassifier()
+    if not clf.load_models():
+        raise SystemExit("Train the ensembles first (python advanced_ml.py)")
+    report = clf.build_serving_tier(args.data, budget_ms=args.budget_ms, test_size=args.test_size)
+    clf.save_models()
+
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    for task, info in report['tasks'].items():
+        print(f"{task}: serving '{info['chosen']}'")
+        for r in info['candidates']:
+            print(f"  {r['name']:<10} acc={r['accuracy']:.3f} row p50/p99={r['row_p50_ms']:.2f}/{r['row_p99_ms']:.2f}ms "
+                  f"batch({r['batch_size']}) p50/p99={r['batch_p50_ms']:.1f}/{r['batch_p99_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
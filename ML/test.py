@@ -14,9 +14,8 @@ except Exception:
 	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 	from data_preprocessing import clean_text
 
-pipeline = joblib.load(os.path.join(repo_root, "ML", "models", "pipeline.pkl"))
-vec = pipeline["vectorizer"]
-clf = pipeline["model"]
+vec = joblib.load(os.path.join(repo_root, "ML", "models", "vectorizer.pkl"))
+clf = joblib.load(os.path.join(repo_root, "ML", "models", "model.pkl"))
 
 text = "Got a bonus today"
 text_clean = clean_text(text)
@@ -47,18 +47,24 @@ try:
         clean_text,
         augment_data,
         vectorize_texts,
-        balance_smote,
+        balance_classes,
         dataset_hash,
+        BALANCE_METHODS,
     )
+    from .train_orchestrator import TrainingOrchestrator
+    from .monitoring import build_reference, write_json
 except Exception:
     from ML.data_preprocessing import (
         load_data,
         clean_text,
         augment_data,
         vectorize_texts,
-        balance_smote,
+        balance_classes,
         dataset_hash,
+        BALANCE_METHODS,
     )
+    from ML.train_orchestrator import TrainingOrchestrator
+    from ML.monitoring import build_reference, write_json
 
 RANDOM_STATE_DEFAULT = 42
 
@@ -93,41 +99,48 @@ def split_701515(texts, labels, random_state=RANDOM_STATE_DEFAULT):
     return X_train, X_val, X_test, y_train, y_val, y_test
 
 
-def fit_vectorizer_and_model(X_train_texts, y_train, max_features=50000, ngram_range=(1, 2), random_state=RANDOM_STATE_DEFAULT, smote=False):
+def fit_vectorizer_and_model(X_train_texts, y_train, max_features=50000, ngram_range=(1, 2), random_state=RANDOM_STATE_DEFAULT, smote=False, balance=None):
     vec, X_train = vectorize_texts(X_train_texts, max_features=max_features, ngram_range=ngram_range)
 
-    # Optionally apply SMOTE (be aware: converts to dense)
-    if smote:
-        X_train_res, y_train_res = balance_smote(X_train, np.array(y_train), random_state=random_state)
-    else:
-        # keep original shapes
-        y_train_res = np.array(y_train)
-        X_train_res = X_train
+    # Optional class balancing; only 'smote' densifies, and only within the memory budget
+    if smote and not balance:
+        balance = "smote"
+    X_train_res, y_train_res, class_weight = balance_classes(X_train, y_train, method=balance, random_state=random_state)
 
-    clf = LogisticRegression(solver="saga", max_iter=2000, random_state=random_state)
+    clf = LogisticRegression(solver="saga", max_iter=2000, random_state=random_state, class_weight=class_weight)
     # If X_train_res is dense/numpy array, scikit-learn accepts it; sparse acceptable too.
     clf.fit(X_train_res, y_train_res)
     return vec, clf
 
 
-def fit_category_model(tfidf, X_texts, y_cat):
-    X = tfidf.transform(X_texts)
-    clf = LogisticRegression(multi_class='multinomial', solver='saga', max_iter=2000, random_state=RANDOM_STATE_DEFAULT)
+def fit_category_model(tfidf, X_texts, y_cat, balance=None, X=None, **params):
+    # `X` is an already-transformed matrix for X_texts (e.g. rows of the shared full matrix)
+    if X is None:
+        X = tfidf.transform(X_texts)
+    X, y_cat, class_weight = balance_classes(X, y_cat, method=balance, random_state=RANDOM_STATE_DEFAULT)
+    if class_weight:
+        params.setdefault('class_weight', class_weight)
+    clf = LogisticRegression(multi_class='multinomial', solver='saga', max_iter=2000, random_state=RANDOM_STATE_DEFAULT, **params)
     clf.fit(X, y_cat)
     return clf
 
 
-def fit_fraud_pipeline(tfidf, df, text_col='text_clean', amount_col=None):
-    # Build a preprocessor that creates its own TF-IDF inside the pipeline so
-    # it is fit as part of `pipe.fit(...)`. This avoids cloning a pre-fitted
-    # vectorizer which can become unfitted when sklearn clones estimators.
+def fit_fraud_pipeline(tfidf, df, text_col='text_clean', amount_col=None, X_text=None, **params):
+    # With a pre-fitted `tfidf` (shared with the category model) the text branch only
+    # calls its transform, wrapped in a FunctionTransformer so sklearn's cloning inside
+    # ColumnTransformer cannot reset it to unfitted. Without one, the pipeline fits its
+    # own TF-IDF as part of `pipe.fit(...)`.
+    # `X_text` is tfidf.transform(df[text_col]) computed earlier; the fit uses it as is and
+    # the fitted pipeline goes back to calling tfidf.transform on new data.
     # Text transformer pipeline: convert column to 1d then vectorize
+    if tfidf is not None:
+        fit_transform = tfidf.transform if X_text is None else (lambda _: X_text)
+        text_vectorizer = FunctionTransformer(fit_transform, accept_sparse=True, validate=False)
+    else:
+        text_vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=50000)
     text_pipeline = Pipeline([
         ("col", FunctionTransformer(column_to_1d, validate=False)),
-        (
-            "tfidf",
-            TfidfVectorizer(ngram_range=(1, 2), max_features=50000),
-        ),
+        ("tfidf", text_vectorizer),
     ])
 
     transformers = [("text", text_pipeline, [text_col])]
@@ -136,11 +149,14 @@ def fit_fraud_pipeline(tfidf, df, text_col='text_clean', amount_col=None):
 
     preprocessor = ColumnTransformer(transformers=transformers, remainder="drop")
 
-    fraud_clf = LogisticRegression(solver="saga", max_iter=2000, class_weight="balanced", random_state=RANDOM_STATE_DEFAULT)
+    fraud_params = {"class_weight": "balanced", **params}
+    fraud_clf = LogisticRegression(solver="saga", max_iter=2000, random_state=RANDOM_STATE_DEFAULT, **fraud_params)
     pipe = Pipeline([("pre", preprocessor), ("clf", fraud_clf)])
 
     X_input = df[[text_col] + ([amount_col] if amount_col and amount_col in df.columns else [])]
     pipe.fit(X_input, df['fraud'])
+    if tfidf is not None and X_text is not None:
+        pipe.named_steps["pre"].named_transformers_["text"].named_steps["tfidf"].func = tfidf.transform
     return pipe
 
 
@@ -235,18 +251,53 @@ def compute_metrics(clf, vec, texts, y_true):
     return metrics
 
 
+def monitoring_reference(clf, vec, texts, fraud=None):
+    """Predicted category/confidence distributions on held-out texts, the baseline for drift monitoring."""
+    if not len(texts) or not hasattr(clf, "predict_proba"):
+        return None
+    proba = clf.predict_proba(vec.transform(texts))
+    return build_reference(np.asarray(clf.classes_)[proba.argmax(axis=1)], proba.max(axis=1), fraud)
+
+
 def save_artifacts(vec, clf, output_dir):
     models_dir = os.path.join(output_dir, "models")
     os.makedirs(models_dir, exist_ok=True)
     vec_path = os.path.join(models_dir, "vectorizer.pkl")
     model_path = os.path.join(models_dir, "model.pkl")
-    pipeline_path = os.path.join(models_dir, "pipeline.pkl")
 
     joblib.dump(vec, vec_path)
     joblib.dump(clf, model_path)
-    joblib.dump({"vectorizer": vec, "model": clf}, pipeline_path)
 
-    return {"vectorizer": vec_path, "model": model_path, "pipeline": pipeline_path}
+    return {"vectorizer": vec_path, "model": model_path}
+
+
+def export_saved_compact(saved_paths, output_dir):
+    """Re-export the artifacts just saved in the compact format; returns its directory."""
+    try:
+        from .export_compact import export_compact
+    except Exception:
+        from ML.export_compact import export_compact
+    out_dir = os.path.join(output_dir, "models", "compact")
+    model_path = saved_paths.get("cat_model") or saved_paths.get("model")
+    export_compact(
+        out_dir,
+        vectorizer=joblib.load(saved_paths["vectorizer"]) if model_path else None,
+        cat_model=joblib.load(model_path) if model_path else None,
+        fraud_pipeline=joblib.load(saved_paths["fraud_pipeline"]) if "fraud_pipeline" in saved_paths else None,
+    )
+    return out_dir
+
+
+def compact_saved_export(compact_dir, args, eval_texts=None, eval_labels=None):
+    """Prune/quantize the compact export in place when requested; returns the report or None."""
+    if args.prune_threshold is None and args.compact_dtype is None:
+        return None
+    try:
+        from .compact_models import compact
+    except Exception:
+        from ML.compact_models import compact
+    return compact(compact_dir, threshold=args.prune_threshold or 0.0, dtype=args.compact_dtype or "float32",
+                   texts=eval_texts, labels=eval_labels)
 
 
 def main():
@@ -259,12 +310,61 @@ def main():
     p.add_argument("--amount-col", default=None, help="Optional numeric amount column name to include in fraud model")
     p.add_argument("--output-dir", default="ML", help="Output directory (models/logs/artifacts)")
     p.add_argument("--augment", type=int, default=0, help="Number of augmentations per row (0 disables)")
-    p.add_argument("--smote", action="store_true", help="Apply SMOTE to training data")
+    p.add_argument("--smote", action="store_true", help="Apply SMOTE to training data (same as --balance smote)")
+    p.add_argument("--balance", choices=BALANCE_METHODS, default=None,
+                   help="Class balancing; everything but 'smote' stays sparse, and 'smote' falls back to svd_smote over ML_DENSE_BUDGET_BYTES")
     p.add_argument("--max-features", type=int, default=50000, help="TF-IDF max_features")
     p.add_argument("--ngram-min", type=int, default=1, help="TF-IDF ngram min")
     p.add_argument("--ngram-max", type=int, default=2, help="TF-IDF ngram max")
     p.add_argument("--random-state", type=int, default=RANDOM_STATE_DEFAULT, help="Random seed for reproducibility")
+    p.add_argument("--search", action="store_true", help="Cross-validated hyperparameter search for category/fraud models")
+    p.add_argument("--cv-folds", type=int, default=3, help="Folds used by --search")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel jobs for --search (folds and grid points)")
+    p.add_argument("--cache-dir", default=None, help="Disk cache for fold TF-IDF matrices (default <output-dir>/artifacts/cache)")
+    p.add_argument("--out-of-core", action="store_true", help="Stream the dataset in chunks (HashingVectorizer + partial_fit)")
+    p.add_argument("--chunksize", type=int, default=100000, help="Rows per chunk in --out-of-core mode")
+    p.add_argument("--n-features", type=int, default=2 ** 20, help="Hashing dimensions in --out-of-core mode")
+    p.add_argument("--idf", action="store_true", help="Estimate IDF in a streaming pre-pass (--out-of-core)")
+    p.add_argument("--ooc-model", choices=["sgd", "nb"], default="sgd", help="Category model for --out-of-core")
+    p.add_argument("--checkpoint-every", type=int, default=10, help="Checkpoint every N chunks (--out-of-core)")
+    p.add_argument("--resume", action="store_true", help="Resume --out-of-core training from its checkpoint")
+    p.add_argument("--export-compact", action="store_true",
+                   help="Also write the memory-mappable compact format to <output-dir>/models/compact")
+    p.add_argument("--prune-threshold", type=float, default=None,
+                   help="With --export-compact: drop features whose |coef| is below this for every class")
+    p.add_argument("--compact-dtype", choices=["float32", "int8", "float64"], default=None,
+                   help="With --export-compact: stored weight type (int8 uses per-class scales)")
     args = p.parse_args()
+    if args.smote and not args.balance:
+        args.balance = "smote"
+
+    if args.out_of_core:
+        try:
+            from .train_out_of_core import train_out_of_core
+        except Exception:
+            from ML.train_out_of_core import train_out_of_core
+        run_meta = train_out_of_core(
+            args.data_path,
+            output_dir=args.output_dir,
+            text_col=args.text_col,
+            category_col=args.category_col,
+            fraud_col=args.fraud_col,
+            amount_col=args.amount_col,
+            chunksize=args.chunksize,
+            n_features=args.n_features,
+            ngram_range=(args.ngram_min, args.ngram_max),
+            use_idf=args.idf,
+            model=args.ooc_model,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+            random_state=args.random_state,
+        )
+        if args.export_compact:
+            run_meta["saved_paths"]["compact"] = export_saved_compact(run_meta["saved_paths"], args.output_dir)
+            run_meta["compaction"] = compact_saved_export(run_meta["saved_paths"]["compact"], args)
+        print("Training complete.")
+        print(json.dumps(run_meta, indent=2))
+        return
 
     # Create dirs
     os.makedirs(os.path.join(args.output_dir, "models"), exist_ok=True)
@@ -294,20 +394,45 @@ def main():
 
     saved_paths = {}
     run_results = {}
+    eval_set = (None, None)  # held-out (texts, labels) of the category/single-label model
+    reference = None
 
     # If category and/or fraud columns provided, train respective models
     if has_category or has_fraud:
-        # Fit TF-IDF on all texts
-        tfidf = TfidfVectorizer(ngram_range=(args.ngram_min, args.ngram_max), max_features=args.max_features)
-        tfidf.fit(texts)
+        best_params = {}
+        if args.search:
+            # One cached vectorization per fold, shared by both tasks; fits run in parallel
+            orchestrator = TrainingOrchestrator(
+                cache_dir=args.cache_dir or os.path.join(args.output_dir, "artifacts", "cache"),
+                n_jobs=args.n_jobs,
+                n_splits=args.cv_folds,
+                vec_params={"ngram_range": (args.ngram_min, args.ngram_max), "max_features": args.max_features},
+                random_state=args.random_state,
+            )
+            data_key = dataset_hash(df)
+            targets = {}
+            if has_category:
+                targets['category'] = df[args.category_col].tolist()
+            if has_fraud:
+                targets['fraud'] = df[args.fraud_col].tolist()
+            search = orchestrator.search(data_key, texts, targets)
+            best_params = {task: res['best_params'] for task, res in search.items()}
+            run_results['search'] = search
+            tfidf, X_full = orchestrator.fit_vectorizer(data_key, texts)
+        else:
+            # Fit TF-IDF on all texts
+            tfidf = TfidfVectorizer(ngram_range=(args.ngram_min, args.ngram_max), max_features=args.max_features)
+            X_full = tfidf.fit_transform(texts)
+        # X_full rows follow `texts` (and df); both final fits slice it rather than transforming again
         # Save tfidf now (will be overwritten by save_artifacts later)
         # Category model
         if has_category:
             cat_texts = df['text_clean'].tolist()
             cat_labels = df[args.category_col].tolist()
-            # split
-            X_train_texts, X_val_texts, X_test_texts, y_train_cat, y_val_cat, y_test_cat = split_701515(cat_texts, cat_labels, random_state=args.random_state)
-            cat_clf = fit_category_model(tfidf, X_train_texts, y_train_cat)
+            # split row indices (same partition as splitting the texts) so the training rows come from X_full
+            idx_train, idx_val, idx_test, y_train_cat, y_val_cat, y_test_cat = split_701515(np.arange(len(cat_texts)), cat_labels, random_state=args.random_state)
+            X_train_texts, X_val_texts, X_test_texts = ([cat_texts[i] for i in idx] for idx in (idx_train, idx_val, idx_test))
+            cat_clf = fit_category_model(tfidf, X_train_texts, y_train_cat, balance=args.balance, X=X_full[idx_train], **best_params.get('category', {}))
             # save
             models_dir = os.path.join(args.output_dir, 'models')
             os.makedirs(models_dir, exist_ok=True)
@@ -319,13 +444,16 @@ def main():
             val_metrics_cat = compute_metrics(cat_clf, tfidf, X_val_texts, y_val_cat)
             test_metrics_cat = compute_metrics(cat_clf, tfidf, X_test_texts, y_test_cat)
             run_results['category'] = {'val': val_metrics_cat, 'test': test_metrics_cat}
+            eval_set = (X_test_texts, y_test_cat)
+            reference = monitoring_reference(cat_clf, tfidf, X_test_texts)
 
         # Fraud model
         if has_fraud:
             # Ensure fraud column is named 'fraud' in df for fit_fraud_pipeline
             if args.fraud_col != 'fraud':
                 df = df.rename(columns={args.fraud_col: 'fraud'})
-            fraud_pipe = fit_fraud_pipeline(tfidf, df, text_col='text_clean', amount_col=args.amount_col)
+            # reuses the category TF-IDF instead of fitting a second one
+            fraud_pipe = fit_fraud_pipeline(tfidf, df, text_col='text_clean', amount_col=args.amount_col, X_text=X_full, **best_params.get('fraud', {}))
             models_dir = os.path.join(args.output_dir, 'models')
             os.makedirs(models_dir, exist_ok=True)
             joblib.dump(fraud_pipe, os.path.join(models_dir, 'fraud_pipeline.pkl'))
@@ -342,6 +470,9 @@ def main():
             val_metrics_f = compute_metrics_pipeline(fraud_pipe, X_val_input, y_val_f)
             test_metrics_f = compute_metrics_pipeline(fraud_pipe, X_test_input, y_test_f)
             run_results['fraud'] = {'val': val_metrics_f, 'test': test_metrics_f}
+            if reference is not None:
+                # the monitor compares served model predictions, so the baseline is predicted fraud, not labels
+                reference['fraud_rate'] = float(np.mean(fraud_pipe.predict(X_test_input)))
 
     else:
         # fallback to single-label training using args.label_col
@@ -353,12 +484,19 @@ def main():
             max_features=args.max_features,
             ngram_range=(args.ngram_min, args.ngram_max),
             random_state=args.random_state,
-            smote=args.smote,
+            balance=args.balance,
         )
         saved_paths = save_artifacts(vec, clf, args.output_dir)
         val_metrics = compute_metrics(clf, vec, X_val_texts, y_val)
         test_metrics = compute_metrics(clf, vec, X_test_texts, y_test)
         run_results['single_label'] = {'val': val_metrics, 'test': test_metrics}
+        eval_set = (X_test_texts, y_test)
+        reference = monitoring_reference(clf, vec, X_test_texts)
+
+    if args.export_compact:
+        saved_paths["compact"] = export_saved_compact(saved_paths, args.output_dir)
+        # accuracy delta of the compaction is measured on the held-out test split
+        run_results["compaction"] = compact_saved_export(saved_paths["compact"], args, *eval_set)
 
     # Save metrics and run metadata
     run_meta = {
@@ -377,6 +515,10 @@ def main():
     with open(os.path.join(args.output_dir, "logs", "run_results.json"), "w") as fh:
         json.dump(run_results, fh, indent=2)
 
+    if reference is not None:
+        # baseline for ML/monitoring.py drift checks
+        write_json(os.path.join(args.output_dir, "logs", "monitoring_reference.json"), reference)
+
     print("Training complete.")
     print("Saved artifacts:", saved_paths)
     print("Run results:")
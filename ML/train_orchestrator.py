@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Training orchestrator: cached, parallel cross-validation and hyperparameter search.
+
+- Per-fold TF-IDF matrices are cached on disk with joblib.Memory, keyed by the dataset
+  hash (see data_preprocessing.dataset_hash), a hash of the fold's train/eval indices and
+  the vectorizer parameters, so re-running a search on unchanged data skips vectorization
+  entirely while a search that stratifies on different targets gets its own matrices.
+- Folds are vectorized in parallel, then every (task, params, fold) fit runs in parallel
+  with ``n_jobs``.
+- The same fold matrices serve every task, so the category and fraud models share one
+  vectorization per fold.
+
+Used by ``python -m ML.train ... --search`` (see train.py).
+"""
+import hashlib
+import warnings
+
+import numpy as np
+from joblib import Memory, Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import KFold, StratifiedKFold
+
+DEFAULT_VEC_PARAMS = {"ngram_range": (1, 2), "max_features": 50000}
+DEFAULT_GRIDS = {
+    "category": [{"C": c} for c in (0.5, 1.0, 4.0)],
+    "fraud": [{"C": c, "class_weight": "balanced"} for c in (0.5, 1.0, 4.0)],
+}
+
+
+def _vectorize(data_key, fold, vec_params, train_texts, eval_texts=None):
+    """Fit TF-IDF on one fold. ``data_key`` identifies the texts, which are not hashed again."""
+    vec = TfidfVectorizer(**vec_params)
+    X_train = vec.fit_transform(train_texts)
+    X_eval = vec.transform(eval_texts) if eval_texts is not None else None
+    return vec, X_train, X_eval
+
+
+def fold_key(i, train_idx, eval_idx):
+    """Cache key part for one fold: its position plus a digest of the rows it contains."""
+    h = hashlib.sha1(np.asarray(train_idx, dtype=np.int64).tobytes())
+    h.update(b"|")
+    h.update(np.asarray(eval_idx, dtype=np.int64).tobytes())
+    return (i, h.hexdigest())
+
+
+def _fit_score(params, X_train, y_train, X_eval, y_eval, random_state):
+    clf = LogisticRegression(solver="saga", max_iter=2000, random_state=random_state, **params)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        clf.fit(X_train, y_train)
+    return float(f1_score(y_eval, clf.predict(X_eval), average="macro", zero_division=0))
+
+
+class TrainingOrchestrator:
+    def __init__(self, cache_dir="ML/artifacts/cache", n_jobs=-1, n_splits=3, vec_params=None, random_state=42):
+        self.memory = Memory(cache_dir, verbose=0)
+        self.n_jobs = n_jobs
+        self.n_splits = n_splits
+        self.vec_params = dict(vec_params or DEFAULT_VEC_PARAMS)
+        self.random_state = random_state
+        self._vectorize = self.memory.cache(_vectorize, ignore=["train_texts", "eval_texts"])
+
+    def folds(self, y):
+        """Fold indices, stratified on ``y`` when every class has enough rows."""
+        y = np.asarray(y)
+        _, counts = np.unique(y, return_counts=True)
+        if counts.min() >= self.n_splits:
+            splitter = StratifiedKFold(self.n_splits, shuffle=True, random_state=self.random_state)
+            return list(splitter.split(np.zeros(len(y)), y))
+        splitter = KFold(self.n_splits, shuffle=True, random_state=self.random_state)
+        return list(splitter.split(np.zeros(len(y))))
+
+    def fold_matrices(self, data_key, texts, folds):
+        """(X_train, X_eval) per fold, from cache when the dataset hash has been seen before."""
+        texts = np.asarray(texts, dtype=object)
+        out = Parallel(n_jobs=self.n_jobs)(
+            delayed(self._vectorize)(data_key, fold_key(i, tr, ev), self.vec_params, texts[tr].tolist(), texts[ev].tolist())
+            for i, (tr, ev) in enumerate(folds)
+        )
+        return [(X_tr, X_ev) for _, X_tr, X_ev in out]
+
+    def fit_vectorizer(self, data_key, texts):
+        """TF-IDF fitted on all texts (cached) plus its matrix, shared by the final models.
+
+        Rows of the matrix follow ``texts``, so callers slice it instead of transforming again.
+        """
+        vec, X, _ = self._vectorize(data_key, "full", self.vec_params, list(texts))
+        return vec, X
+
+    def search(self, data_key, texts, targets, grids=None):
+        """Cross-validated grid search for every task over shared fold matrices.
+
+        ``targets`` maps task name -> labels (aligned with ``texts``). Returns, per task,
+        the best params and the mean macro-F1 of every grid point.
+        """
+        grids = grids or DEFAULT_GRIDS
+        # folds come from the first task so every task sees the same matrices
+        first = next(iter(targets.values()))
+        folds = self.folds(first)
+        matrices = self.fold_matrices(data_key, texts, folds)
+
+        jobs = []
+        for task, y in targets.items():
+            y = np.asarray(y)
+            for g, params in enumerate(grids[task]):
+                for f, (tr, ev) in enumerate(folds):
+                    jobs.append((task, g, delayed(_fit_score)(params, matrices[f][0], y[tr], matrices[f][1], y[ev], self.random_state)))
+        scores = Parallel(n_jobs=self.n_jobs)(job for _, _, job in jobs)
+
+        results = {}
+        for task in targets:
+            per_grid = [[s for (t, g, _), s in zip(jobs, scores) if t == task and g == i] for i in range(len(grids[task]))]
+            means = [float(np.mean(s)) for s in per_grid]
+            best = int(np.argmax(means))
+            results[task] = {
+                "best_params": grids[task][best],
+                "cv": [{"params": grids[task][i], "mean_f1": means[i], "fold_f1": per_grid[i]} for i in range(len(means))],
+            }
+        return results
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training for datasets that do not fit in memory.
+
+Streams CSV/Parquet chunks through a HashingVectorizer (no vocabulary to hold or pickle),
+optionally re-weighted by an IDF estimated in a streaming pre-pass, into classifiers that
+support ``partial_fit``. Accuracy is tracked by progressive validation (each chunk is
+scored before the model trains on it) and state is checkpointed every few chunks so a
+killed run can resume.
+
+Writes the same artifact names as train.py (vectorizer.pkl, cat_model.pkl,
+fraud_pipeline.pkl) so backend ModelPredictor loads them unchanged.
+
+Usage (from repo root):
+    python -m ML.train --out-of-core --data-path big.csv --category-col category \
+            --fraud-col fraud --amount-col amount --output-dir ML
+"""
+import json
+import os
+import warnings
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+try:
+    from .data_preprocessing import clean_text
+    from .train import column_to_1d
+except Exception:
+    from ML.data_preprocessing import clean_text
+    from ML.train import column_to_1d
+
+N_FEATURES_DEFAULT = 2 ** 20
+CHECKPOINT_NAME = "ooc_checkpoint.pkl"
+
+
+def iter_chunks(path, chunksize=100000, columns=None):
+    """Yield DataFrame chunks from a CSV or Parquet file without loading it whole."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet input needs pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+
+
+def make_vectorizer(n_features=N_FEATURES_DEFAULT, ngram_range=(1, 2), idf=None):
+    """Hashing vectorizer; with ``idf`` the output is TF-IDF using those precomputed weights."""
+    if idf is None:
+        return HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm="l2")
+    tfidf = TfidfTransformer(norm="l2")
+    tfidf.idf_ = idf
+    return Pipeline([
+        ("hash", HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm=None)),
+        ("idf", tfidf),
+    ])
+
+
+def _clean(chunk, text_col):
+    return chunk[text_col].fillna("").astype(str).map(clean_text)
+
+
+def scan(path, text_col, label_cols, chunksize, n_features, ngram_range, with_idf):
+    """Pre-pass: label counts for every label column and, optionally, hashed document frequencies."""
+    counts = {c: {} for c in label_cols}
+    df_counts = np.zeros(n_features) if with_idf else None
+    n_docs = 0
+    hasher = HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm=None, binary=True)
+    columns = label_cols + ([text_col] if with_idf else [])
+    for chunk in iter_chunks(path, chunksize, columns):
+        for c in label_cols:
+            for k, v in chunk[c].value_counts().items():
+                counts[c][k] = counts[c].get(k, 0) + int(v)
+        if with_idf:
+            X = hasher.transform(_clean(chunk, text_col))
+            df_counts += np.bincount(X.indices, minlength=n_features)
+            n_docs += X.shape[0]
+    idf = np.log((1 + n_docs) / (1 + df_counts)) + 1 if with_idf else None
+    return counts, idf
+
+
+def _balanced_weights(y, counts):
+    """Per-row weights equivalent to class_weight='balanced' over the whole stream."""
+    total = sum(counts.values())
+    per_class = {k: total / (len(counts) * v) for k, v in counts.items()}
+    return np.array([per_class[v] for v in y])
+
+
+def build_fraud_pipeline(vectorizer, scaler, clf, text_col="text_clean", amount_col=None):
+    """DataFrame-in fraud pipeline around already trained parts (stateless wrappers only)."""
+    transformers = [("text", Pipeline([
+        ("col", FunctionTransformer(column_to_1d, validate=False)),
+        ("tfidf", FunctionTransformer(vectorizer.transform, accept_sparse=True, validate=False)),
+    ]), [text_col])]
+    if amount_col:
+        transformers.append(("num", FunctionTransformer(scaler.transform, validate=False), [amount_col]))
+    pre = ColumnTransformer(transformers=transformers, remainder="drop")
+    sample = pd.DataFrame({text_col: [""], **({amount_col: [0.0]} if amount_col else {})})
+    pre.fit(sample)
+    return Pipeline([("pre", pre), ("clf", clf)])
+
+
+def train_out_of_core(
+    data_path,
+    output_dir="ML",
+    text_col="text",
+    category_col=None,
+    fraud_col=None,
+    amount_col=None,
+    chunksize=100000,
+    n_features=N_FEATURES_DEFAULT,
+    ngram_range=(1, 2),
+    use_idf=False,
+    model="sgd",
+    checkpoint_every=10,
+    resume=False,
+    random_state=42,
+):
+    if not category_col and not fraud_col:
+        raise ValueError("Out-of-core mode needs --category-col and/or --fraud-col")
+    if model not in ("sgd", "nb"):
+        raise ValueError(f"Unknown out-of-core model: {model}")
+    models_dir = os.path.join(output_dir, "models")
+    ckpt_path = os.path.join(output_dir, "artifacts", CHECKPOINT_NAME)
+    os.makedirs(models_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(ckpt_path), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, "logs"), exist_ok=True)
+
+    if resume and os.path.exists(ckpt_path):
+        state = joblib.load(ckpt_path)
+        print(f"Resuming after chunk {state['chunks_done']} ({state['rows_seen']} rows)")
+    else:
+        label_cols = [c for c in (category_col, fraud_col) if c]
+        counts, idf = scan(data_path, text_col, label_cols, chunksize, n_features, ngram_range, use_idf)
+        state = {
+            "vectorizer": make_vectorizer(n_features, ngram_range, idf),
+            "counts": counts,
+            "cat_model": None,
+            "fraud_model": None,
+            "scaler": StandardScaler() if amount_col else None,
+            "chunks_done": 0,
+            "rows_seen": 0,
+            "progressive": {"category": [0, 0], "fraud": [0, 0]},
+        }
+        if category_col:
+            state["cat_model"] = (MultinomialNB(alpha=0.1) if model == "nb"
+                                  else SGDClassifier(loss="log_loss", alpha=1e-6, random_state=random_state))
+        if fraud_col:
+            state["fraud_model"] = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=random_state)
+
+    vec = state["vectorizer"]
+    columns = [text_col] + [c for c in (category_col, fraud_col, amount_col) if c]
+    for i, chunk in enumerate(iter_chunks(data_path, chunksize, columns)):
+        if i < state["chunks_done"]:
+            continue
+        X = vec.transform(_clean(chunk, text_col))
+
+        if category_col:
+            y = chunk[category_col].to_numpy()
+            clf = state["cat_model"]
+            if hasattr(clf, "classes_"):
+                hits = state["progressive"]["category"]
+                hits[0] += int((clf.predict(X) == y).sum())
+                hits[1] += len(y)
+            clf.partial_fit(X, y, classes=np.array(sorted(state["counts"][category_col])))
+
+        if fraud_col:
+            y = chunk[fraud_col].to_numpy()
+            X_f = X
+            if amount_col:
+                amounts = chunk[[amount_col]].fillna(0.0).to_numpy(dtype=float)
+                state["scaler"].partial_fit(amounts)
+                X_f = sparse.hstack([X, state["scaler"].transform(amounts)]).tocsr()
+            clf = state["fraud_model"]
+            if hasattr(clf, "classes_"):
+                hits = state["progressive"]["fraud"]
+                hits[0] += int((clf.predict(X_f) == y).sum())
+                hits[1] += len(y)
+            clf.partial_fit(X_f, y, classes=np.array(sorted(state["counts"][fraud_col])),
+                            sample_weight=_balanced_weights(y, state["counts"][fraud_col]))
+
+        state["chunks_done"] = i + 1
+        state["rows_seen"] += len(chunk)
+        if checkpoint_every and state["chunks_done"] % checkpoint_every == 0:
+            joblib.dump(state, ckpt_path + ".tmp")
+            os.replace(ckpt_path + ".tmp", ckpt_path)
+            print(f"Checkpoint: {state['chunks_done']} chunks, {state['rows_seen']} rows")
+
+    saved_paths = {"vectorizer": os.path.join(models_dir, "vectorizer.pkl")}
+    joblib.dump(vec, saved_paths["vectorizer"])
+    if category_col:
+        saved_paths["cat_model"] = os.path.join(models_dir, "cat_model.pkl")
+        joblib.dump(state["cat_model"], saved_paths["cat_model"])
+    if fraud_col:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pipe = build_fraud_pipeline(vec, state["scaler"], state["fraud_model"], "text_clean", amount_col)
+        saved_paths["fraud_pipeline"] = os.path.join(models_dir, "fraud_pipeline.pkl")
+        joblib.dump(pipe, saved_paths["fraud_pipeline"])
+
+    results = {
+        task: {"progressive_accuracy": (h[0] / h[1]) if h[1] else None, "rows_scored": h[1]}
+        for task, h in state["progressive"].items() if h[1]
+    }
+    run_meta = {
+        "run_id": datetime.utcnow().isoformat() + "Z",
+        "mode": "out_of_core",
+        "data_path": data_path,
+        "rows_seen": state["rows_seen"],
+        "chunks": state["chunks_done"],
+        "n_features": n_features,
+        "idf": use_idf,
+        "model": model,
+        "saved_paths": saved_paths,
+        "results": results,
+    }
+    with open(os.path.join(output_dir, "logs", "run_metadata.json"), "w") as fh:
+        json.dump(run_meta, fh, indent=2)
+    if os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+    return run_meta
@@ -2,6 +2,7 @@
 Unified API Gateway for GHCI system
 Combines backend, integration, and ML services
 """
+import os
 import sys
 import logging
 import traceback
@@ -38,8 +39,10 @@ simulator = None
 from api.routers.predict_router import router as predict_router
 from api.routers.forecast_router import router as forecast_router
 from api.routers.simulate_router import router as simulate_router
-from api.routers.feedback_router import router as feedback_router
+from api.routers.feedback_router import router as feedback_router, backend_feedback_writer
 from api.routers.health_router import router as health_router
+from api.routers.monitoring_router import router as monitoring_router
+from api.routers.profile_router import router as profile_router
 
 # Import routers from integration
 from integration.api.endpoints.ingestion_routes import router as ingestion_router
@@ -49,10 +52,14 @@ from integration.api.endpoints.feedback_routes import router as integration_feed
 
 # Import core services
 from models.predict import ModelPredictor
+from models.shared_hosting import SharedModelPredictor, prepare_shared_models
 from models.model_dummy_loader import dummy_predict
 from coordinator.coordinator_engine import CoordinatorEngine
 from coordinator.scenario_simulator import ScenarioSimulator
 from db.db_config import Database
+from services.forecast_engine import ForecastCache
+from integration.pipelines.feedback_queue import FeedbackQueue, close_feedback_queue
+from ML.monitoring import PredictionMonitor, load_reference
 
 
 def initialize_services():
@@ -63,13 +70,22 @@ def initialize_services():
         'predictor': None,
         'db': None,
         'coordinator': None,
-        'simulator': None
+        'simulator': None,
+        'forecast_cache': None,
+        'feedback_queue': None,
+        'prediction_monitor': None
     }
     
     # Initialize predictor
     logger.info("🤖 Loading ML models...")
     try:
-        predictor_obj = ModelPredictor()
+        if config.MODEL_HOSTING == "shared":
+            # new versions are loaded, canary-warmed and swapped in by a watcher thread
+            predictor_obj = SharedModelPredictor(str(config.MODEL_STORE_DIR), check_interval=None)
+            predictor_obj.start_watching(config.MODEL_POLL_INTERVAL)
+            logger.info(f"✅ Attached to shared model version {predictor_obj.version}")
+        else:
+            predictor_obj = ModelPredictor()
         def predictor_fn_inner(text: str):
             """Predictor function for coordinator (returns tuple)"""
             try:
@@ -97,6 +113,16 @@ def initialize_services():
         logger.error(f"❌ Database connection failed: {e}")
         db = None
     
+    # Write-behind feedback: journaled on submit, batch-inserted by a flusher thread
+    try:
+        services['feedback_queue'] = FeedbackQueue(
+            str(config.FEEDBACK_JOURNAL_PATH), backend_feedback_writer(db) if db else None,
+            worker_id=str(os.getpid()),
+        ).start()
+        logger.info(f"✅ Feedback queue ready ({services['feedback_queue'].pending()} replayed from journal)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not start feedback queue: {e}")
+    
     # Initialize coordinator
     logger.info("🎯 Initializing coordinator...")
     try:
@@ -110,6 +136,32 @@ def initialize_services():
         coordinator = None
         simulator = None
     
+    # Load nightly-fitted forecasts (refreshed by services/forecast_engine.py)
+    try:
+        services['forecast_cache'] = ForecastCache.load(str(config.FORECAST_CACHE_PATH))
+        logger.info(f"✅ Forecast cache loaded ({len(services['forecast_cache'].states)} users)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load forecast cache: {e}")
+    
+    # Streaming prediction monitoring: served predictions plus new lines of the prediction log
+    try:
+        services['prediction_monitor'] = PredictionMonitor.load(
+            str(config.MONITOR_STATE_PATH), str(config.PREDICTION_LOG_PATH),
+            load_reference(str(config.MONITOR_REFERENCE_PATH)), bucket_seconds=config.MONITOR_BUCKET_SECONDS,
+            read_only=True)
+        logger.info(f"✅ Prediction monitor ready ({services['prediction_monitor'].totals.n} predictions so far)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load prediction monitor: {e}")
+    
+    # Nightly behaviour profiles (refreshed by services/behaviour_engine.py, re-read when the file changes)
+    if coordinator is not None:
+        coordinator.behaviour.profile_path = str(config.BEHAVIOUR_PROFILES_PATH)
+        try:
+            if coordinator.behaviour.refresh_profiles():
+                logger.info(f"✅ Behaviour profiles loaded ({len(coordinator.behaviour.profile_store)} users)")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load behaviour profiles: {e}")
+    
     return services
 
 
@@ -127,6 +179,9 @@ async def lifespan(app: FastAPI):
         app.state.coordinator = services['coordinator']
         app.state.simulator = services['simulator']
         app.state.db = services['db']
+        app.state.forecast_cache = services['forecast_cache']
+        app.state.feedback_queue = services['feedback_queue']
+        app.state.prediction_monitor = services['prediction_monitor']
         app.state.config = config
         if services['predictor'] and services['predictor'] != dummy_predict:
             app.state.predictor_obj = services['predictor']
@@ -141,12 +196,20 @@ async def lifespan(app: FastAPI):
         app.state.coordinator = None
         app.state.simulator = None
         app.state.db = None
+        app.state.forecast_cache = None
+        app.state.feedback_queue = None
+        app.state.prediction_monitor = None
         app.state.config = config
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down GHCI API Gateway...")
+    if isinstance(predictor_obj, SharedModelPredictor):
+        predictor_obj.stop_watching()
+    if getattr(app.state, 'feedback_queue', None) is not None:
+        app.state.feedback_queue.close()
+    close_feedback_queue()
 
 
 app = FastAPI(
@@ -172,6 +235,8 @@ try:
     app.include_router(simulate_router, prefix="/api/v1", tags=["Simulation"])
     app.include_router(feedback_router, prefix="/api/v1", tags=["Feedback"])
     app.include_router(health_router, prefix="/api/v1", tags=["Health"])
+    app.include_router(monitoring_router, prefix="/api/v1", tags=["Monitoring"])
+    app.include_router(profile_router, prefix="/api/v1", tags=["Behaviour"])
     logger.info("✅ Backend routers mounted")
 except Exception as e:
     logger.error(f"❌ Failed to mount backend routers: {e}")
@@ -289,12 +354,17 @@ async def system_status():
 
 if __name__ == "__main__":
     try:
+        if config.MODEL_HOSTING == "shared":
+            # Publish/pre-fault models once here; workers only attach to the mapped files
+            version = prepare_shared_models(str(config.MODEL_STORE_DIR), str(Path(__file__).parent / "backend" / "models"))
+            logger.info(f"📦 Shared model store ready (version {version})")
         logger.info(f"🚀 Starting server on {config.BACKEND_PORT}...")
         uvicorn.run(
             "api_gateway:app",
             host="0.0.0.0",
             port=config.BACKEND_PORT,
             reload=config.DEBUG,
+            workers=None if config.DEBUG else config.WORKERS,
             log_level="info"
         )
     except KeyboardInterrupt:
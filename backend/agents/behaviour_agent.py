@@ -1,14 +1,43 @@
-from typing import List, Dict, Any
-from sklearn.cluster import KMeans
+from typing import List, Dict, Any, Optional
+import os
 import numpy as np
 
+from services.behaviour_engine import DEFAULT_PROFILE, ProfileStore, label_profile, trend_slopes
+from services.forecast_engine import month_index
+from agents.spending_agent import MONTH_RE
+
 class BehaviourAgent:
-    def __init__(self):
-        pass
+    def __init__(self, profile_store: Optional[ProfileStore] = None, trend_window: int = 6, profile_path: Optional[str] = None):
+        # profiles for the whole user base are precomputed nightly by services.behaviour_engine;
+        # with a profile_path the store is re-read whenever that job rewrites the file
+        self.profile_store = profile_store
+        self.profile_path = profile_path
+        self.trend_window = trend_window
+        self._profile_mtime = None
+
+    def refresh_profiles(self) -> bool:
+        """Load ``profile_path`` when it is new or has changed since the last load."""
+        if not self.profile_path or not os.path.exists(self.profile_path):
+            return False
+        mtime = os.path.getmtime(self.profile_path)
+        if mtime == self._profile_mtime:
+            return False
+        self.profile_store = ProfileStore.load(self.profile_path)
+        self._profile_mtime = mtime
+        return True
 
-    def infer_profile(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        # Very small unsupervised cluster on category spends to classify behaviour
-        # For prototype: compute simple heuristics
+    def get_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        self.refresh_profiles()
+        if self.profile_store is None:
+            return None
+        return self.profile_store.get(user_id)
+
+    def infer_profile(self, transactions: List[Dict[str, Any]], user_id: Optional[int] = None) -> Dict[str, Any]:
+        if user_id is not None:
+            stored = self.get_profile(user_id)
+            if stored is not None:
+                return stored
+        # Same rules the batch engine applies to cluster centres, on this one spend vector
         by_cat = {}
         for t in transactions:
             cat = t.get('predicted_category') or t.get('category') or 'Unknown'
@@ -19,25 +48,34 @@ class BehaviourAgent:
         sorted_cats = sorted(by_cat.items(), key=lambda x: x[1], reverse=True)
         top = [c for c,_ in sorted_cats[:3]]
         total = sum(by_cat.values())
-        impulsive_score = 0.0
-        if 'Shopping' in by_cat and (by_cat['Shopping']/total) > 0.3:
-            impulsive_score = 0.7
-        profile = 'Budget-conscious'
-        if impulsive_score > 0.5:
-            profile = 'Impulsive'
-        elif 'Dining' in by_cat and (by_cat['Dining']/total) > 0.25:
-            profile = 'Social Spender'
+        shares = {c: v / total for c, v in by_cat.items()} if total else {}
+        impulsive_score = 0.7 if shares.get('Shopping', 0.0) > 0.3 else 0.0
+        profile = label_profile(shares) if shares else DEFAULT_PROFILE
         return {'profile': profile, 'top_categories': top, 'impulsive_score': impulsive_score}
 
     def detect_trends(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        # Simple month-to-month trend detection per category
-        trends = {}
-        # Expect date in YYYY-MM-DD
+        # Monthly totals per category plus the least-squares slope over the trailing window
         per_month_cat = {}
         for t in transactions:
             date = t.get('date','')[:7] if t.get('date') else 'unknown'
             cat = t.get('predicted_category') or t.get('category') or 'Unknown'
             per_month_cat.setdefault((date,cat), 0.0)
             per_month_cat[(date,cat)] += abs(float(t.get('amount',0)))
-        # produce trend lines for top categories
-        return {'trends_sample': dict(list(per_month_cat.items())[:10])}
\ No newline at end of file
+
+        dated = [(month_index(m), c, v) for (m, c), v in per_month_cat.items() if MONTH_RE.match(m)]
+        slopes = {}
+        if dated:
+            categories = sorted({c for _, c, _ in dated})
+            cat_pos = {c: i for i, c in enumerate(categories)}
+            m = np.array([d[0] for d in dated])
+            t = m - (m.max() - self.trend_window + 1)
+            recent = t >= 0
+            cols = np.array([cat_pos[d[1]] for d in dated])[recent]
+            y = np.array([d[2] for d in dated])[recent]
+            s = trend_slopes(np.zeros(len(y), dtype=int), cols, t[recent].astype(float), y, (1, len(categories)), self.trend_window)
+            slopes = {categories[c]: round(float(v), 2) for c, v in zip(s.indices, s.data)}
+        return {
+            'trends_sample': dict(list(per_month_cat.items())[:10]),
+            'slopes': slopes,
+            'rising': sorted([c for c, v in slopes.items() if v > 0], key=lambda c: -slopes[c]),
+        }
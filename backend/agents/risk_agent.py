@@ -1,32 +1,53 @@
 from typing import List, Dict, Any
+import numpy as np
+
+RISK_STRESS = {'low': 0.1, 'medium': 0.5, 'high': 0.9}
+
+
+def classify_risk(income: np.ndarray, expense: np.ndarray, threshold: float = 0.2) -> np.ndarray:
+    """Risk label per row from income and expense totals over the same period."""
+    income = np.asarray(income, dtype=float)
+    expense = np.asarray(expense, dtype=float)
+    ratio = np.divide(expense, income, out=np.zeros(income.shape), where=income > 0)
+    high = ((income == 0) & (expense > 0)) | ((income > 0) & (ratio > 1 + threshold))
+    medium = ~high & (income > 0) & (ratio > 1.0)
+    return np.where(high, 'high', np.where(medium, 'medium', 'low'))
+
 
 class RiskAgent:
     def __init__(self):
         pass
 
     def predict_cashflow_gap(self, transactions: List[Dict[str, Any]], threshold: float = 0.2) -> Dict[str, Any]:
-        # simplistic risk: checks if upcoming month predicted spending > avg_income * (1 + threshold)
+        # risk: expenses over the period compared with income over the same period
         incomes = [float(t['amount']) for t in transactions if t.get('type') == 'credit']
         expenses = [float(t['amount']) for t in transactions if t.get('type') == 'debit']
         total_income = sum(incomes) if incomes else 0.0
-        avg_expense = (sum(expenses)/len(expenses)) if expenses else 0.0
-        risk = 'low'
-        reason = ''
-        if total_income == 0 and avg_expense > 0:
-            risk = 'high'
+        total_expense = sum(expenses) if expenses else 0.0
+        avg_expense = (total_expense/len(expenses)) if expenses else 0.0
+        risk = str(classify_risk([total_income], [total_expense], threshold)[0])
+        if risk == 'high' and total_income == 0:
             reason = 'No recent income found but there are expenses.'
-        elif total_income > 0 and avg_expense/total_income > (1 + threshold):
-            risk = 'high'
-            reason = f'expense to income ratio too high: {avg_expense/total_income:.2f}'
-        elif total_income > 0 and avg_expense/total_income > 1.0:
-            risk = 'medium'
+        elif risk == 'high':
+            reason = f'expense to income ratio too high: {total_expense/total_income:.2f}'
+        elif risk == 'medium':
             reason = 'monthly expenses slightly exceed income.'
         else:
             reason = 'income sufficient for recent expense levels.'
-        return {'risk': risk, 'reason': reason, 'total_income': total_income, 'avg_expense': avg_expense}
+        return {'risk': risk, 'reason': reason, 'total_income': total_income,
+                'total_expense': total_expense, 'avg_expense': avg_expense}
 
     def stress_score(self, profile: Dict[str, Any]) -> float:
         # compute a normalized stress score 0-1 from simple heuristics
         risk = profile.get('risk', 'low')
-        mapping = {'low': 0.1, 'medium': 0.5, 'high': 0.9}
-        return mapping.get(risk, 0.1)
\ No newline at end of file
+        return RISK_STRESS.get(risk, 0.1)
+
+    def score_batch(self, features: Dict[str, np.ndarray], window: int = 0, threshold: float = 0.2) -> Dict[str, np.ndarray]:
+        """Vectorized risk and stress_score for many users.
+
+        ``features`` are the (users x windows) arrays from compute_risk_features; ``window``
+        selects the column the labels are computed on (0 = 30 days by default).
+        """
+        risk = classify_risk(features['income'][:, window], features['expense'][:, window], threshold)
+        stress = np.select([risk == 'high', risk == 'medium'], [RISK_STRESS['high'], RISK_STRESS['medium']], RISK_STRESS['low'])
+        return {'risk': risk, 'stress_score': stress}
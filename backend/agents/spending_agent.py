@@ -1,13 +1,19 @@
 from typing import List, Dict, Any
+import re
 import numpy as np
 from collections import defaultdict
 
+from services.forecast_engine import ForecastEngine, MODELS, build_monthly_matrix, month_label
+
+MONTH_RE = re.compile(r'^\d{4}-\d{2}')
+
 class SpendingAgent:
     """Responsible for categorisation orchestration, summaries and simple forecasting."""
 
     def __init__(self, predictor):
         # predictor: callable(text)->(category, confidence)
         self.predict = predictor
+        self.forecast_engine = ForecastEngine()
 
     def categorize_transaction(self, txn: Dict[str, Any]) -> Dict[str, Any]:
         text = txn.get('merchant_name') or txn.get('description') or ''
@@ -27,24 +33,28 @@ class SpendingAgent:
         return {'total_spent': total, 'by_category': dict(summary)}
 
     def forecast_cashflow(self, transactions: List[Dict[str, Any]], months: int = 3) -> Dict[str, Any]:
-        # naive forecast: monthly average by category
-        # expecting transactions that include 'date' and 'amount'
-        # This is simple and meant to be replaced by more complex forecasting later.
-        monthly = defaultdict(list)
+        # monthly spending series (credits excluded) forecast with the vectorized engine;
+        # cached per-user forecasts are served by the /forecast router via ForecastCache
+        rows = []
         for t in transactions:
-            # bucket by YYYY-MM
             date = t.get('date') or ''
-            month = date[:7] if len(date) >= 7 else 'unknown'
-            monthly[month].append(float(t.get('amount', 0.0)))
-        if not monthly:
+            if t.get('type') == 'credit' or not MONTH_RE.match(date):
+                continue
+            rows.append((0, date[:7], float(t.get('amount', 0.0))))
+        if not rows:
             return {'forecast': []}
-        # average per month
-        vals = [sum(v)/len(v) for v in monthly.values() if len(v) > 0]
-        avg = float(np.mean(vals)) if vals else 0.0
-        forecast = [{'month_offset': i+1, 'predicted_spending': round(avg,2)} for i in range(months)]
-        return {'forecast': forecast}
+        _, start, Y = build_monthly_matrix(rows)
+        fitted, values = self.forecast_engine.fit_forecast(Y, months, start=start)
+        last = int(fitted['last_month'][0])
+        forecast = [{'month_offset': i+1, 'month': month_label(last + i + 1), 'predicted_spending': round(float(v), 2)}
+                    for i, v in enumerate(values[0])]
+        return {'forecast': forecast, 'model': MODELS[int(fitted['model'][0])]}
 
     def detect_anomalies(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Rows coming from the integration layer already carry is_anomaly, set at ingestion
+        # time from streaming per-user statistics; no need to rescan the history here.
+        if transactions and all('is_anomaly' in t for t in transactions):
+            return [{**t, 'anomaly': True} for t in transactions if t.get('is_anomaly')]
         # Simple z-score anomaly detection over amounts
         amounts = [float(t.get('amount', 0.0)) for t in transactions]
         if len(amounts) < 2:
@@ -1,6 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
 
@@ -10,29 +10,77 @@ class FeedbackRequest(BaseModel):
     predicted_category: str
     user_corrected_category: str
     confidence_score: float
+    user_id: Optional[int] = None
 
-@router.post('/feedback')
-async def feedback(req: FeedbackRequest):
-    from fastapi import FastAPI
-    app = FastAPI.get_current()
-    # store in DB or append to file
-    db = app.state.db
-    # for prototype, append to feedback_logs table
-    try:
-        sess = db.get_session()
+_fallback_queue = None
+
+def backend_feedback_writer(db):
+    """Flush function for FeedbackQueue: one bulk insert into the backend feedback_logs table per batch"""
+    def flush(items: List[Dict[str, Any]]):
         from db.orm_models import FeedbackLog
-        fl = FeedbackLog(
-            transaction_id=req.transaction_id,
-            merchant_name=req.merchant_name,
-            predicted_category=req.predicted_category,
-            user_corrected_category=req.user_corrected_category,
-            confidence_score=req.confidence_score
-        )
-        sess.add(fl)
-        sess.commit()
-    except Exception as e:
-        # fallback to file-based logging
-        import json
-        with open('feedback_log.json','a') as f:
-            f.write(json.dumps(req.dict())+'\n')
-    return {'status':'ok'}
\ No newline at end of file
+        sess = db.get_session()
+        try:
+            sess.bulk_insert_mappings(FeedbackLog, [
+                {
+                    'transaction_id': str(it['transaction_id']),
+                    'merchant_name': it.get('merchant_name'),
+                    'predicted_category': it.get('predicted_category'),
+                    'user_corrected_category': it['corrected_category'],
+                    'confidence_score': it.get('confidence_score'),
+                }
+                for it in items
+            ])
+            sess.commit()
+        except Exception:
+            sess.rollback()
+            raise
+        finally:
+            sess.close()
+    return flush
+
+def _get_queue(request: Request):
+    """The app's write-behind queue; without one (no DB), corrections are only journaled"""
+    global _fallback_queue
+    queue = getattr(request.app.state, 'feedback_queue', None)
+    if queue is None:
+        if _fallback_queue is None:
+            from integration.pipelines.feedback_queue import FeedbackQueue
+            _fallback_queue = FeedbackQueue('feedback_log.json')
+        queue = _fallback_queue
+    return queue
+
+def _to_item(req: FeedbackRequest) -> Dict[str, Any]:
+    return {
+        'transaction_id': req.transaction_id,
+        'merchant_name': req.merchant_name,
+        'predicted_category': req.predicted_category,
+        'corrected_category': req.user_corrected_category,
+        'confidence_score': req.confidence_score,
+        'user_id': req.user_id,
+    }
+
+def _learn_merchants(request: Request, items: List[FeedbackRequest]):
+    """Corrections apply right away as overrides for the correcting user only.
+
+    They go to the shared overrides log, so every worker applies them within its index's
+    check interval and they survive restarts. Global merchant entries come from the nightly
+    rebuild, which needs several users to agree.
+    """
+    index = getattr(getattr(request.app.state, 'predictor_obj', None), 'merchant_index', None)
+    if index is not None:
+        for r in items:
+            if r.user_id is not None:
+                index.record_override(r.user_id, r.merchant_name, r.user_corrected_category)
+
+@router.post('/feedback')
+async def feedback(req: FeedbackRequest, request: Request):
+    # journaled immediately; written to feedback_logs in batches by the queue's flusher
+    seq = _get_queue(request).submit_many([_to_item(req)])[0]
+    _learn_merchants(request, [req])
+    return {'status': 'ok', 'seq': seq}
+
+@router.post('/feedback/bulk')
+async def feedback_bulk(items: List[FeedbackRequest], request: Request):
+    seqs = _get_queue(request).submit_many([_to_item(r) for r in items])
+    _learn_merchants(request, items)
+    return {'status': 'ok', 'count': len(seqs)}
@@ -1,17 +1,29 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from services.forecast_engine import category_key
 
 router = APIRouter()
 
 class ForecastRequest(BaseModel):
-    transactions: List[Dict[str, Any]]
+    transactions: List[Dict[str, Any]] = []
     months: int = 3
+    user_id: Optional[int] = None
+    category: Optional[str] = None
 
 @router.post('/forecast')
-async def forecast(req: ForecastRequest):
-    from fastapi import FastAPI
-    app = FastAPI.get_current()
-    coordinator = app.state.coordinator
+async def forecast(req: ForecastRequest, request: Request):
+    # serve the nightly-fitted forecast when we have one for this user
+    cache = getattr(request.app.state, 'forecast_cache', None)
+    if req.user_id is not None and cache is not None:
+        cache.reload_if_changed()  # picks up the nightly refresh without a restart
+        key = category_key(req.user_id, req.category) if req.category else req.user_id
+        cached = cache.forecast(key, req.months)
+        if cached is not None:
+            return {**cached, 'source': 'cache'}
+    coordinator = getattr(request.app.state, 'coordinator', None)
+    if coordinator is None:
+        raise HTTPException(status_code=503, detail='Coordinator not initialised')
     result = coordinator.spending.forecast_cashflow(req.transactions, months=req.months)
     return result
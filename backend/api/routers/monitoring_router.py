@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Request
+
+router = APIRouter()
+
+
+def _monitor(request: Request):
+    monitor = getattr(request.app.state, 'prediction_monitor', None)
+    if monitor is None:
+        raise HTTPException(status_code=503, detail='Prediction monitor not initialised')
+    # fold in whatever was appended to the prediction log since the last call
+    # (workers are read-only: the state file belongs to the ML.monitoring cron job)
+    monitor.sync()
+    return monitor
+
+@router.get('/monitoring/summary')
+async def monitoring_summary(request: Request, buckets: int = 24):
+    """All-time aggregates, the last ``buckets`` time buckets and drift against the training reference"""
+    return _monitor(request).report(buckets)
+
+@router.get('/monitoring/drift')
+async def monitoring_drift(request: Request, buckets: int = 24):
+    """Drift status (ok / warn / alert) over all time and over the last ``buckets`` time buckets"""
+    monitor = _monitor(request)
+    return {'all_time': monitor.drift(), 'recent': monitor.drift(buckets)}
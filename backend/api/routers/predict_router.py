@@ -4,9 +4,16 @@ from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 
+def _observe(request: Request, results):
+    """Feed served predictions to the streaming monitor (via the shared prediction log)"""
+    monitor = getattr(request.app.state, 'prediction_monitor', None)
+    if monitor is not None:
+        monitor.record(results)
+
 class PredictRequest(BaseModel):
     text: str
     amount: Optional[float] = None
+    user_id: Optional[int] = None
 
 class BatchPredictRequest(BaseModel):
     transactions: List[Dict[str, Any]]
@@ -22,7 +29,8 @@ async def predict_transaction(req: PredictRequest, request: Request):
         
         # Check if predictor is a ModelPredictor object
         if hasattr(predictor, 'predict'):
-            result = predictor.predict(req.text, req.amount)
+            result = predictor.predict(req.text, req.amount, req.user_id)
+            _observe(request, [result])
             return {
                 'success': True,
                 'prediction': result,
@@ -58,6 +66,7 @@ async def batch_predict(req: BatchPredictRequest, request: Request):
         # Check if predictor is a ModelPredictor object
         if hasattr(predictor, 'batch_predict'):
             results = predictor.batch_predict(req.transactions)
+            _observe(request, results)
             return {
                 'success': True,
                 'predictions': results,
@@ -178,6 +187,24 @@ async def test_enhanced_prediction(request: Request):
         'model_status': 'enhanced' if hasattr(predictor, '__self__') else 'basic'
     }
 
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None
+
+@router.post('/model/reload')
+async def reload_model(req: ReloadRequest, request: Request):
+    """Activate a registry version (default: re-read CURRENT) and hot-swap it in the background"""
+    predictor = request.app.state.predictor
+    if not hasattr(predictor, 'load'):
+        raise HTTPException(status_code=400, detail='Predictor is not registry-backed (set MODEL_HOSTING=shared)')
+    try:
+        if req.version:
+            from models.shared_hosting import set_current
+            set_current(predictor.store_dir, req.version)
+        predictor.load(req.version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {'success': True, 'loading_version': req.version or predictor.status()['current_pointer']}
+
 @router.get('/model/status')
 async def get_model_status(request: Request):
     """Get current model status and capabilities"""
@@ -192,8 +219,8 @@ async def get_model_status(request: Request):
             'insights_generation': False
         }
         
-        if hasattr(predictor, '__self__'):
-            pred_obj = predictor.__self__
+        pred_obj = predictor.__self__ if hasattr(predictor, '__self__') else predictor
+        if hasattr(pred_obj, 'predict'):
             status.update({
                 'enhanced_features': hasattr(pred_obj, 'predict'),
                 'fraud_detection': hasattr(pred_obj, 'fraud_pipeline') and pred_obj.fraud_pipeline is not None,
@@ -202,6 +229,13 @@ async def get_model_status(request: Request):
                 'category_model': hasattr(pred_obj, 'cat_model') and pred_obj.cat_model is not None,
                 'vectorizer': hasattr(pred_obj, 'vectorizer') and pred_obj.vectorizer is not None
             })
+        # Cascade: stage configuration, per-stage hit rates and latency
+        if hasattr(pred_obj, 'cascade'):
+            status['cascade'] = pred_obj.cascade.status()
+        # Versioned registry (hot reload): active version, pending load, last error
+        if hasattr(pred_obj, 'status') and callable(pred_obj.status):
+            status['registry'] = pred_obj.status()
+            status['model_version'] = status['registry']['active_version']
         
         return status
         
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException, Request
+
+router = APIRouter()
+
+@router.get('/profile/{user_id}')
+async def get_profile(user_id: int, request: Request):
+    """Nightly behaviour profile for a user (built by services/behaviour_engine.py)"""
+    coordinator = getattr(request.app.state, 'coordinator', None)
+    if coordinator is None:
+        raise HTTPException(status_code=503, detail='Coordinator not initialised')
+    profile = coordinator.behaviour.get_profile(user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f'No stored profile for user {user_id}')
+    return {'user_id': user_id, **profile}
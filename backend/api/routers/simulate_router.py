@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from coordinator.scenario_simulator import expand_grid
 
 router = APIRouter()
 
@@ -8,6 +10,23 @@ class SimulateRequest(BaseModel):
     transactions: List[Dict[str, Any]]
     scenario: str
     params: Dict[str, Any] = {}
+    user_id: Optional[int] = None
+
+class ScenarioSpec(BaseModel):
+    scenario: str
+    params: Dict[str, Any] = {}
+
+class ScenarioGrid(BaseModel):
+    # e.g. {'scenario': 'reduce_category', 'params': {'category': 'Dining'}, 'param': 'percent', 'values': [5, 10, 20, 50]}
+    scenario: str
+    param: str
+    values: List[float]
+    params: Dict[str, Any] = {}
+
+class SimulateBatchRequest(BaseModel):
+    transactions: List[Dict[str, Any]]
+    scenarios: List[ScenarioSpec] = []
+    grid: Optional[ScenarioGrid] = None
 
 @router.post('/simulate')
 async def simulate(req: SimulateRequest):
@@ -17,13 +36,29 @@ async def simulate(req: SimulateRequest):
     if req.scenario == 'reduce_category':
         category = req.params.get('category')
         percent = float(req.params.get('percent', 10))
-        return simulator.simulate_category_reduction(req.transactions, category, percent)
+        return simulator.simulate_category_reduction(req.transactions, category, percent, req.user_id)
     if req.scenario == 'income_change':
         delta = float(req.params.get('delta', 0))
-        return simulator.simulate_income_change(req.transactions, delta)
+        return simulator.simulate_income_change(req.transactions, delta, req.user_id)
     if req.scenario == 'reallocate':
         from_cat = req.params.get('from_cat')
         to_cat = req.params.get('to_cat')
         amount = float(req.params.get('amount',0))
-        return simulator.simulate_budget_allocation_change(req.transactions, from_cat, to_cat, amount)
-    raise HTTPException(status_code=400, detail='Unknown scenario')
\ No newline at end of file
+        return simulator.simulate_budget_allocation_change(req.transactions, from_cat, to_cat, amount, req.user_id)
+    raise HTTPException(status_code=400, detail='Unknown scenario')
+
+@router.post('/simulate/batch')
+async def simulate_batch(req: SimulateBatchRequest, request: Request):
+    """Evaluate N scenarios (or a parameter grid) against one transaction set"""
+    simulator = getattr(request.app.state, 'simulator', None)
+    if simulator is None:
+        raise HTTPException(status_code=503, detail='Simulator not initialised')
+    specs = [s.dict() for s in req.scenarios]
+    if req.grid is not None:
+        specs.extend(expand_grid(req.grid.scenario, req.grid.param, req.grid.values, req.grid.params))
+    if not specs:
+        raise HTTPException(status_code=400, detail='No scenarios provided')
+    try:
+        return simulator.simulate_batch(req.transactions, specs)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
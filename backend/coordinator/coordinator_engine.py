@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from agents.spending_agent import SpendingAgent
 from agents.risk_agent import RiskAgent
 from agents.behaviour_agent import BehaviourAgent
@@ -10,7 +10,7 @@ class CoordinatorEngine:
         self.behaviour = BehaviourAgent()
         self.db = db_session
 
-    def run_full_analysis(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def run_full_analysis(self, transactions: List[Dict[str, Any]], user_id: Optional[int] = None) -> Dict[str, Any]:
         # 1. Categorise
         categorized = [self.spending.categorize_transaction(t) for t in transactions]
         # 2. Monthly summary
@@ -22,8 +22,8 @@ class CoordinatorEngine:
         # 5. Risk
         risk = self.risk.predict_cashflow_gap(categorized)
         stress = self.risk.stress_score(risk)
-        # 6. Behaviour
-        profile = self.behaviour.infer_profile(categorized)
+        # 6. Behaviour (nightly stored profile when the user is known)
+        profile = self.behaviour.infer_profile(categorized, user_id)
         trends = self.behaviour.detect_trends(categorized)
         # 7. Aggregate
         return {
@@ -1,10 +1,25 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+from agents.risk_agent import RISK_STRESS, classify_risk
+from agents.spending_agent import MONTH_RE
+from services.forecast_engine import month_index
+
+# Columns of the outcome matrix returned by ScenarioSimulator.simulate_batch
+OUTCOME_COLUMNS = ['total_spent', 'total_income', 'avg_expense', 'forecast_spending', 'stress_score']
+
+
+def expand_grid(scenario: str, param: str, values: List[float], params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Expand a single-parameter sweep (e.g. percent over 5..50) into scenario specs."""
+    base = dict(params or {})
+    return [{'scenario': scenario, 'params': {**base, param: v}} for v in values]
+
 
 class ScenarioSimulator:
     def __init__(self, coordinator):
         self.coordinator = coordinator
 
-    def simulate_category_reduction(self, transactions: List[Dict[str, Any]], category: str, percent: float) -> Dict[str, Any]:
+    def simulate_category_reduction(self, transactions: List[Dict[str, Any]], category: str, percent: float, user_id: Optional[int] = None) -> Dict[str, Any]:
         # reduce all transactions in category by percent and re-run summary/forecast
         modified = []
         for t in transactions:
@@ -16,9 +31,9 @@ class ScenarioSimulator:
                 except Exception:
                     pass
             modified.append(new_t)
-        return self.coordinator.run_full_analysis(modified)
+        return self.coordinator.run_full_analysis(modified, user_id)
 
-    def simulate_income_change(self, transactions: List[Dict[str, Any]], delta: float) -> Dict[str, Any]:
+    def simulate_income_change(self, transactions: List[Dict[str, Any]], delta: float, user_id: Optional[int] = None) -> Dict[str, Any]:
         # apply delta to each credit proportionally
         modified = []
         for t in transactions:
@@ -29,9 +44,9 @@ class ScenarioSimulator:
                 except Exception:
                     pass
             modified.append(new_t)
-        return self.coordinator.run_full_analysis(modified)
+        return self.coordinator.run_full_analysis(modified, user_id)
 
-    def simulate_budget_allocation_change(self, transactions: List[Dict[str, Any]], from_cat: str, to_cat: str, amount: float) -> Dict[str, Any]:
+    def simulate_budget_allocation_change(self, transactions: List[Dict[str, Any]], from_cat: str, to_cat: str, amount: float, user_id: Optional[int] = None) -> Dict[str, Any]:
         # move 'amount' from from_cat to to_cat by adjusting two synthetic transactions
         modified = list(transactions)
         # implement as synthetic adjustments
@@ -39,4 +54,94 @@ class ScenarioSimulator:
         adjustment_to = {'merchant_name': f'Move_to_{to_cat}', 'amount': abs(amount), 'predicted_category': to_cat, 'type': 'debit'}
         modified.append(adjustment_from)
         modified.append(adjustment_to)
-        return self.coordinator.run_full_analysis(modified)
\ No newline at end of file
+        return self.coordinator.run_full_analysis(modified, user_id)
+
+    def simulate_batch(self, transactions: List[Dict[str, Any]], scenarios: List[Dict[str, Any]], threshold: float = 0.2) -> Dict[str, Any]:
+        """Evaluate many scenarios against one transaction set in a single sweep.
+
+        Transactions are categorised once; every scenario then becomes one row of an
+        (S x N) amount matrix and all outcomes are computed with matrix operations.
+        The numbers match what run_full_analysis reports for the single-scenario calls.
+        """
+        categorized = [self.coordinator.spending.categorize_transaction(t) for t in transactions]
+        n = len(categorized)
+        amounts = np.array([float(t.get('amount') or 0.0) for t in categorized], dtype=float)
+        cats = [t.get('predicted_category') or t.get('category') or 'Unknown' for t in categorized]
+        is_credit = np.array([t.get('type') == 'credit' for t in categorized], dtype=bool)
+        is_debit = np.array([t.get('type') == 'debit' for t in categorized], dtype=bool)
+        # monthly spending columns on a contiguous calendar; credits and undated rows are not forecast
+        month_idx = np.array([month_index(t['date']) if t.get('type') != 'credit' and MONTH_RE.match(t.get('date') or '') else -1
+                              for t in categorized], dtype=int)
+
+        # reallocation targets may introduce categories that do not exist yet
+        categories = sorted(set(cats))
+        for spec in scenarios:
+            if spec.get('scenario') == 'reallocate':
+                p = spec.get('params', {})
+                if not p.get('from_cat') or not p.get('to_cat'):
+                    raise ValueError('reallocate requires from_cat and to_cat')
+                for c in (p.get('from_cat'), p.get('to_cat')):
+                    if c not in categories:
+                        categories.append(c)
+        cat_pos = {c: i for i, c in enumerate(categories)}
+        dated = month_idx >= 0
+        start = int(month_idx[dated].min()) if dated.any() else 0
+        n_months = int(month_idx[dated].max()) - start + 1 if dated.any() else 0
+
+        cat_onehot = np.zeros((n, len(categories)))
+        cat_onehot[np.arange(n), [cat_pos[c] for c in cats]] = 1.0
+        month_onehot = np.zeros((n, n_months))
+        month_onehot[np.flatnonzero(dated), month_idx[dated] - start] = 1.0
+        cats_lower = np.array([c.lower() for c in cats], dtype=object)
+
+        # row 0 is the unmodified baseline
+        rows = [{'scenario': 'baseline', 'params': {}}] + list(scenarios)
+        s = len(rows)
+        A = np.tile(amounts, (s, 1))
+        cat_adjust = np.zeros((s, len(categories)))
+        extra_debits = np.zeros(s)
+        for i, spec in enumerate(rows[1:], start=1):
+            name = spec.get('scenario')
+            p = spec.get('params', {})
+            if name == 'reduce_category':
+                mask = cats_lower == str(p.get('category') or '').lower()
+                A[i, mask] *= 1 - float(p.get('percent', 10)) / 100.0
+            elif name == 'income_change':
+                A[i, is_credit] += float(p.get('delta', 0))
+            elif name == 'reallocate':
+                amt = abs(float(p.get('amount', 0)))
+                cat_adjust[i, cat_pos[p.get('from_cat')]] -= amt
+                cat_adjust[i, cat_pos[p.get('to_cat')]] += amt
+                # the two synthetic debits net to zero but still count towards averages
+                extra_debits[i] = 2
+            else:
+                raise ValueError(f'Unknown scenario: {name}')
+
+        by_category = A @ cat_onehot + cat_adjust
+        total_spent = A.sum(axis=1)
+        total_income = (A * is_credit).sum(axis=1)
+        debit_count = is_debit.sum() + extra_debits
+        debit_sum = (A * is_debit).sum(axis=1)
+        avg_expense = np.divide(debit_sum, debit_count, out=np.zeros(s), where=debit_count > 0)
+
+        # every scenario is one more series for the forecast engine
+        forecast = np.zeros(s)
+        if n_months:
+            _, values = self.coordinator.spending.forecast_engine.fit_forecast(A @ month_onehot, 1, start=start)
+            forecast = values[:, 0].round(2)
+
+        risk = classify_risk(total_income, debit_sum, threshold)
+        stress = np.array([RISK_STRESS[r] for r in risk])
+
+        outcomes = np.column_stack([total_spent, total_income, avg_expense, forecast, stress])
+        return {
+            'columns': OUTCOME_COLUMNS,
+            'baseline': dict(zip(OUTCOME_COLUMNS, outcomes[0].tolist())),
+            'baseline_risk': str(risk[0]),
+            'baseline_by_category': by_category[0].tolist(),
+            'scenarios': rows[1:],
+            'outcomes': outcomes[1:].tolist(),
+            'risk': risk[1:].tolist(),
+            'categories': categories,
+            'by_category': by_category[1:].tolist(),
+        }
@@ -1,4 +1,3 @@
-import os
 import sys
 from pathlib import Path
 
@@ -9,18 +8,17 @@ sys.path.append(str(ml_dir))
 from advanced_ml import AdvancedTransactionClassifier
 
 class AdvancedModelPredictor:
-    def __init__(self):
+    def __init__(self, model_dir=None):
         self.classifier = AdvancedTransactionClassifier()
+        self.model_dir = Path(model_dir) if model_dir else ml_dir / "models"
         self._load()
     
     def _load(self):
         """Load the advanced ML models"""
         try:
-            # Try to load from ML/models directory
-            ml_models_path = Path(__file__).parent.parent.parent / "ML" / "models"
-            if ml_models_path.exists():
-                os.chdir(ml_models_path.parent)
-                success = self.classifier.load_models()
+            # Absolute path: never change the process cwd, other workers/threads depend on it
+            if self.model_dir.exists():
+                success = self.classifier.load_models(str(self.model_dir))
                 if success:
                     print("✅ Advanced ML models loaded successfully")
                     return
@@ -39,12 +37,18 @@ class AdvancedModelPredictor:
         return result['category'], result['category_confidence']
     
     def batch_predict(self, transactions):
-        """Batch prediction"""
+        """Batch prediction: the category model runs once per distinct (text, amount bucket)"""
+        from models.predict import amount_bucket, clean_text, dedupe_batch
+        texts = [t.get('text', t.get('description', '')) for t in transactions]
+        amounts = [t.get('amount') for t in transactions]
+        try:
+            groups = dedupe_batch([clean_text(t) for t in texts], amount_bucket(amounts))
+            predictions = self.classifier.predict_batch(texts, amounts, groups=groups)
+        except Exception as e:
+            print(f"Advanced batch prediction error: {e}")
+            predictions = [self.predict(text, amount) for text, amount in zip(texts, amounts)]
         results = []
-        for transaction in transactions:
-            text = transaction.get('text', transaction.get('description', ''))
-            amount = transaction.get('amount')
-            result = self.predict(text, amount)
+        for transaction, result in zip(transactions, predictions):
             result.update(transaction)
             results.append(result)
-        return results
\ No newline at end of file
+        return results
@@ -0,0 +1,152 @@
+"""
+Cascaded inference for ModelPredictor: cheap stages first, the expensive ones only when needed.
+
+Stage 1 (lookup)  merchant index, then high-precision keyword rules (brand tokens that
+                  name exactly one category).
+Stage 2 (model)   the linear category model, for whatever stage 1 left unresolved; low
+                  confidence rows still go to the broad rule fallback.
+Stage 3 (fraud)   the fraud pipeline, only for rows the risk gate escalates: amount at or
+                  above ``fraud_amount``, a token starting with a risk keyword ('fraudulent'
+                  counts as 'fraud'), a category in ``risk_categories`` (Fraud, Suspicious),
+                  or an amount at or above ``review_amount`` on a row that is not a
+                  confidently known merchant. Rows the gate lets through are reported with
+                  ``fraud_stage='skipped'`` and a zero model score.
+
+``CascadeStats`` keeps per-stage row counts, hits and wall time; it is shared across
+hot-swapped model versions and surfaced by /model/status.
+
+Configured from the environment:
+    PREDICT_CASCADE=0                 run every stage for every row (previous behaviour)
+    CASCADE_KEYWORD_RULES=0           no keyword rules in stage 1
+    CASCADE_FRAUD_AMOUNT=25000        always score fraud at or above this amount
+    CASCADE_REVIEW_AMOUNT=2000        score fraud above this unless the merchant is known
+    CASCADE_MIN_CONFIDENCE=0.9        stage-1 confidence that counts as "known"
+    CASCADE_RISK_CATEGORIES=Fraud,Suspicious
+                                      categories that always go to the fraud model
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# brand tokens that identify the category on their own
+KEYWORD_RULES = {
+    **dict.fromkeys(['starbucks', 'swiggy', 'zomato', 'dominos', 'kfc', 'mcdonalds'], 'Dining'),
+    **dict.fromkeys(['amazon', 'flipkart', 'myntra', 'ajio', 'nykaa'], 'Shopping'),
+    **dict.fromkeys(['uber', 'ola', 'rapido', 'irctc'], 'Transportation'),
+    **dict.fromkeys(['netflix', 'hotstar', 'spotify', 'bookmyshow'], 'Entertainment'),
+    **dict.fromkeys(['bigbasket', 'blinkit', 'zepto', 'dmart', 'grofers'], 'Groceries'),
+}
+KEYWORD_CONFIDENCE = 0.9
+
+# matched as token prefixes, so inflections ('fraudulent', 'refunded') and run-together tokens count
+RISK_KEYWORDS = ('unknown', 'suspicious', 'fake', 'fraud', 'scam', 'unauthori', 'refund', 'chargeback')
+RISK_CATEGORIES = frozenset({'Fraud', 'Suspicious'})
+KNOWN_SOURCES = frozenset({'merchant_index', 'user_override', 'keyword_rule'})
+
+STAGES = ('lookup', 'model', 'fallback', 'fraud')
+
+
+def keyword_category(text_clean: str, rules: Dict[str, str] = KEYWORD_RULES) -> Optional[str]:
+    """Category named by the text's brand tokens, or None when there are none or they disagree"""
+    found = {rules[t] for t in text_clean.split() if t in rules}
+    return found.pop() if len(found) == 1 else None
+
+
+def has_risk_keyword(text_clean: str, keywords: Tuple[str, ...] = RISK_KEYWORDS) -> bool:
+    """Whether any token of the text starts with a risk keyword"""
+    return any(t.startswith(keywords) for t in text_clean.lower().split())
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, '1' if default else '0').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+class CascadeStats:
+    """Thread-safe per-stage counters: rows reaching the stage, rows it resolved, seconds spent"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {stage: [0, 0, 0.0] for stage in STAGES}
+
+    def record(self, stage: str, rows: int, hits: int, seconds: float) -> None:
+        if not rows:
+            return
+        with self._lock:
+            c = self._counts[stage]
+            c[0] += rows
+            c[1] += hits
+            c[2] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {stage: list(c) for stage, c in self._counts.items()}
+        out = {}
+        for stage, (rows, hits, seconds) in counts.items():
+            out[stage] = {
+                'rows': rows,
+                'hits': hits,
+                'hit_rate': round(hits / rows, 4) if rows else None,
+                'total_ms': round(seconds * 1000.0, 3),
+                'avg_ms_per_row': round(seconds * 1000.0 / rows, 4) if rows else None,
+            }
+        # for the fraud stage a "hit" is an escalation to the model
+        out['fraud']['skipped'] = counts['fraud'][0] - counts['fraud'][1]
+        return out
+
+
+class Cascade:
+    """Stage configuration plus the stats they feed"""
+
+    def __init__(self, enabled: bool = True, keyword_rules: bool = True, fraud_amount: float = 25000.0,
+                 review_amount: float = 2000.0, min_confidence: float = 0.9, risk_categories: Iterable[str] = RISK_CATEGORIES,
+                 stats: Optional[CascadeStats] = None):
+        self.enabled = enabled
+        self.keyword_rules = keyword_rules
+        self.fraud_amount = fraud_amount
+        self.review_amount = review_amount
+        self.min_confidence = min_confidence
+        self.risk_categories = frozenset(risk_categories)
+        self.stats = stats if stats is not None else CascadeStats()
+
+    @classmethod
+    def from_env(cls) -> 'Cascade':
+        return cls(
+            enabled=_env_flag('PREDICT_CASCADE', True),
+            keyword_rules=_env_flag('CASCADE_KEYWORD_RULES', True),
+            fraud_amount=float(os.getenv('CASCADE_FRAUD_AMOUNT', 25000)),
+            review_amount=float(os.getenv('CASCADE_REVIEW_AMOUNT', 2000)),
+            min_confidence=float(os.getenv('CASCADE_MIN_CONFIDENCE', 0.9)),
+            risk_categories=[c.strip() for c in os.getenv('CASCADE_RISK_CATEGORIES', ','.join(sorted(RISK_CATEGORIES))).split(',')
+                             if c.strip()],
+        )
+
+    def keyword(self, text_clean: str) -> Optional[Tuple[str, float]]:
+        """Stage-1 keyword rule match as (category, confidence)"""
+        if not (self.enabled and self.keyword_rules):
+            return None
+        category = keyword_category(text_clean)
+        return (category, KEYWORD_CONFIDENCE) if category is not None else None
+
+    def escalate(self, text_clean: str, amount: Optional[float], category: Dict[str, Any]) -> bool:
+        """Whether a row with ``amount`` and stage-1/2 ``category`` fields needs the fraud model"""
+        if amount is None:
+            return False
+        if not self.enabled or amount >= self.fraud_amount:
+            return True
+        if category.get('category') in self.risk_categories or has_risk_keyword(text_clean):
+            return True
+        known = (category.get('category_source') in KNOWN_SOURCES
+                 and category.get('category_confidence', 0.0) >= self.min_confidence)
+        return not known and amount >= self.review_amount
+
+    def config(self) -> Dict[str, Any]:
+        return {'enabled': self.enabled, 'keyword_rules': self.keyword_rules, 'fraud_amount': self.fraud_amount,
+                'review_amount': self.review_amount, 'min_confidence': self.min_confidence,
+                'risk_categories': sorted(self.risk_categories)}
+
+    def status(self) -> Dict[str, Any]:
+        return {'config': self.config(), 'stages': self.stats.snapshot()}
@@ -0,0 +1,362 @@
+"""
+Merchant resolution index: normalized description -> category, consulted before the model.
+
+Most transactions come from a few thousand repeat merchants whose category is already
+known, either because a user corrected it (feedback_logs) or because the model keeps
+predicting it with high confidence. For those, a hash lookup replaces vectorizing and
+scoring the text.
+
+Keys are descriptions normalized by ``normalize_merchant`` (lower-cased, reference
+numbers, dates and payment-rail words dropped), hashed to 64 bits. The table is two
+sorted uint64 arrays (global entries and per-user overrides) with parallel category
+codes and confidences, saved as one .npz and searched with ``np.searchsorted``.
+Corrections made since the last build live in a small dict on top and take precedence;
+the API records them per user, and only the nightly build promotes a merchant to a global
+entry once enough users agree. Per-user corrections from the API are also appended to a
+shared overrides log (one JSON line each) that every worker process replays, so they
+apply whichever worker serves the user and survive restarts and rebuilds.
+
+Rebuilt nightly from the integration DB:
+    python backend/models/merchant_index.py --database-url sqlite:///./ghci.db
+An index opened with ``MerchantIndex.open`` re-reads its file when the rebuild replaces it
+and tails the overrides log (checked at most every ``check_interval`` seconds), so serving
+processes pick both up without a restart or a model swap.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# payment-rail and filler tokens that differ between two payments to the same merchant
+NOISE_TOKENS = frozenset({
+    'upi', 'pos', 'neft', 'imps', 'rtgs', 'ach', 'nach', 'ecom', 'txn', 'ref', 'refno', 'payment',
+    'paid', 'to', 'from', 'via', 'by', 'at', 'on', 'the', 'pvt', 'ltd', 'private', 'limited',
+    'india', 'in', 'com', 'www', 'ybl', 'okaxis', 'oksbi', 'okhdfcbank', 'okicici', 'paytm',
+})
+
+USER_OVERRIDE_CONFIDENCE = 0.99
+
+Match = Tuple[str, float, str]  # (category, confidence, 'user' | 'merchant')
+
+
+def normalize_merchant(text: str) -> str:
+    """Stable merchant key for a transaction description ('' when nothing identifying is left)."""
+    text = re.sub(r'[^a-z0-9\s]', ' ', str(text).lower())
+    tokens = [t for t in text.split() if len(t) > 1 and not any(c.isdigit() for c in t) and t not in NOISE_TOKENS]
+    return ' '.join(tokens)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _user_key(user_id, key: str) -> str:
+    return f'{user_id}\x00{key}'
+
+
+def _table(entries: Dict[str, Tuple[str, float]], categories: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hashes = np.fromiter((_hash(k) for k in entries), dtype=np.uint64, count=len(entries))
+    codes = np.array([categories.setdefault(c, len(categories)) for c, _ in entries.values()], dtype=np.int16)
+    conf = np.array([p for _, p in entries.values()], dtype=np.float32)
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], codes[order], conf[order]
+
+
+class MerchantIndex:
+    def __init__(self, categories: Sequence[str] = (), keys=None, codes=None, confidence=None,
+                 user_keys=None, user_codes=None, user_confidence=None):
+        self.categories = list(categories)
+        self.keys = np.asarray(keys if keys is not None else [], dtype=np.uint64)
+        self.codes = np.asarray(codes if codes is not None else [], dtype=np.int16)
+        self.confidence = np.asarray(confidence if confidence is not None else [], dtype=np.float32)
+        self.user_keys = np.asarray(user_keys if user_keys is not None else [], dtype=np.uint64)
+        self.user_codes = np.asarray(user_codes if user_codes is not None else [], dtype=np.int16)
+        self.user_confidence = np.asarray(user_confidence if user_confidence is not None else [], dtype=np.float32)
+        self._overlay: Dict[int, Tuple[str, float]] = {}
+        self._user_overlay: Dict[int, Tuple[str, float]] = {}
+        self.stats = {'lookups': 0, 'hits': 0}
+        self.path: Optional[str] = None
+        self.overrides_path: Optional[str] = None
+        self.check_interval = 5.0
+        self._mtime: Optional[float] = None
+        self._overrides_offset = 0
+        self._checked = 0.0
+
+    def __len__(self):
+        return len(self.keys) + len(self.user_keys) + len(self._overlay) + len(self._user_overlay)
+
+    @classmethod
+    def from_entries(cls, entries: Dict[str, Tuple[str, float]],
+                     user_entries: Optional[Dict[Tuple[object, str], Tuple[str, float]]] = None) -> 'MerchantIndex':
+        """Build from {key: (category, confidence)} and {(user_id, key): (category, confidence)}."""
+        categories: Dict[str, int] = {}
+        keys, codes, conf = _table(entries, categories)
+        user = {_user_key(u, k): v for (u, k), v in (user_entries or {}).items()}
+        user_keys, user_codes, user_conf = _table(user, categories)
+        return cls(list(categories), keys, codes, conf, user_keys, user_codes, user_conf)
+
+    @classmethod
+    def build(cls, feedback: Iterable[Tuple[object, str, str]], predictions: Iterable[Tuple[str, str, int]] = (),
+              min_count: int = 3, min_agreement: float = 0.9) -> 'MerchantIndex':
+        """Index from corrections and confident predictions.
+
+        ``feedback`` is (user_id, description, corrected_category) in feedback order; the
+        latest correction per user and merchant becomes that user's override.
+        ``predictions`` is (description, category, count). A merchant gets a global entry
+        when it has at least ``min_count`` votes and its top category has at least
+        ``min_agreement`` of them. Each user's latest correction is one vote (corrections
+        without a user share one), so one user cannot re-categorize a merchant for everyone.
+        """
+        votes: Dict[str, Counter] = defaultdict(Counter)
+        latest = {}
+        for user_id, text, category in feedback:
+            key = normalize_merchant(text)
+            if key and category:
+                latest[(user_id, key)] = category
+        user_entries = {}
+        for (user_id, key), category in latest.items():
+            votes[key][category] += 1
+            if user_id is not None:
+                user_entries[(user_id, key)] = (category, USER_OVERRIDE_CONFIDENCE)
+        for text, category, count in predictions:
+            key = normalize_merchant(text)
+            if key and category:
+                votes[key][category] += int(count)
+
+        entries = {}
+        for key, counter in votes.items():
+            total = sum(counter.values())
+            category, top = counter.most_common(1)[0]
+            if total >= min_count and top / total >= min_agreement:
+                entries[key] = (category, round(top / total, 4))
+        return cls.from_entries(entries, user_entries)
+
+    @classmethod
+    def open(cls, path: str, overrides_path: Optional[str] = None,
+             check_interval: float = 5.0) -> 'MerchantIndex':
+        """Index backed by ``path`` (empty until the file exists) that follows its rebuilds
+        and the shared per-user ``overrides_path`` log."""
+        index = cls()
+        index.path, index.overrides_path, index.check_interval = path, overrides_path, check_interval
+        index.refresh(force=True)
+        return index
+
+    def refresh(self, force: bool = False) -> bool:
+        """Swap in the file's tables if it changed since they were read, then apply overrides
+        logged since the last check. Returns True if anything changed.
+
+        Pending in-memory corrections are dropped with the old tables; logged overrides are
+        replayed on top of the new ones, other corrections are in the rebuild.
+        """
+        if not (self.path or self.overrides_path):
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        reloaded = False
+        if self.path and os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+            mtime = os.path.getmtime(self.path)
+            fresh = MerchantIndex.load(self.path)
+            (self.categories, self.keys, self.codes, self.confidence,
+             self.user_keys, self.user_codes, self.user_confidence) = (
+                fresh.categories, fresh.keys, fresh.codes, fresh.confidence,
+                fresh.user_keys, fresh.user_codes, fresh.user_confidence)
+            self._overlay, self._user_overlay = {}, {}
+            self._overrides_offset = 0
+            self._mtime = mtime
+            reloaded = True
+        return self._read_overrides() > 0 or reloaded
+
+    def _read_overrides(self) -> int:
+        """Apply complete lines appended to the overrides log since the last read."""
+        if not self.overrides_path or not os.path.exists(self.overrides_path):
+            return 0
+        if os.path.getsize(self.overrides_path) < self._overrides_offset:
+            # log was rotated: replay it from the start
+            self._overrides_offset = 0
+            self._user_overlay = {}
+        with open(self.overrides_path, 'rb') as fh:
+            fh.seek(self._overrides_offset)
+            chunk = fh.read()
+        end = chunk.rfind(b'\n') + 1
+        count = 0
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                count += self.add(entry['text'], entry['category'], user_id=entry['user_id'])
+        self._overrides_offset += end
+        return count
+
+    # -- lookups ---------------------------------------------------------------
+    def _search(self, keys: np.ndarray, codes: np.ndarray, conf: np.ndarray, h: int) -> Optional[Tuple[str, float]]:
+        i = int(np.searchsorted(keys, np.uint64(h)))
+        if i < len(keys) and keys[i] == np.uint64(h):
+            return self.categories[int(codes[i])], round(float(conf[i]), 4)
+        return None
+
+    def lookup(self, text: str, user_id=None) -> Optional[Match]:
+        """(category, confidence, source) for a known merchant, else None. User overrides win."""
+        self.refresh()
+        self.stats['lookups'] += 1
+        key = normalize_merchant(text)
+        if not key:
+            return None
+        if user_id is not None:
+            h = _hash(_user_key(user_id, key))
+            hit = self._user_overlay.get(h) or self._search(self.user_keys, self.user_codes, self.user_confidence, h)
+            if hit:
+                self.stats['hits'] += 1
+                return hit[0], hit[1], 'user'
+        h = _hash(key)
+        hit = self._overlay.get(h) or self._search(self.keys, self.codes, self.confidence, h)
+        if hit:
+            self.stats['hits'] += 1
+            return hit[0], hit[1], 'merchant'
+        return None
+
+    def lookup_many(self, texts: Sequence[str], user_ids: Optional[Sequence] = None) -> List[Optional[Match]]:
+        """``lookup`` over a batch; the sorted tables are searched once per batch."""
+        self.refresh()
+        n = len(texts)
+        keys = [normalize_merchant(t) for t in texts]
+        out: List[Optional[Match]] = [None] * n
+        self.stats['lookups'] += n
+
+        def resolve(hashes, table_keys, table_codes, table_conf, overlay, source, rows):
+            pos = np.searchsorted(table_keys, hashes)
+            for j, i in enumerate(rows):
+                hit = overlay.get(int(hashes[j]))
+                if hit is None and pos[j] < len(table_keys) and table_keys[pos[j]] == hashes[j]:
+                    hit = self.categories[int(table_codes[pos[j]])], round(float(table_conf[pos[j]]), 4)
+                if hit:
+                    out[i] = (hit[0], hit[1], source)
+
+        if user_ids is not None:
+            rows = [i for i in range(n) if keys[i] and user_ids[i] is not None]
+            hashes = np.array([_hash(_user_key(user_ids[i], keys[i])) for i in rows], dtype=np.uint64)
+            resolve(hashes, self.user_keys, self.user_codes, self.user_confidence, self._user_overlay, 'user', rows)
+        rows = [i for i in range(n) if keys[i] and out[i] is None]
+        hashes = np.array([_hash(keys[i]) for i in rows], dtype=np.uint64)
+        resolve(hashes, self.keys, self.codes, self.confidence, self._overlay, 'merchant', rows)
+        self.stats['hits'] += sum(m is not None for m in out)
+        return out
+
+    # -- updates ---------------------------------------------------------------
+    def add(self, text: str, category: str, user_id=None, confidence: float = USER_OVERRIDE_CONFIDENCE) -> bool:
+        """Record a correction now (kept in memory until the next ``save``/rebuild)."""
+        key = normalize_merchant(text)
+        if not key or not category:
+            return False
+        if user_id is None:
+            self._overlay[_hash(key)] = (category, float(confidence))
+        else:
+            self._user_overlay[_hash(_user_key(user_id, key))] = (category, float(confidence))
+        return True
+
+    def record_override(self, user_id, text: str, category: str) -> bool:
+        """``add`` a user's correction and append it to the shared overrides log, if any."""
+        if not self.add(text, category, user_id=user_id):
+            return False
+        if self.overrides_path:
+            os.makedirs(os.path.dirname(self.overrides_path) or '.', exist_ok=True)
+            line = json.dumps({'user_id': user_id, 'text': text, 'category': category}) + '\n'
+            # one O_APPEND write per line, so lines from concurrent workers never interleave
+            with open(self.overrides_path, 'a', encoding='utf-8') as fh:
+                fh.write(line)
+        return True
+
+    def _merged(self, keys, codes, conf, overlay):
+        if not overlay:
+            return keys, codes, conf
+        code_of = {c: i for i, c in enumerate(self.categories)}
+        new_keys = np.fromiter(overlay.keys(), dtype=np.uint64, count=len(overlay))
+        new_codes = np.array([code_of.setdefault(c, len(code_of)) for c, _ in overlay.values()], dtype=np.int16)
+        new_conf = np.array([p for _, p in overlay.values()], dtype=np.float32)
+        self.categories = list(code_of)
+        keep = ~np.isin(keys, new_keys)
+        keys = np.concatenate([keys[keep], new_keys])
+        order = np.argsort(keys, kind='stable')
+        return keys[order], np.concatenate([codes[keep], new_codes])[order], np.concatenate([conf[keep], new_conf])[order]
+
+    def save(self, path: str) -> None:
+        """Fold pending corrections into the sorted tables and write them atomically."""
+        self.keys, self.codes, self.confidence = self._merged(self.keys, self.codes, self.confidence, self._overlay)
+        self.user_keys, self.user_codes, self.user_confidence = self._merged(
+            self.user_keys, self.user_codes, self.user_confidence, self._user_overlay)
+        self._overlay, self._user_overlay = {}, {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, categories=np.array(self.categories, dtype=str), keys=self.keys, codes=self.codes,
+                 confidence=self.confidence, user_keys=self.user_keys, user_codes=self.user_codes,
+                 user_confidence=self.user_confidence)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'MerchantIndex':
+        with np.load(path) as z:
+            return cls(z['categories'].tolist(), z['keys'], z['codes'], z['confidence'],
+                       z['user_keys'], z['user_codes'], z['user_confidence'])
+
+
+def load_merchant_rows(session, min_confidence: float = 0.9):
+    """(feedback, predictions) inputs for ``MerchantIndex.build`` from the integration DB.
+
+    Predictions are grouped per description in SQL; rows whose final category disagrees
+    with the prediction are left out (their correction is already in the feedback).
+    """
+    from sqlalchemy import func, or_, select
+    from integration.db.models import Account, FeedbackLog, Transaction
+
+    description = func.coalesce(func.nullif(Transaction.description_clean, ''), Transaction.description_raw, '')
+    feedback = session.execute(
+        select(Account.user_id, description, FeedbackLog.corrected_category)
+        .join(Transaction, Transaction.transaction_id == FeedbackLog.transaction_id)
+        .join(Account, Account.account_id == Transaction.account_id)
+        .where(FeedbackLog.corrected_category.isnot(None))
+        .order_by(FeedbackLog.feedback_id)
+    ).all()
+    predictions = session.execute(
+        select(description, Transaction.category_pred, func.count())
+        .where(
+            Transaction.category_pred.isnot(None),
+            Transaction.ml_confidence >= min_confidence,
+            or_(Transaction.category_final.is_(None), Transaction.category_final == Transaction.category_pred),
+        )
+        .group_by(description, Transaction.category_pred)
+    ).all()
+    return feedback, predictions
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(description='Build the merchant resolution index')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///./ghci.db'))
+    p.add_argument('--output', default=os.getenv('MERCHANT_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'merchant_index.npz')))
+    p.add_argument('--min-confidence', type=float, default=0.9, help='Minimum ml_confidence for a prediction to vote')
+    p.add_argument('--min-count', type=int, default=3, help='Minimum votes for a global merchant entry')
+    p.add_argument('--min-agreement', type=float, default=0.9, help='Minimum share of votes for the top category')
+    args = p.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        feedback, predictions = load_merchant_rows(session, args.min_confidence)
+    finally:
+        session.close()
+    index = MerchantIndex.build(feedback, predictions, args.min_count, args.min_agreement)
+    index.save(args.output)
+    print(f'Indexed {len(index.keys)} merchants and {len(index.user_keys)} user overrides -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,26 @@
 import os
 import re
+import json
+import time
 import numpy as np
 import pandas as pd
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 import joblib
+from scipy import sparse
+
+from models.cascade import Cascade
+from models.merchant_index import MerchantIndex
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'cat_model.pkl')
 VECT_PATH = os.path.join(os.path.dirname(__file__), 'vectorizer.pkl')
 FRAUD_PATH = os.path.join(os.path.dirname(__file__), 'fraud_pipeline.pkl')
+# Compact export (ML/export_compact.py); preferred over the pickles when present
+COMPACT_DIR = os.path.join(os.path.dirname(__file__), 'compact')
+COMPACT_FORMAT = 'ghci-compact'
+# Merchant resolution index (models/merchant_index.py); checked before the category model
+MERCHANT_INDEX_PATH = os.getenv('MERCHANT_INDEX_PATH', os.path.join(os.path.dirname(__file__), 'merchant_index.npz'))
+# Per-user corrections from the feedback API, shared by all worker processes
+MERCHANT_OVERRIDES_PATH = os.getenv('MERCHANT_OVERRIDES_PATH', os.path.join(os.path.dirname(__file__), 'merchant_overrides.jsonl'))
 
 def clean_text(text: str) -> str:
     """Enhanced text cleaning for Indian context"""
@@ -16,6 +29,38 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+# Amount buckets for batch de-duplication when a model's category depends on the amount
+AMOUNT_BUCKET_EDGES = np.array([100, 500, 1000, 5000, 10000, 25000, 50000, 100000, 200000], dtype=float)
+
+def amount_bucket(amounts, edges: np.ndarray = AMOUNT_BUCKET_EDGES) -> np.ndarray:
+    """Bucket index per amount (missing amounts count as 0)"""
+    amounts = pd.to_numeric(pd.Series(list(amounts), dtype=object), errors='coerce').fillna(0).to_numpy(dtype=float)
+    return np.digitize(amounts, edges)
+
+def dedupe_batch(texts_clean: List[str], *keys) -> Tuple[np.ndarray, np.ndarray]:
+    """Group identical rows of a batch so inference runs once per group.
+
+    Rows match when their cleaned text and every extra key column (user id, amount
+    bucket, ...) are equal. Returns ``first``, the first row of each group (in batch
+    order), and ``inverse``, the group of every row: per-group results scatter back
+    with ``results[inverse]``.
+    """
+    n = len(texts_clean)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    group = np.zeros(n, dtype=np.int64)
+    for column in (texts_clean, *keys):
+        _, codes = np.unique(np.asarray(column, dtype=str), return_inverse=True)
+        _, group = np.unique(group * (int(codes.max()) + 1) + codes.ravel(), return_inverse=True)
+        group = group.ravel()
+    first = np.full(int(group.max()) + 1, n, dtype=np.intp)
+    np.minimum.at(first, group, np.arange(n))
+    # number groups in order of first appearance
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[group]
+
 def format_rupees(amount: float) -> str:
     """Format amount in Indian rupees with proper formatting"""
     if amount >= 10000000:  # 1 crore
@@ -27,15 +72,305 @@ def format_rupees(amount: float) -> str:
     else:
         return f"₹{amount:,.0f}"
 
+class CompactVectorizer:
+    """Read-only TF-IDF/hashing transform over a compact export.
+
+    The vocabulary is a sorted string table searched with ``np.searchsorted``; IDF is an
+    ``.npy`` array. Tokenization reuses sklearn's analyzer built from the manifest, so
+    output matches the original vectorizer's ``transform``.
+    """
+
+    def __init__(self, spec: Dict[str, Any], base_dir: str, mmap_mode: Optional[str] = 'r'):
+        from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+
+        self.spec = spec
+        self.kind = spec['kind']
+        self.n_features = spec['n_features']
+        self.norm = spec.get('norm')
+        self.sublinear_tf = spec.get('sublinear_tf', False)
+        self.binary = spec.get('binary', False)
+        self.idf = np.load(os.path.join(base_dir, spec['idf']), mmap_mode=mmap_mode) if spec.get('idf') else None
+        analyzer = dict(spec['analyzer'], ngram_range=tuple(spec['analyzer']['ngram_range']))
+        if self.kind == 'hashing':
+            self._hasher = HashingVectorizer(n_features=self.n_features, alternate_sign=spec.get('alternate_sign', False),
+                                             norm=None, **analyzer)
+        else:
+            self.vocab = np.load(os.path.join(base_dir, spec['vocab']), mmap_mode=mmap_mode)
+            self.columns = np.load(os.path.join(base_dir, spec['columns']), mmap_mode=mmap_mode)
+            self._analyzer = CountVectorizer(**analyzer).build_analyzer()
+        # pruned exports (ML/compact_models.py): columns are normalized in the full space,
+        # then mapped to the kept features (-1 = dropped)
+        self.feature_map = np.load(os.path.join(base_dir, spec['feature_map']), mmap_mode=mmap_mode) if spec.get('feature_map') else None
+        self.n_output = spec.get('n_output', self.n_features)
+
+    def lookup(self, terms: List[str]) -> np.ndarray:
+        """Column of each term, -1 when out of vocabulary."""
+        if not terms:
+            return np.empty(0, dtype=np.int64)
+        terms = np.asarray(terms, dtype=str)
+        pos = np.searchsorted(self.vocab, terms)
+        pos = np.minimum(pos, len(self.vocab) - 1)
+        found = self.vocab[pos] == terms
+        return np.where(found, self.columns[pos], -1)
+
+    def _counts(self, texts: List[str]) -> sparse.csr_matrix:
+        if self.kind == 'hashing':
+            return self._hasher.transform(texts)
+        terms, rows = [], []
+        for i, text in enumerate(texts):
+            tokens = self._analyzer(text)
+            terms.extend(tokens)
+            rows.extend([i] * len(tokens))
+        cols = self.lookup(terms)
+        keep = cols >= 0
+        X = sparse.csr_matrix(
+            (np.ones(int(keep.sum())), (np.asarray(rows, dtype=np.int64)[keep], cols[keep])),
+            shape=(len(texts), self.n_features),
+        )
+        X.sum_duplicates()
+        return X
+
+    def transform(self, texts) -> sparse.csr_matrix:
+        X = self._counts(list(texts)).astype(np.float64)
+        if self.binary:
+            X.data[:] = 1.0
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        norms = None
+        if self.norm == 'l2':
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        elif self.norm == 'l1':
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        if norms is not None:
+            norms[norms == 0] = 1.0
+            X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X if self.feature_map is None else self._project(X)
+
+    def _project(self, X: sparse.csr_matrix) -> sparse.csr_matrix:
+        cols = self.feature_map[X.indices]
+        keep = cols >= 0
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[keep], minlength=X.shape[0]))])
+        return sparse.csr_matrix((X.data[keep], cols[keep], indptr), shape=(X.shape[0], self.n_output))
+
+
+def apply_link(scores: np.ndarray, link: str) -> np.ndarray:
+    """Turn linear scores into class probabilities, in place where the shape allows.
+
+    Exponentials are taken after subtracting the row max (and ``expit`` saturates), so
+    large scores never produce inf/nan.
+    """
+    from scipy.special import expit
+    if link == 'logistic':
+        p = expit(scores[:, 0])
+        return np.column_stack([1.0 - p, p])
+    if link == 'ovr':
+        # normalized sigmoids == softmax over log-sigmoids, which cannot underflow to 0/0
+        np.logaddexp(0.0, -scores, out=scores)
+        np.negative(scores, out=scores)
+    scores -= scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def top_k(proba: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(class indices, probabilities) of the ``k`` best classes per row, best first.
+
+    ``argpartition`` selects the k columns in linear time; only those k are sorted.
+    """
+    k = min(k, proba.shape[1])
+    idx = np.argpartition(proba, -k, axis=1)[:, -k:]
+    vals = np.take_along_axis(proba, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+class LinearKernel:
+    """Direct inference for a fitted linear classifier, without sklearn's per-call overhead.
+
+    The weights are copied once into a C-contiguous float32 ``features x classes`` matrix
+    (``coef_.T``), so scoring is one CSR @ dense product, a bias add and the link function
+    applied in place. Supports LogisticRegression and SGDClassifier(loss='log_loss') with
+    the same link rules as ML/export_compact.py.
+    """
+
+    def __init__(self, coef, intercept, classes, link: str = 'softmax'):
+        self.weights = np.ascontiguousarray(coef, dtype=np.float32)
+        self.bias = np.ascontiguousarray(intercept, dtype=np.float32).ravel()
+        self.classes_ = np.asarray(classes)
+        self.link = link
+
+    @classmethod
+    def from_estimator(cls, clf) -> 'LinearKernel':
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        if not isinstance(clf, (LogisticRegression, SGDClassifier)):
+            raise ValueError(f"Unsupported model: {type(clf).__name__}")
+        if len(clf.classes_) == 2:
+            link = 'logistic'
+        else:
+            multi = getattr(clf, 'multi_class', 'auto')
+            ovr = isinstance(clf, SGDClassifier) or multi == 'ovr' or (multi != 'multinomial' and clf.solver == 'liblinear')
+            link = 'ovr' if ovr else 'softmax'
+        return cls(clf.coef_.T, clf.intercept_, clf.classes_, link)
+
+    @classmethod
+    def wrap(cls, model):
+        """The kernel for a supported linear model, else the model unchanged"""
+        try:
+            return cls.from_estimator(model)
+        except (ValueError, AttributeError):
+            return model
+
+    def decision_function(self, X) -> np.ndarray:
+        if sparse.issparse(X):
+            X = X.tocsr()
+            if X.dtype != np.float32:
+                X = X.astype(np.float32)
+        else:
+            X = np.asarray(X, dtype=np.float32)
+        scores = np.asarray(X @ self.weights)
+        scores += self.bias
+        return scores
+
+    def predict_proba(self, X) -> np.ndarray:
+        return apply_link(self.decision_function(X), self.link)
+
+    def predict(self, X) -> np.ndarray:
+        # the class ranking of the scores equals that of the probabilities for every link
+        scores = self.decision_function(X)
+        if self.link == 'logistic':
+            return self.classes_[(scores[:, 0] > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def top_k(self, X, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """(class labels, probabilities) of the ``k`` most likely classes per row"""
+        idx, vals = top_k(self.predict_proba(X), k)
+        return self.classes_[idx], vals
+
+
+class CompactLinearModel:
+    """Read-only linear scorer: ``scores = X @ coef + intercept`` then the manifest's link."""
+
+    def __init__(self, spec: Dict[str, Any], base_dir: str, mmap_mode: Optional[str] = 'r'):
+        self.spec = spec
+        self.link = spec['link']
+        self.classes_ = np.asarray(spec['classes'])
+        self.coef = np.load(os.path.join(base_dir, spec['coef']), mmap_mode=mmap_mode)
+        self.intercept = np.load(os.path.join(base_dir, spec['intercept']), mmap_mode=mmap_mode)
+        # int8 exports carry one dequantization scale per class
+        self.coef_scale = np.load(os.path.join(base_dir, spec['coef_scale'])) if spec.get('coef_scale') else None
+
+    def dense_coef(self) -> np.ndarray:
+        """Coefficients as float64 (dequantized), e.g. for further training."""
+        coef = np.asarray(self.coef, dtype=np.float64)
+        return coef * self.coef_scale if self.coef_scale is not None else coef
+
+    def _matmul(self, X) -> np.ndarray:
+        if self.coef.dtype == np.float64:
+            return np.asarray(X @ self.coef)
+        # float32/int8 weights: gather only the rows of the nonzero features, so scipy does
+        # not upcast (copy) the whole memory-mapped matrix on every call
+        X = sparse.csr_matrix(X)
+        rows = np.asarray(self.coef[X.indices], dtype=np.float32)
+        gather = sparse.csr_matrix((X.data.astype(np.float32), np.arange(X.nnz), X.indptr), shape=(X.shape[0], X.nnz))
+        scores = np.asarray(gather @ rows, dtype=np.float64)
+        if self.coef_scale is not None:
+            scores *= self.coef_scale
+        return scores
+
+    def decision_function(self, X, extra: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = self._matmul(X) + self.intercept
+        return scores if extra is None else scores + extra
+
+    def _proba(self, scores: np.ndarray) -> np.ndarray:
+        return apply_link(scores, self.link)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self._proba(self.decision_function(X))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompactFraudPipeline(CompactLinearModel):
+    """DataFrame-in fraud scorer mirroring the pickled ColumnTransformer pipeline."""
+
+    def __init__(self, spec: Dict[str, Any], base_dir: str, vectorizer: CompactVectorizer, mmap_mode: Optional[str] = 'r'):
+        super().__init__(spec, base_dir, mmap_mode)
+        self.vectorizer = vectorizer
+        self.text_col = spec.get('text_col', 'text_clean')
+        self.numeric = spec.get('numeric')
+        if self.numeric:
+            self.num_coef = np.load(os.path.join(base_dir, self.numeric['coef']), mmap_mode=mmap_mode)
+
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        X = self.vectorizer.transform(df[self.text_col].astype(str))
+        extra = None
+        if self.numeric:
+            nums = df[self.numeric['columns']].to_numpy(dtype=float)
+            extra = ((nums - self.numeric['mean']) / self.numeric['scale']) @ self.num_coef
+        return self._proba(self.decision_function(X, extra))
+
+
+def load_compact(export_dir: str, mmap_mode: Optional[str] = 'r') -> Dict[str, Any]:
+    """Load a compact export as read-only objects: vectorizer, cat_model, fraud_pipeline, manifest."""
+    with open(os.path.join(export_dir, 'manifest.json')) as fh:
+        manifest = json.load(fh)
+    if manifest.get('format') != COMPACT_FORMAT:
+        raise ValueError(f"{export_dir} is not a {COMPACT_FORMAT} export")
+    vectorizers = {name: CompactVectorizer(spec, export_dir, mmap_mode) for name, spec in manifest['vectorizers'].items()}
+    models = manifest['models']
+    loaded = {'manifest': manifest, 'vectorizer': None, 'cat_model': None, 'fraud_pipeline': None}
+    if 'category' in models:
+        loaded['vectorizer'] = vectorizers[models['category']['vectorizer']]
+        loaded['cat_model'] = CompactLinearModel(models['category'], export_dir, mmap_mode)
+    if 'fraud' in models:
+        loaded['fraud_pipeline'] = CompactFraudPipeline(models['fraud'], export_dir, vectorizers[models['fraud']['vectorizer']], mmap_mode)
+    return loaded
+
+
 class ModelPredictor:
-    def __init__(self):
+    def __init__(self, compact_dir: Optional[str] = None, merchant_index: Optional[MerchantIndex] = None,
+                 cascade: Optional[Cascade] = None):
         self.vectorizer = None
         self.cat_model = None
         self.fraud_pipeline = None
-        self._load()
+        self.artifact_format = None
+        self._load(compact_dir or COMPACT_DIR)
+        self.merchant_index = merchant_index if merchant_index is not None else self._load_merchant_index()
+        self.cascade = cascade if cascade is not None else Cascade.from_env()
 
-    def _load(self):
+    @staticmethod
+    def _load_merchant_index() -> MerchantIndex:
+        # follows the nightly rebuild of MERCHANT_INDEX_PATH (also across model hot swaps)
+        # and the per-user corrections other workers log to MERCHANT_OVERRIDES_PATH
+        try:
+            index = MerchantIndex.open(MERCHANT_INDEX_PATH, MERCHANT_OVERRIDES_PATH)
+            if len(index):
+                print(f"✅ Merchant index loaded ({len(index)} entries)")
+            return index
+        except Exception as e:
+            print(f"⚠️ Error loading merchant index: {e}")
+        return MerchantIndex()
+
+    def _load(self, compact_dir: Optional[str] = None):
         """Load enhanced ML models with compatibility handling"""
+        if compact_dir and os.path.exists(os.path.join(compact_dir, 'manifest.json')):
+            try:
+                loaded = load_compact(compact_dir)
+                self.vectorizer = loaded['vectorizer']
+                self.cat_model = loaded['cat_model']
+                self.fraud_pipeline = loaded['fraud_pipeline']
+                self.artifact_format = 'compact'
+                print("✅ Compact models loaded (memory-mapped)")
+                return
+            except Exception as e:
+                print(f"⚠️ Error loading compact models, falling back to pickles: {e}")
+        self.artifact_format = 'pickle'
         try:
             import warnings
             warnings.filterwarnings('ignore', category=UserWarning)
@@ -44,7 +379,8 @@ class ModelPredictor:
                 try:
                     # Try loading with allow_pickle=True for compatibility
                     self.vectorizer = joblib.load(VECT_PATH)
-                    self.cat_model = joblib.load(MODEL_PATH)
+                    # linear models are served through LinearKernel (float32, no sklearn dispatch)
+                    self.cat_model = LinearKernel.wrap(joblib.load(MODEL_PATH))
                     print("✅ Enhanced category model loaded")
                 except Exception as e:
                     print(f"⚠️ Error loading models (version mismatch): {e}")
@@ -70,11 +406,22 @@ class ModelPredictor:
             self.cat_model = None
             self.fraud_pipeline = None
 
-    def predict(self, text: str, amount: float = None) -> Dict[str, Any]:
+    def predict(self, text: str, amount: float = None, user_id=None) -> Dict[str, Any]:
         """Enhanced prediction with rupee support and better features"""
         text_clean = clean_text(text)
         
-        result = {
+        result = self._base_result(text, text_clean, amount)
+        category = self._categorize([text], [text_clean], [user_id])[0]
+        result.update(category)
+        if amount is not None:
+            scores, stages = self._gated_fraud_scores([text_clean], [amount], [category])
+            self._add_fraud_fields(result, text_clean, amount, scores.get(0), use_rules=stages[0] == 'rules')
+            result['fraud_stage'] = stages[0]
+        return result
+
+    @staticmethod
+    def _base_result(text: str, text_clean: str, amount: Optional[float]) -> Dict[str, Any]:
+        return {
             'text': text,
             'text_clean': text_clean,
             'amount': amount,
@@ -86,155 +433,325 @@ class ModelPredictor:
             'fraud_risk_level': 'LOW',
             'model_version': 'enhanced'
         }
+
+    def _categorize(self, texts: List[str], texts_clean: List[str], user_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Category fields for each text, cascade stages 1-2.
+
+        Stage 1 resolves known merchants (merchant index) and unambiguous brand keywords;
+        one model call covers the rest, and low-confidence model rows fall back to rules.
+        """
+        out: List[Dict[str, Any]] = [None] * len(texts_clean)
+        start = time.perf_counter()
+        if self.merchant_index is not None:
+            merchants = self.merchant_index.lookup_many(texts, user_ids)
+        else:
+            merchants = [None] * len(texts)
+        todo = []
+        for i, merchant in enumerate(merchants):
+            # Known merchant: skip category inference
+            if merchant is not None:
+                out[i] = {'category': merchant[0], 'category_confidence': merchant[1],
+                          'category_source': 'user_override' if merchant[2] == 'user' else 'merchant_index'}
+                continue
+            keyword = self.cascade.keyword(texts_clean[i])
+            if keyword is not None:
+                out[i] = {'category': keyword[0], 'category_confidence': keyword[1], 'category_source': 'keyword_rule'}
+            else:
+                todo.append(i)
+        self.cascade.stats.record('lookup', len(texts), len(texts) - len(todo), time.perf_counter() - start)
+        if not todo:
+            return out
         
         # Enhanced category prediction with fallback
         if self.vectorizer and self.cat_model:
             try:
-                text_vec = self.vectorizer.transform([text_clean])
-                cat_pred = self.cat_model.predict(text_vec)[0]
-                cat_proba = self.cat_model.predict_proba(text_vec)[0]
-                cat_conf = np.max(cat_proba)
-                
-                # Use ML prediction if confidence is high enough, otherwise fallback
-                if cat_conf > 0.6 and str(cat_pred) != 'Other':
-                    result['category'] = str(cat_pred)
-                    result['category_confidence'] = float(cat_conf)
-                else:
+                start = time.perf_counter()
+                text_vec = self.vectorizer.transform([texts_clean[i] for i in todo])
+                cat_probas = self.cat_model.predict_proba(text_vec)
+                classes = self.cat_model.classes_
+                top_idx, top_conf = top_k(cat_probas, 3)
+                fallback = []
+                for row, i in enumerate(todo):
+                    cat_pred, cat_conf = classes[top_idx[row, 0]], top_conf[row, 0]
+                    # Use ML prediction if confidence is high enough, otherwise fallback
+                    if cat_conf > 0.6 and str(cat_pred) != 'Other':
+                        fields = {'category': str(cat_pred), 'category_confidence': float(cat_conf), 'category_source': 'model'}
+                    else:
+                        fallback.append(i)
+                        fields = {}
+                    
+                    # Get top 3 categories
+                    fields['top_categories'] = [
+                        {
+                            'category': classes[j],
+                            'confidence': float(p)
+                        }
+                        for j, p in zip(top_idx[row], top_conf[row])
+                    ]
+                    out[i] = fields
+                self.cascade.stats.record('model', len(todo), len(todo) - len(fallback), time.perf_counter() - start)
+                start = time.perf_counter()
+                for i in fallback:
                     # Use rule-based fallback for low confidence or "Other" predictions
-                    fallback_cat = self._predict_category_fallback(text_clean)
-                    result['category'] = fallback_cat
+                    fallback_cat = self._predict_category_fallback(texts_clean[i])
                     # Higher confidence for suspicious transactions
-                    result['category_confidence'] = 0.95 if fallback_cat == 'Suspicious' else 0.85
-                
-                # Get top 3 categories
-                top_indices = np.argsort(cat_proba)[-3:][::-1]
-                result['top_categories'] = [
-                    {
-                        'category': self.cat_model.classes_[i],
-                        'confidence': float(cat_proba[i])
-                    }
-                    for i in top_indices
-                ]
-                
+                    out[i].update(category=fallback_cat, category_confidence=0.95 if fallback_cat == 'Suspicious' else 0.85,
+                                  category_source='rules')
+                self.cascade.stats.record('fallback', len(fallback), len(fallback), time.perf_counter() - start)
+                return out
             except Exception as e:
                 print(f"Category prediction error: {e}")
-                # Rule-based fallback
-                result['category'] = self._predict_category_fallback(text_clean)
-                result['category_confidence'] = 0.75
-        else:
-            # Rule-based prediction when no ML model
-            result['category'] = self._predict_category_fallback(text_clean)
-            result['category_confidence'] = 0.75
+        # Rule-based prediction when no ML model (or it failed)
+        start = time.perf_counter()
+        for i in todo:
+            out[i] = {'category': self._predict_category_fallback(texts_clean[i]), 'category_confidence': 0.75,
+                      'category_source': 'rules'}
+        self.cascade.stats.record('fallback', len(todo), len(todo), time.perf_counter() - start)
+        return out
+
+    def _gated_fraud_scores(self, texts_clean: List[str], amounts: List[Optional[float]],
+                            categories: List[Dict[str, Any]]) -> Tuple[Dict[int, Tuple[float, bool]], Dict[int, str]]:
+        """Cascade stage 3: fraud-model scores for the rows the risk gate escalates.
+
+        Returns (scores, stages) keyed by row index for rows with an amount. Rows the gate
+        lets through score (0.0, False) with stage 'skipped'; rows left to the rule-based
+        fraud fallback (no model, or it failed) have no score and stage 'rules'.
+        """
+        rows = [i for i, a in enumerate(amounts) if a is not None]
+        if not self.fraud_pipeline:
+            return {}, {i: 'rules' for i in rows}
+        escalated = [i for i in rows if self.cascade.escalate(texts_clean[i], amounts[i], categories[i])]
+        start = time.perf_counter()
+        model_scores = []
+        if escalated:
+            model_scores = self._fraud_model_scores([texts_clean[i] for i in escalated], [amounts[i] for i in escalated])
+        self.cascade.stats.record('fraud', len(rows), len(escalated), time.perf_counter() - start)
         
-        # Enhanced fraud prediction with fallback
-        if amount is not None:
-            try:
-                if self.fraud_pipeline:
-                    # Create enhanced features for ML model
-                    test_df = pd.DataFrame({
-                        'text_clean': [text_clean],
-                        'amount': [amount],
-                        'amount_log': [np.log1p(amount)],
-                        'text_length': [len(text_clean)],
-                        'word_count': [len(text_clean.split())]
-                    })
-                    
-                    fraud_pred = self.fraud_pipeline.predict(test_df)[0]
-                    fraud_proba = self.fraud_pipeline.predict_proba(test_df)[0]
-                    fraud_conf = fraud_proba[1] if len(fraud_proba) > 1 else fraud_proba[0]
-                    
-                    result['fraud_probability'] = float(fraud_conf)
-                    result['is_fraud'] = bool(fraud_pred)
-                else:
-                    # Rule-based fraud detection fallback
-                    fraud_score = 0.0
-                    
-                    # High amount risk (more realistic thresholds)
-                    if amount > 200000:
-                        fraud_score += 0.6
-                    elif amount > 100000:
-                        fraud_score += 0.4
-                    elif amount > 50000:
-                        fraud_score += 0.2
-                    elif amount > 25000:
-                        fraud_score += 0.1
-                    
-                    # Suspicious keywords - much more aggressive
-                    suspicious_words = ['unknown', 'suspicious', 'fake', 'fraud', 'scam', 'unauthorized', 'refund', 'chargeback', 'upi', 'transfer']
-                    suspicious_count = sum(1 for word in suspicious_words if word in text_clean)
-                    if suspicious_count >= 2:  # Multiple suspicious words
-                        fraud_score += 0.8
-                    elif suspicious_count == 1:
-                        fraud_score += 0.5
-                    
-                    # Unusual patterns
-                    if len(text_clean.split()) < 3:
-                        fraud_score += 0.2
-                    
-                    # Generic payment terms
-                    generic_terms = ['payment', 'transfer', 'transaction', 'charge']
-                    if any(term in text_clean for term in generic_terms) and len(text_clean.split()) < 4:
-                        fraud_score += 0.3
-                    
-                    # Time-based (if available)
-                    import datetime
-                    current_hour = datetime.datetime.now().hour
-                    if current_hour < 6 or current_hour > 23:  # Late night transactions
-                        fraud_score += 0.1
-                    
-                    result['fraud_probability'] = min(fraud_score, 1.0)
-                    result['is_fraud'] = fraud_score > 0.4
+        scores, stages = {}, {}
+        for i in rows:
+            scores[i], stages[i] = (0.0, False), 'skipped'
+        for i in escalated:
+            del scores[i]
+            stages[i] = 'rules'
+        if model_scores is not None:
+            for i, score in zip(escalated, model_scores):
+                scores[i], stages[i] = score, 'model'
+        return scores, stages
+
+    def _fraud_model_scores(self, texts_clean: List[str], amounts: List[float]) -> Optional[List[Tuple[float, bool]]]:
+        """(probability, prediction) per row from one fraud-pipeline call, or None without a usable model"""
+        if not self.fraud_pipeline or not texts_clean:
+            return None
+        try:
+            amounts = np.asarray(amounts, dtype=float)
+            frame = pd.DataFrame({
+                'text_clean': texts_clean,
+                'amount': amounts,
+                'amount_log': np.log1p(amounts),
+                'text_length': [len(t) for t in texts_clean],
+                'word_count': [len(t.split()) for t in texts_clean],
+            })
+            pred = self.fraud_pipeline.predict(frame)
+            proba = self.fraud_pipeline.predict_proba(frame)
+            conf = proba[:, 1] if proba.shape[1] > 1 else proba[:, 0]
+            return [(float(p), bool(f)) for p, f in zip(conf, pred)]
+        except Exception as e:
+            print(f"Fraud prediction error: {e}")
+            return None
+
+    def _add_fraud_fields(self, result: Dict[str, Any], text_clean: str, amount: float,
+                          model_score: Optional[Tuple[float, bool]] = None, use_rules: bool = False) -> None:
+        """Fraud probability, risk level and risk factors for one row
+
+        Uses ``model_score`` if already computed; ``use_rules`` goes straight to the rule
+        fallback (the batched model call for this row already failed).
+        """
+        try:
+            if model_score is not None:
+                result['fraud_probability'], result['is_fraud'] = model_score
+            elif self.fraud_pipeline and not use_rules:
+                # Create enhanced features for ML model
+                test_df = pd.DataFrame({
+                    'text_clean': [text_clean],
+                    'amount': [amount],
+                    'amount_log': [np.log1p(amount)],
+                    'text_length': [len(text_clean)],
+                    'word_count': [len(text_clean.split())]
+                })
+                
+                fraud_pred = self.fraud_pipeline.predict(test_df)[0]
+                fraud_proba = self.fraud_pipeline.predict_proba(test_df)[0]
+                fraud_conf = fraud_proba[1] if len(fraud_proba) > 1 else fraud_proba[0]
                 
-                # Enhanced risk levels
-                fraud_conf = result['fraud_probability']
-                if fraud_conf > 0.7:
-                    result['fraud_risk_level'] = 'CRITICAL'
-                elif fraud_conf > 0.5:
-                    result['fraud_risk_level'] = 'HIGH'
-                elif fraud_conf > 0.3:
-                    result['fraud_risk_level'] = 'MEDIUM'
-                else:
-                    result['fraud_risk_level'] = 'LOW'
+                result['fraud_probability'] = float(fraud_conf)
+                result['is_fraud'] = bool(fraud_pred)
+            else:
+                # Rule-based fraud detection fallback
+                fraud_score = 0.0
                 
-                # Risk factors
-                risk_factors = []
-                if amount > 100000:
-                    risk_factors.append('Very high amount')
+                # High amount risk (more realistic thresholds)
+                if amount > 200000:
+                    fraud_score += 0.6
+                elif amount > 100000:
+                    fraud_score += 0.4
                 elif amount > 50000:
-                    risk_factors.append('High amount')
+                    fraud_score += 0.2
                 elif amount > 25000:
-                    risk_factors.append('Moderate amount')
-                
-                suspicious_words = ['unknown', 'suspicious', 'fake', 'fraud', 'scam', 'unauthorized']
-                if any(word in text_clean for word in suspicious_words):
-                    risk_factors.append('Suspicious keywords')
+                    fraud_score += 0.1
                 
-                if 'upi' in text_clean and any(word in text_clean for word in ['unknown', 'suspicious']):
-                    risk_factors.append('Suspicious UPI transaction')
+                # Suspicious keywords - much more aggressive
+                suspicious_words = ['unknown', 'suspicious', 'fake', 'fraud', 'scam', 'unauthorized', 'refund', 'chargeback', 'upi', 'transfer']
+                suspicious_count = sum(1 for word in suspicious_words if word in text_clean)
+                if suspicious_count >= 2:  # Multiple suspicious words
+                    fraud_score += 0.8
+                elif suspicious_count == 1:
+                    fraud_score += 0.5
                 
+                # Unusual patterns
                 if len(text_clean.split()) < 3:
-                    risk_factors.append('Vague description')
+                    fraud_score += 0.2
                 
-                generic_terms = ['payment', 'transfer', 'transaction']
+                # Generic payment terms
+                generic_terms = ['payment', 'transfer', 'transaction', 'charge']
                 if any(term in text_clean for term in generic_terms) and len(text_clean.split()) < 4:
-                    risk_factors.append('Generic payment description')
+                    fraud_score += 0.3
                 
-                if result['fraud_probability'] > 0.4:
-                    risk_factors.append('High risk pattern')
-                elif result['fraud_probability'] > 0.2:
-                    risk_factors.append('Medium risk pattern')
+                # Time-based (if available)
+                import datetime
+                current_hour = datetime.datetime.now().hour
+                if current_hour < 6 or current_hour > 23:  # Late night transactions
+                    fraud_score += 0.1
                 
-                result['risk_factors'] = risk_factors
-                
-            except Exception as e:
-                print(f"Fraud prediction error: {e}")
-                # Minimal fallback
-                result['fraud_probability'] = 0.1
-                result['is_fraud'] = False
+                result['fraud_probability'] = min(fraud_score, 1.0)
+                result['is_fraud'] = fraud_score > 0.4
+            
+            # Enhanced risk levels
+            fraud_conf = result['fraud_probability']
+            if fraud_conf > 0.7:
+                result['fraud_risk_level'] = 'CRITICAL'
+            elif fraud_conf > 0.5:
+                result['fraud_risk_level'] = 'HIGH'
+            elif fraud_conf > 0.3:
+                result['fraud_risk_level'] = 'MEDIUM'
+            else:
                 result['fraud_risk_level'] = 'LOW'
-                result['risk_factors'] = []
-        
-        return result
+            
+            # Risk factors
+            risk_factors = []
+            if amount > 100000:
+                risk_factors.append('Very high amount')
+            elif amount > 50000:
+                risk_factors.append('High amount')
+            elif amount > 25000:
+                risk_factors.append('Moderate amount')
+            
+            suspicious_words = ['unknown', 'suspicious', 'fake', 'fraud', 'scam', 'unauthorized']
+            if any(word in text_clean for word in suspicious_words):
+                risk_factors.append('Suspicious keywords')
+            
+            if 'upi' in text_clean and any(word in text_clean for word in ['unknown', 'suspicious']):
+                risk_factors.append('Suspicious UPI transaction')
+            
+            if len(text_clean.split()) < 3:
+                risk_factors.append('Vague description')
+            
+            generic_terms = ['payment', 'transfer', 'transaction']
+            if any(term in text_clean for term in generic_terms) and len(text_clean.split()) < 4:
+                risk_factors.append('Generic payment description')
+            
+            if result['fraud_probability'] > 0.4:
+                risk_factors.append('High risk pattern')
+            elif result['fraud_probability'] > 0.2:
+                risk_factors.append('Medium risk pattern')
+            
+            result['risk_factors'] = risk_factors
+            
+        except Exception as e:
+            print(f"Fraud prediction error: {e}")
+            # Minimal fallback
+            result['fraud_probability'] = 0.1
+            result['is_fraud'] = False
+            result['fraud_risk_level'] = 'LOW'
+            result['risk_factors'] = []
+
+    def score_batch(self, texts: List[str], amounts=None, user_ids=None) -> Dict[str, np.ndarray]:
+        """Vectorized category/fraud scoring with the same decisions as predict().
+
+        Known merchants and brand keywords are resolved in cascade stage 1; one transform
+        and one predict_proba per model covers the rest of the batch, and the fraud model
+        only sees the rows the cascade escalates (the others score 0.0). Unlike predict(),
+        model errors propagate; fraud_probability is NaN when no fraud model (or no
+        amounts) is available.
+        """
+        texts_clean = [clean_text(t) for t in texts]
+        n = len(texts_clean)
+        # category inference runs once per distinct (text, user); results are scattered back
+        first, inverse = dedupe_batch(texts_clean, *([user_ids] if user_ids is not None else []))
+        unique_clean = [texts_clean[i] for i in first]
+        m = len(first)
+        category = np.empty(m, dtype=object)
+        confidence = np.full(m, 0.75)
+        source = np.full(m, 'rules', dtype=object)
+        start = time.perf_counter()
+        matches = [None] * m
+        if self.merchant_index is not None and m:
+            matches = self.merchant_index.lookup_many([texts[i] for i in first],
+                                                      [user_ids[i] for i in first] if user_ids is not None else None)
+        todo = []
+        for i, match in enumerate(matches):
+            if match is None:
+                keyword = self.cascade.keyword(unique_clean[i])
+                match = keyword + ('keyword',) if keyword is not None else None
+            if match is not None:
+                category[i], confidence[i] = match[0], match[1]
+                source[i] = {'user': 'user_override', 'merchant': 'merchant_index', 'keyword': 'keyword_rule'}[match[2]]
+            else:
+                todo.append(i)
+        todo = np.array(todo, dtype=int)
+        self.cascade.stats.record('lookup', m, m - len(todo), time.perf_counter() - start)
+        fallback = todo
+        if self.vectorizer and self.cat_model and len(todo):
+            start = time.perf_counter()
+            proba = self.cat_model.predict_proba(self.vectorizer.transform([unique_clean[i] for i in todo]))
+            best = proba.argmax(axis=1)
+            conf = proba[np.arange(len(todo)), best]
+            pred = np.asarray(self.cat_model.classes_)[best].astype(str)
+            ok = (conf > 0.6) & (pred != 'Other')
+            category[todo[ok]] = pred[ok]
+            confidence[todo[ok]] = conf[ok]
+            source[todo[ok]] = 'model'
+            fallback = todo[~ok]
+            self.cascade.stats.record('model', len(todo), int(ok.sum()), time.perf_counter() - start)
+        start = time.perf_counter()
+        for i in fallback:
+            category[i] = self._predict_category_fallback(unique_clean[i])
+            if self.cat_model:
+                confidence[i] = 0.95 if category[i] == 'Suspicious' else 0.85
+        self.cascade.stats.record('fallback', len(fallback), len(fallback), time.perf_counter() - start)
+        category, confidence, source = category[inverse], confidence[inverse], source[inverse]
+
+        fraud = np.full(n, np.nan)
+        if amounts is not None and self.fraud_pipeline and n:
+            amounts = np.asarray(amounts, dtype=float)
+            rows = np.flatnonzero(~np.isnan(amounts))
+            gate = np.array([self.cascade.escalate(texts_clean[i], amounts[i], {
+                'category': category[i], 'category_confidence': confidence[i], 'category_source': source[i]})
+                for i in rows], dtype=bool)
+            escalated = rows[gate]
+            fraud[rows] = 0.0
+            start = time.perf_counter()
+            if len(escalated):
+                frame = pd.DataFrame({
+                    'text_clean': [texts_clean[i] for i in escalated],
+                    'amount': amounts[escalated],
+                    'amount_log': np.log1p(amounts[escalated]),
+                    'text_length': [len(texts_clean[i]) for i in escalated],
+                    'word_count': [len(texts_clean[i].split()) for i in escalated],
+                })
+                p = self.fraud_pipeline.predict_proba(frame)
+                fraud[escalated] = p[:, 1] if p.shape[1] > 1 else p[:, 0]
+            self.cascade.stats.record('fraud', len(rows), len(escalated), time.perf_counter() - start)
+        return {'text_clean': texts_clean, 'category': category, 'category_confidence': confidence, 'fraud_probability': fraud}
 
     def predict_category_only(self, text: str) -> Tuple[str, float]:
         """Legacy method for backward compatibility"""
@@ -242,14 +759,29 @@ class ModelPredictor:
         return result['category'], result['category_confidence']
 
     def batch_predict(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Enhanced batch prediction with performance optimization"""
-        results = []
+        """Enhanced batch prediction with performance optimization
+
+        Category inference runs once per distinct (cleaned text, user) and is shared by
+        the repeats; fraud is scored per row (it depends on the amount) in one model call.
+        """
+        texts = [t.get('text', t.get('description', '')) for t in transactions]
+        amounts = [t.get('amount') for t in transactions]
+        user_ids = [t.get('user_id') for t in transactions]
+        texts_clean = [clean_text(t) for t in texts]
         
-        for transaction in transactions:
-            text = transaction.get('text', transaction.get('description', ''))
-            amount = transaction.get('amount')
-            
-            result = self.predict(text, amount)
+        first, inverse = dedupe_batch(texts_clean, user_ids)
+        categories = self._categorize([texts[i] for i in first], [texts_clean[i] for i in first],
+                                      [user_ids[i] for i in first])
+        scores, stages = self._gated_fraud_scores(texts_clean, amounts, [categories[j] for j in inverse])
+        
+        results = []
+        for i, transaction in enumerate(transactions):
+            amount = amounts[i]
+            result = self._base_result(texts[i], texts_clean[i], amount)
+            result.update(categories[inverse[i]])
+            if amount is not None:
+                self._add_fraud_fields(result, texts_clean[i], amount, scores.get(i), use_rules=stages[i] == 'rules')
+                result['fraud_stage'] = stages[i]
             result.update(transaction)  # Include original transaction data
             results.append(result)
         
@@ -0,0 +1,306 @@
+"""Shared model hosting for multi-worker deployments.
+
+Every worker that builds its own ModelPredictor from pickles holds a private copy of the
+vocabulary and coefficients. Here the parent process publishes the models once, in the
+compact format (ML/export_compact.py), into a model store:
+
+    <store>/versions/<version>/manifest.json, *.npy
+    <store>/CURRENT            -> name of the active version
+
+Workers attach with ``np.load(..., mmap_mode='r')``, so all of them read the same page
+cache pages and nothing is copied per process. The store doubles as the versioned model
+registry: a deploy publishes a new version and rewrites CURRENT atomically (tmp file +
+os.replace); each worker loads the new version in a background thread, warms it with a
+canary batch and only then swaps it in, so requests never wait on a load.
+
+Parent side (before forking workers, e.g. in api_gateway __main__ or a gunicorn
+``on_starting`` hook):
+    prepare_shared_models(store_dir, pickle_dir)
+Worker side:
+    predictor = SharedModelPredictor(store_dir, check_interval=None)
+    predictor.start_watching(poll_interval=5.0)
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models.cascade import Cascade
+from models.predict import ModelPredictor
+
+POINTER_NAME = 'CURRENT'
+VERSIONS_DIR = 'versions'
+VERSION_INFO_NAME = 'version.json'
+# Warm-up batch run on a freshly loaded version before it takes traffic
+DEFAULT_CANARY = [
+    {'text': 'Starbucks Coffee Day purchase', 'amount': 450},
+    {'text': 'Amazon Flipkart online shopping', 'amount': 7500},
+    {'text': 'Suspicious unknown UPI payment', 'amount': 25000},
+    {'text': 'HDFC Bank EMI payment', 'amount': 155000},
+    {'text': 'Netflix Hotstar subscription', 'amount': 1300},
+]
+
+
+def version_dir(store_dir: str, version: str) -> str:
+    return os.path.join(store_dir, VERSIONS_DIR, version)
+
+
+def read_current(store_dir: str) -> Optional[str]:
+    """Active version name, or None when nothing has been published."""
+    try:
+        with open(os.path.join(store_dir, POINTER_NAME)) as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current(store_dir: str, version: str) -> None:
+    """Point CURRENT at ``version`` atomically; readers see the old or the new name, never a partial one."""
+    if not os.path.exists(os.path.join(version_dir(store_dir, version), 'manifest.json')):
+        raise FileNotFoundError(f"Version {version} has no manifest in {store_dir}")
+    tmp = os.path.join(store_dir, f'.{POINTER_NAME}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as fh:
+        fh.write(version)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, os.path.join(store_dir, POINTER_NAME))
+
+
+def list_versions(store_dir: str) -> list:
+    root = os.path.join(store_dir, VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    return sorted(v for v in os.listdir(root) if os.path.exists(os.path.join(root, v, 'manifest.json')))
+
+
+def version_info(store_dir: str, version: str) -> Dict[str, Any]:
+    """Publish metadata of a version (created_at plus whatever the publisher attached)."""
+    try:
+        with open(os.path.join(version_dir(store_dir, version), VERSION_INFO_NAME)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def publish_version(store_dir: str, export_dir: str, version: Optional[str] = None, activate: bool = True,
+                    metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Copy a compact export into the store as a new immutable version.
+
+    Files are staged in a hidden directory and renamed into place, so a version
+    directory is either complete or absent. Returns the version name.
+    """
+    version = version or datetime.utcnow().strftime('v%Y%m%d%H%M%S%f')
+    target = version_dir(store_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Version {version} already exists in {store_dir}")
+    staging = os.path.join(store_dir, VERSIONS_DIR, f'.{version}.staging')
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(export_dir, staging)
+    with open(os.path.join(staging, VERSION_INFO_NAME), 'w') as fh:
+        json.dump({'version': version, 'created_at': datetime.utcnow().isoformat() + 'Z', **(metadata or {})}, fh, indent=2)
+    os.rename(staging, target)
+    if activate:
+        set_current(store_dir, version)
+    return version
+
+
+def publish_pickles(store_dir: str, pickle_dir: str, version: Optional[str] = None, activate: bool = True,
+                    metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Export vectorizer.pkl / cat_model.pkl / fraud_pipeline.pkl from ``pickle_dir`` and publish them."""
+    import joblib
+    try:
+        from ML.export_compact import export_compact
+    except ImportError:
+        from export_compact import export_compact
+
+    def load(name):
+        path = os.path.join(pickle_dir, name)
+        return joblib.load(path) if os.path.exists(path) else None
+
+    staging = os.path.join(store_dir, VERSIONS_DIR, f'.export.{os.getpid()}')
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        export_compact(staging, load('vectorizer.pkl'), load('cat_model.pkl'), load('fraud_pipeline.pkl'))
+        return publish_version(store_dir, staging, version, activate, {'source': os.path.abspath(pickle_dir), **(metadata or {})})
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def warm_page_cache(path: str, block_size: int = 1 << 20) -> int:
+    """Read every file under ``path`` once so workers attach to resident pages. Returns bytes read."""
+    total = 0
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as fh:
+            while True:
+                chunk = fh.read(block_size)
+                if not chunk:
+                    break
+                total += len(chunk)
+    return total
+
+
+def prune_versions(store_dir: str, keep: int = 3) -> list:
+    """Delete all but the newest ``keep`` versions (never the active one). Returns removed names."""
+    current = read_current(store_dir)
+    versions = list_versions(store_dir)
+    removed = [v for v in versions[:-keep] if v != current] if keep else [v for v in versions if v != current]
+    for v in removed:
+        shutil.rmtree(version_dir(store_dir, v), ignore_errors=True)
+    return removed
+
+
+def prepare_shared_models(store_dir: str, pickle_dir: Optional[str] = None) -> Optional[str]:
+    """Parent-process setup: publish from pickles if the store is empty, then pre-fault the active version."""
+    os.makedirs(os.path.join(store_dir, VERSIONS_DIR), exist_ok=True)
+    version = read_current(store_dir)
+    if version is None and pickle_dir and os.path.exists(os.path.join(pickle_dir, 'vectorizer.pkl')):
+        version = publish_pickles(store_dir, pickle_dir)
+    if version is not None:
+        warm_page_cache(version_dir(store_dir, version))
+    return version
+
+
+def run_canary(predictor: ModelPredictor, canary: List[Dict[str, Any]]) -> float:
+    """Score the canary batch; raises if any result is unusable. Returns elapsed ms."""
+    start = time.perf_counter()
+    # bypass the merchant index and the cascade so the canary always exercises the models themselves
+    index, predictor.merchant_index = getattr(predictor, 'merchant_index', None), None
+    cascade, predictor.cascade = getattr(predictor, 'cascade', None), Cascade(enabled=False)
+    try:
+        results = predictor.batch_predict([dict(t) for t in canary])
+    finally:
+        predictor.merchant_index, predictor.cascade = index, cascade
+    for r in results:
+        # predict() swallows model errors into rule fallbacks; top_categories only exists when the model ran
+        model_ran = predictor.cat_model is None or 'top_categories' in r
+        if not model_ran or not isinstance(r.get('category'), str) or not (0.0 <= r.get('fraud_probability', 0.0) <= 1.0):
+            raise ValueError(f"Canary produced an invalid prediction: {r}")
+    return (time.perf_counter() - start) * 1000.0
+
+
+class SharedModelPredictor:
+    """Worker-side ModelPredictor over the store's active version, with hot reload.
+
+    Attributes are delegated to the attached ModelPredictor. A new version is loaded
+    and canary-checked off the request path (``load``/``start_watching``), then swapped
+    in with a single reference assignment, so in-flight calls finish on the version they
+    started with and a bad version never replaces a good one.
+
+    With a numeric ``check_interval`` the CURRENT pointer is also checked on attribute
+    access (at most that often) and a new version is attached synchronously; pass None
+    when a watcher thread handles reloads.
+    """
+
+    def __init__(self, store_dir: str, check_interval: Optional[float] = 2.0, canary: Optional[List[Dict[str, Any]]] = None):
+        self.store_dir = store_dir
+        self.check_interval = check_interval
+        self.canary = DEFAULT_CANARY if canary is None else canary
+        self._active = (None, None)  # (version, ModelPredictor)
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.state: Dict[str, Any] = {'loading_version': None, 'loaded_at': None, 'canary_ms': None,
+                                      'last_error': None, 'failed_version': None}
+        self.refresh(force=True)
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._active[0]
+
+    @property
+    def predictor(self) -> Optional[ModelPredictor]:
+        return self._active[1]
+
+    def _swap_to(self, version: str) -> bool:
+        """Load, warm and activate ``version``; on failure keep the current one and record the error."""
+        with self._lock:
+            if version == self._active[0]:
+                return False
+            self.state['loading_version'] = version
+            try:
+                # the merchant index and cascade stats are independent of the model version; keep them,
+                # picking up a rebuilt index file now rather than at its next periodic check
+                current = self._active[1]
+                if current is not None and current.merchant_index is not None:
+                    current.merchant_index.refresh(force=True)
+                predictor = ModelPredictor(compact_dir=version_dir(self.store_dir, version),
+                                           merchant_index=current.merchant_index if current is not None else None,
+                                           cascade=current.cascade if current is not None else None)
+                if predictor.artifact_format != 'compact':
+                    raise RuntimeError(f"Version {version} in {self.store_dir} is not a loadable compact export")
+                canary_ms = run_canary(predictor, self.canary) if self.canary else None
+            except Exception as e:
+                self.state.update(loading_version=None, last_error=f"{version}: {e}", failed_version=version)
+                if self._active[1] is None:
+                    raise
+                return False
+            self._active = (version, predictor)
+            self.state.update(loading_version=None, loaded_at=datetime.utcnow().isoformat() + 'Z',
+                              canary_ms=canary_ms, last_error=None, failed_version=None)
+            return True
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-attach (synchronously) if CURRENT points at a different version. Returns True on a swap."""
+        now = time.monotonic()
+        if not force and (self.check_interval is None or now - self._checked < self.check_interval):
+            return False
+        self._checked = now
+        version = read_current(self.store_dir)
+        if version is None or version == self._active[0]:
+            return False
+        return self._swap_to(version)
+
+    def load(self, version: Optional[str] = None, wait: bool = False) -> threading.Thread:
+        """Load ``version`` (default: CURRENT) in a background thread and swap it in when warm."""
+        version = version or read_current(self.store_dir)
+        thread = threading.Thread(target=self._swap_to, args=(version,), name=f'model-load-{version}', daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def start_watching(self, poll_interval: float = 5.0) -> None:
+        """Poll CURRENT in a daemon thread and hot-swap whenever it moves."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(poll_interval):
+                version = read_current(self.store_dir)
+                # a version that failed its canary is retried only via load() or a new pointer
+                if version and version not in (self._active[0], self.state['loading_version'], self.state['failed_version']):
+                    self._swap_to(version)
+
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def status(self) -> Dict[str, Any]:
+        version = self._active[0]
+        return {
+            'active_version': version,
+            'current_pointer': read_current(self.store_dir),
+            'version_info': version_info(self.store_dir, version) if version else {},
+            'available_versions': list_versions(self.store_dir),
+            'watching': self._watcher is not None,
+            **self.state,
+        }
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        self.refresh()
+        predictor = self._active[1]
+        if predictor is None:
+            raise AttributeError(f"No model published in {self.store_dir}")
+        return getattr(predictor, name)
@@ -6,16 +6,20 @@ class BatchInference:
         self.db = db
 
     def run_batch(self, transactions: List[Dict[str, Any]]):
-        res = []
-        for t in transactions:
-            text = t.get('merchant_name') or t.get('description') or ''
+        from models.predict import clean_text, dedupe_batch
+        texts = [t.get('merchant_name') or t.get('description') or '' for t in transactions]
+        # one predictor call per distinct cleaned text; repeats share the result
+        first, inverse = dedupe_batch([clean_text(text) for text in texts])
+        predictions = []
+        for i in first:
             try:
-                cat, conf = self.predictor(text)
+                predictions.append(self.predictor(texts[i]))
             except Exception:
                 from models.model_dummy_loader import dummy_predict
-                cat, conf = dummy_predict(text)
-            t['predicted_category'] = cat
-            t['confidence'] = conf
+                predictions.append(dummy_predict(texts[i]))
+        res = []
+        for t, group in zip(transactions, inverse):
+            t['predicted_category'], t['confidence'] = predictions[group]
             res.append(t)
         # save to DB in bulk if DB.available
         try:
@@ -0,0 +1,180 @@
+"""Offline batch scoring of the fact_transactions backlog.
+
+Replaces the HTTP loop (GET /transactions/unclassified -> predictor -> POST /apply-ml)
+for large backfills:
+
+- rows are read in id order with a streaming (server-side) cursor, one keyset window at
+  a time, so no cursor stays open across the commits that follow each window;
+- every window is split into chunks scored with ModelPredictor.score_batch across a
+  process pool (workers attach to the same memory-mapped compact export, see
+  models/shared_hosting.py);
+- results go back with one bulk UPDATE per window, then the last committed id is written
+  to a checkpoint file, so a killed job resumes where it stopped.
+
+fact_transactions has no fraud column, so fraud probabilities above --fraud-threshold are
+appended to an optional CSV instead.
+
+    python backend/services/batch_scoring.py --database-url sqlite:///./ghci.db \
+            --store-dir ML/models/store --n-jobs 8
+"""
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_worker_predictor = None
+
+
+def _init_worker(compact_dir: Optional[str]) -> None:
+    global _worker_predictor
+    from models.predict import ModelPredictor
+    _worker_predictor = ModelPredictor(compact_dir=compact_dir)
+
+
+def _score_chunk(chunk: Tuple[List[int], List[str], List[float]]) -> Tuple[List[int], np.ndarray, np.ndarray, np.ndarray]:
+    ids, texts, amounts = chunk
+    res = _worker_predictor.score_batch(texts, amounts)
+    return ids, res['category'], res['category_confidence'], res['fraud_probability']
+
+
+def stream_unclassified(session, after_id: int = 0, window: int = 50000, chunk_size: int = 5000,
+                        rescore: bool = False) -> Iterator[List[Tuple[List[int], List[str], List[float]]]]:
+    """Yield windows of (ids, texts, amounts) chunks in transaction_id order after ``after_id``."""
+    from integration.pipelines.ml_payload_builder import iter_ml_payload
+
+    while True:
+        chunks = [
+            (c['transaction_id'].tolist(), c['description'].tolist(), c['amount'].tolist())
+            for c in iter_ml_payload(session, after_id, chunk_size, limit=window, unclassified_only=not rescore)
+        ]
+        if not chunks:
+            return
+        yield chunks
+        after_id = chunks[-1][0][-1]
+
+
+def apply_scores(session, ids, categories, confidences) -> None:
+    """Bulk-write predictions; category_final is only filled where nobody has set it."""
+    from sqlalchemy import update
+    from integration.db.models import Transaction
+
+    session.bulk_update_mappings(Transaction, [
+        {'transaction_id': int(i), 'category_pred': str(c), 'ml_confidence': round(float(p), 2)}
+        for i, c, p in zip(ids, categories, confidences)
+    ])
+    session.execute(
+        update(Transaction)
+        .where(Transaction.transaction_id.in_([int(i) for i in ids]), Transaction.category_final.is_(None))
+        .values(category_final=Transaction.category_pred)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def read_checkpoint(path: Optional[str]) -> Dict[str, Any]:
+    if path and os.path.exists(path):
+        with open(path) as fh:
+            return json.load(fh)
+    return {'last_id': 0, 'rows': 0}
+
+
+def write_checkpoint(path: Optional[str], state: Dict[str, Any]) -> None:
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(state, fh)
+    os.replace(path + '.tmp', path)
+
+
+def score_backlog(session, compact_dir: Optional[str] = None, n_jobs: int = 1, window: int = 50000,
+                  chunk_size: int = 5000, checkpoint_path: Optional[str] = None, resume: bool = False,
+                  rescore: bool = False, fraud_output: Optional[str] = None, fraud_threshold: float = 0.5,
+                  max_rows: Optional[int] = None, log_every: float = 10.0) -> Dict[str, Any]:
+    """Score unclassified (or, with ``rescore``, all) transactions. Returns the final run state."""
+    state = read_checkpoint(checkpoint_path) if resume else {'last_id': 0, 'rows': 0}
+    state.update(model=compact_dir, started_at=datetime.utcnow().isoformat() + 'Z')
+    rows_this_run = 0
+    start = last_log = time.perf_counter()
+
+    pool = ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(compact_dir,)) if n_jobs > 1 else None
+    if pool is None:
+        _init_worker(compact_dir)
+    fraud_fh = open(fraud_output, 'a', newline='') if fraud_output else None
+    try:
+        fraud_writer = csv.writer(fraud_fh) if fraud_fh else None
+        for chunks in stream_unclassified(session, state['last_id'], window, chunk_size, rescore):
+            scored = list(pool.map(_score_chunk, chunks)) if pool else [_score_chunk(c) for c in chunks]
+            ids = np.concatenate([s[0] for s in scored])
+            apply_scores(session, ids, np.concatenate([s[1] for s in scored]), np.concatenate([s[2] for s in scored]))
+            session.commit()
+            if fraud_writer:
+                fraud = np.concatenate([s[3] for s in scored])
+                flagged = fraud >= fraud_threshold
+                fraud_writer.writerows(zip(ids[flagged].tolist(), np.round(fraud[flagged], 4).tolist()))
+                fraud_fh.flush()
+
+            rows_this_run += len(ids)
+            state.update(last_id=int(ids[-1]), rows=state['rows'] + len(ids))
+            write_checkpoint(checkpoint_path, state)
+            now = time.perf_counter()
+            if now - last_log >= log_every:
+                print(f"{state['rows']} rows scored, last id {state['last_id']}, {rows_this_run / (now - start):.0f} rows/sec")
+                last_log = now
+            if max_rows and rows_this_run >= max_rows:
+                break
+    finally:
+        if pool:
+            pool.shutdown()
+        if fraud_fh:
+            fraud_fh.close()
+
+    elapsed = time.perf_counter() - start
+    state.update(rows_this_run=rows_this_run, seconds=round(elapsed, 3),
+                 rows_per_sec=round(rows_this_run / elapsed, 1) if elapsed > 0 else None)
+    write_checkpoint(checkpoint_path, state)
+    return state
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(description='Score the fact_transactions backlog offline')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///./ghci.db'))
+    p.add_argument('--compact-dir', default=None, help='Compact model export (default: the pickles next to models/predict.py)')
+    p.add_argument('--store-dir', default=None, help='Model store; scores with its CURRENT version')
+    p.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--window', type=int, default=50000, help='Rows per keyset window (one commit + checkpoint each)')
+    p.add_argument('--chunk-size', type=int, default=5000, help='Rows per inference task')
+    p.add_argument('--checkpoint', default=os.path.join('data', 'batch_scoring_checkpoint.json'))
+    p.add_argument('--resume', action='store_true', help='Continue after the checkpointed transaction id')
+    p.add_argument('--rescore', action='store_true', help='Score every row, not only unclassified ones (new model backfill)')
+    p.add_argument('--fraud-output', default=None, help='Append (transaction_id, fraud_probability) of flagged rows here')
+    p.add_argument('--fraud-threshold', type=float, default=0.5)
+    args = p.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.path.append(root)
+    sys.path.append(os.path.join(root, 'backend'))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    compact_dir = args.compact_dir
+    if args.store_dir:
+        from models.shared_hosting import read_current, version_dir
+        compact_dir = version_dir(args.store_dir, read_current(args.store_dir))
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        state = score_backlog(session, compact_dir, args.n_jobs, args.window, args.chunk_size, args.checkpoint,
+                              args.resume, args.rescore, args.fraud_output, args.fraud_threshold)
+    finally:
+        session.close()
+    print(f"Scored {state['rows_this_run']} rows in {state['seconds']}s ({state['rows_per_sec']} rows/sec), last id {state['last_id']}")
+
+
+if __name__ == '__main__':
+    main()
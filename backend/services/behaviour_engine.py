@@ -0,0 +1,193 @@
+"""Cohort-scale behaviour profiling.
+
+Builds a sparse users x categories spend matrix straight from fact_transactions, clusters
+every user in one MiniBatchKMeans run on their category shares, computes per-category
+spending trend slopes with closed-form least squares on sparse sums, and stores the
+result in a ProfileStore for O(1) lookup by user id.
+
+Nightly run:
+    python backend/services/behaviour_engine.py --database-url sqlite:///./ghci.db
+"""
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+
+from services.forecast_engine import month_index
+
+PROFILE_RULES = [('Shopping', 0.3, 'Impulsive'), ('Dining', 0.25, 'Social Spender')]
+DEFAULT_PROFILE = 'Budget-conscious'
+
+
+def trend_slopes(rows: np.ndarray, cols: np.ndarray, t: np.ndarray, y: np.ndarray, shape: Tuple[int, int], window: int) -> sparse.csr_matrix:
+    """Least-squares slope of y over t = 0..window-1 for every (row, col) cell at once.
+
+    Months without spend count as zero, so only the sparse sums Σy and Σty are needed;
+    Σt and Σt² are constants of the window.
+    """
+    if window < 2:
+        return sparse.csr_matrix(shape)
+    sy = sparse.coo_matrix((y, (rows, cols)), shape=shape).tocsr()
+    sty = sparse.coo_matrix((t * y, (rows, cols)), shape=shape).tocsr()
+    st = window * (window - 1) / 2.0
+    st2 = (window - 1) * window * (2 * window - 1) / 6.0
+    return (window * sty - st * sy) / (window * st2 - st ** 2)
+
+
+def label_profile(shares: Dict[str, float]) -> str:
+    for cat, threshold, name in PROFILE_RULES:
+        if shares.get(cat, 0.0) > threshold:
+            return name
+    return DEFAULT_PROFILE
+
+
+def top_k_per_row(m: sparse.csr_matrix, k: int) -> np.ndarray:
+    """Column indices of the k largest entries per row (-1 padded), without a Python row loop."""
+    coo = m.tocoo()
+    order = np.lexsort((-coo.data, coo.row))
+    r, c = coo.row[order], coo.col[order]
+    rank = np.arange(len(r)) - np.searchsorted(r, r)
+    keep = rank < k
+    out = np.full((m.shape[0], k), -1, dtype=np.int32)
+    out[r[keep], rank[keep]] = c[keep]
+    return out
+
+
+class ProfileStore:
+    """Per-user behaviour profiles held as arrays, with a user_id -> row index."""
+
+    def __init__(self, user_ids, cluster, top_categories, impulsive, cluster_profiles, categories, slopes: sparse.csr_matrix):
+        self.user_ids = np.asarray(user_ids)
+        self.cluster = np.asarray(cluster)
+        self.top_categories = np.asarray(top_categories)
+        self.impulsive = np.asarray(impulsive)
+        self.cluster_profiles = list(cluster_profiles)
+        self.categories = list(categories)
+        self.slopes = slopes.tocsr()
+        self._index = {int(u): i for i, u in enumerate(self.user_ids.tolist())}
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        i = self._index.get(int(user_id))
+        if i is None:
+            return None
+        start, end = self.slopes.indptr[i], self.slopes.indptr[i + 1]
+        trends = {self.categories[c]: float(v) for c, v in zip(self.slopes.indices[start:end], self.slopes.data[start:end])}
+        return {
+            'profile': self.cluster_profiles[int(self.cluster[i])],
+            'cluster': int(self.cluster[i]),
+            'top_categories': [self.categories[c] for c in self.top_categories[i] if c >= 0],
+            'impulsive_score': float(self.impulsive[i]),
+            'trends': trends,
+        }
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(
+            tmp,
+            user_ids=self.user_ids, cluster=self.cluster, top_categories=self.top_categories, impulsive=self.impulsive,
+            cluster_profiles=np.array(self.cluster_profiles), categories=np.array(self.categories),
+            slopes_data=self.slopes.data, slopes_indices=self.slopes.indices, slopes_indptr=self.slopes.indptr,
+            slopes_shape=np.array(self.slopes.shape),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ProfileStore':
+        with np.load(path) as z:
+            slopes = sparse.csr_matrix((z['slopes_data'], z['slopes_indices'], z['slopes_indptr']), shape=tuple(z['slopes_shape']))
+            return cls(z['user_ids'], z['cluster'], z['top_categories'], z['impulsive'],
+                       z['cluster_profiles'].tolist(), z['categories'].tolist(), slopes)
+
+
+class BehaviourEngine:
+    def __init__(self, n_clusters: int = 8, trend_window: int = 6, batch_size: int = 4096, random_state: int = 42):
+        self.n_clusters = n_clusters
+        self.trend_window = trend_window
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, rows: Iterable[Tuple[int, str, str, float]]) -> ProfileStore:
+        """rows: (user_id, category, 'YYYY-MM...', amount) — typically daily totals from SQL."""
+        user_pos: Dict[Any, int] = {}
+        cat_pos: Dict[str, int] = {}
+        u, c, m, y = [], [], [], []
+        for user_id, category, month, amount in rows:
+            u.append(user_pos.setdefault(user_id, len(user_pos)))
+            c.append(cat_pos.setdefault(category or 'Unknown', len(cat_pos)))
+            m.append(month_index(month))
+            y.append(abs(float(amount)))
+        users, categories = list(user_pos), list(cat_pos)
+        shape = (len(users), len(categories))
+        if not users:
+            return ProfileStore([], [], np.zeros((0, 3), dtype=np.int32), [], [DEFAULT_PROFILE], categories, sparse.csr_matrix(shape))
+        u, c, m, y = np.asarray(u), np.asarray(c), np.asarray(m), np.asarray(y)
+
+        spend = sparse.coo_matrix((y, (u, c)), shape=shape).tocsr()
+        totals = np.asarray(spend.sum(axis=1)).ravel()
+        shares = sparse.diags(1.0 / np.where(totals > 0, totals, 1.0)) @ spend
+
+        # trend over the trailing window ending at the latest month in the data
+        t = m - (m.max() - self.trend_window + 1)
+        recent = t >= 0
+        slopes = trend_slopes(u[recent], c[recent], t[recent].astype(float), y[recent], shape, self.trend_window)
+
+        k = max(1, min(self.n_clusters, len(users)))
+        km = MiniBatchKMeans(n_clusters=k, batch_size=self.batch_size, random_state=self.random_state, n_init=3)
+        cluster = km.fit_predict(shares)
+        cluster_profiles = [label_profile(dict(zip(categories, centre))) for centre in km.cluster_centers_]
+
+        impulsive = np.zeros(len(users))
+        if 'Shopping' in cat_pos:
+            shopping = np.asarray(shares[:, cat_pos['Shopping']].todense()).ravel()
+            impulsive = np.where(shopping > 0.3, 0.7, 0.0)
+
+        return ProfileStore(users, cluster, top_k_per_row(spend, 3), impulsive, cluster_profiles, categories, slopes)
+
+
+def load_category_rows(session) -> Iterable[Tuple[int, str, str, float]]:
+    """Daily debit totals per user and category from the integration layer."""
+    from sqlalchemy import func, select
+    from integration.db.models import Account, Transaction
+
+    category = func.coalesce(Transaction.category_final, Transaction.category_pred, 'Unknown')
+    stmt = (
+        select(Account.user_id, category, Transaction.txn_date, func.sum(Transaction.amount))
+        .join(Account, Account.account_id == Transaction.account_id)
+        .where(Transaction.direction == 'debit')
+        .group_by(Account.user_id, category, Transaction.txn_date)
+    )
+    for user_id, cat, txn_date, total in session.execute(stmt.execution_options(yield_per=10000)):
+        yield user_id, cat, txn_date.isoformat()[:7], total
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(description='Cluster and profile every user')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///./ghci.db'))
+    p.add_argument('--store-path', default=os.path.join('data', 'behaviour_profiles.npz'))
+    p.add_argument('--clusters', type=int, default=8)
+    p.add_argument('--trend-window', type=int, default=6)
+    args = p.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        store = BehaviourEngine(n_clusters=args.clusters, trend_window=args.trend_window).fit(load_category_rows(session))
+    finally:
+        session.close()
+    store.save(args.store_path)
+    print(f'Profiled {len(store)} users -> {args.store_path}')
+
+
+if __name__ == '__main__':
+    main()
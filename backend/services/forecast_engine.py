@@ -0,0 +1,411 @@
+"""Vectorized monthly spending forecasts.
+
+Series are pre-aggregated into a (keys x months) matrix and every model is fitted for
+all keys at once: the Python loop runs over months, never over users. Fitted states are
+kept in a ForecastCache so /forecast can serve them directly, and a new month of data is
+folded into a cached state in O(1) without refitting.
+
+Series are kept per user and per (user, category) (``category_key``).
+
+Nightly refresh for every user in the integration DB:
+    python backend/services/forecast_engine.py --database-url sqlite:///./ghci.db
+Between refits, fold newly completed months into the cached states without refitting:
+    python backend/services/forecast_engine.py --database-url sqlite:///./ghci.db --incremental
+"""
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SEASON_LENGTH = 12
+MODELS = ['ses', 'holt', 'holt_winters', 'seasonal_naive']
+
+
+def month_index(month: str) -> int:
+    """'YYYY-MM' -> absolute month number (so month_index % 12 is the calendar position)."""
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def month_label(idx: int) -> str:
+    return f'{idx // 12:04d}-{idx % 12 + 1:02d}'
+
+
+def build_monthly_matrix(rows: Iterable[Tuple[Any, str, float]]) -> Tuple[List[Any], int, np.ndarray]:
+    """Aggregate (key, 'YYYY-MM...', amount) rows into a (keys x months) matrix.
+
+    Months before a key's first observation are NaN; later months with no rows are 0.
+    Returns (keys, first_month_index, Y).
+    """
+    key_pos: Dict[Any, int] = {}
+    codes, months, amounts = [], [], []
+    for key, month, amount in rows:
+        codes.append(key_pos.setdefault(key, len(key_pos)))
+        months.append(month_index(month))
+        amounts.append(float(amount))
+    keys = list(key_pos)
+    if not codes:
+        return keys, 0, np.zeros((0, 0))
+    codes = np.asarray(codes)
+    months = np.asarray(months)
+    start = int(months.min())
+    Y = np.zeros((len(keys), int(months.max()) - start + 1))
+    np.add.at(Y, (codes, months - start), np.asarray(amounts))
+    first = np.full(len(keys), Y.shape[1])
+    np.minimum.at(first, codes, months - start)
+    Y[np.arange(Y.shape[1])[None, :] < first[:, None]] = np.nan
+    return keys, start, Y
+
+
+class ForecastEngine:
+    """Seasonal naive, simple exponential smoothing, Holt and additive Holt-Winters.
+
+    Each key gets the candidate with the lowest one-step-ahead squared error. Seasonal
+    candidates are only considered once a key has two full seasons of history.
+    """
+
+    def __init__(self, season_length: int = SEASON_LENGTH, alphas=(0.1, 0.3, 0.5, 0.7, 0.9),
+                 alpha: float = 0.3, beta: float = 0.1, gamma: float = 0.1):
+        self.m = season_length
+        self.alphas = np.asarray(alphas, dtype=float)
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def fit(self, Y: np.ndarray, start: int = 0) -> Dict[str, np.ndarray]:
+        """Fit all models on every row of Y (NaN = not started yet). ``start`` is the
+        absolute month index of column 0, used to align seasonal positions."""
+        K, T = Y.shape
+        m, a, b, g = self.m, self.alpha, self.beta, self.gamma
+        observed = ~np.isnan(Y)
+        n_obs = observed.sum(axis=1)
+        first = np.where(n_obs > 0, observed.argmax(axis=1), T)
+        seasonal_ok = n_obs >= 2 * m
+        # seasonal rows are scored after their first season so all candidates compare on the same months
+        score_from = np.where(seasonal_ok, first + m, first + 1)
+
+        G = len(self.alphas)
+        ses_level = np.full((K, G), np.nan)
+        ses_sse = np.zeros((K, G))
+        level = np.full(K, np.nan)
+        trend = np.zeros(K)
+        holt_sse = np.zeros(K)
+
+        hw_level = np.full(K, np.nan)
+        hw_trend = np.zeros(K)
+        season = np.zeros((K, m))
+        hw_sse = np.zeros(K)
+        naive_sse = np.zeros(K)
+        rows = np.arange(K)
+        if seasonal_ok.any() and m > 0:
+            # initial season: deviations of the first m observations from their mean
+            idx = np.minimum(first[:, None] + np.arange(m)[None, :], T - 1)
+            first_season = Y[rows[:, None], idx]
+            base = np.nanmean(np.where(seasonal_ok[:, None], first_season, 0.0), axis=1)
+            pos = (start + idx) % m
+            season[rows[:, None], pos] = np.where(seasonal_ok[:, None], first_season - base[:, None], 0.0)
+            hw_level = np.where(seasonal_ok, base, np.nan)
+
+        for t in range(T):
+            y = Y[:, t]
+            obs = observed[:, t]
+            scored = obs & (t >= score_from)
+
+            # simple exponential smoothing, one column per alpha
+            started = ~np.isnan(ses_level)
+            err = np.where(scored[:, None] & started, y[:, None] - ses_level, 0.0)
+            ses_sse += err ** 2
+            upd = np.where(started, ses_level + self.alphas[None, :] * (y[:, None] - ses_level), y[:, None])
+            ses_level = np.where(obs[:, None], upd, ses_level)
+
+            # Holt linear trend
+            started = ~np.isnan(level)
+            pred = level + trend
+            holt_sse += np.where(scored & started, (y - pred) ** 2, 0.0)
+            new_level = np.where(started, a * y + (1 - a) * pred, y)
+            new_trend = np.where(started, b * (new_level - level) + (1 - b) * trend, 0.0)
+            level = np.where(obs, new_level, level)
+            trend = np.where(obs, new_trend, trend)
+
+            # additive Holt-Winters, updated once the initial season is behind us
+            active = obs & seasonal_ok & (t >= first + m)
+            if active.any():
+                pos = (start + t) % m
+                s = season[:, pos]
+                pred = hw_level + hw_trend + s
+                hw_sse += np.where(scored & active, (y - pred) ** 2, 0.0)
+                new_level = a * (y - s) + (1 - a) * (hw_level + hw_trend)
+                new_trend = b * (new_level - hw_level) + (1 - b) * hw_trend
+                season[:, pos] = np.where(active, g * (y - new_level) + (1 - g) * s, s)
+                hw_level = np.where(active, new_level, hw_level)
+                hw_trend = np.where(active, new_trend, hw_trend)
+
+            if t >= m:
+                naive_sse += np.where(scored & seasonal_ok, (y - np.nan_to_num(Y[:, t - m])) ** 2, 0.0)
+
+        best_alpha = ses_sse.argmin(axis=1)
+        candidates = np.column_stack([
+            ses_sse[rows, best_alpha],
+            holt_sse,
+            np.where(seasonal_ok, hw_sse, np.inf),
+            np.where(seasonal_ok, naive_sse, np.inf),
+        ])
+        last_season = np.zeros((K, m))
+        if T >= m and m > 0:
+            last_season = np.nan_to_num(Y[:, T - m:])
+        return {
+            'model': candidates.argmin(axis=1),
+            'sse': candidates.min(axis=1),
+            'n_obs': n_obs,
+            'ses_alpha': self.alphas[best_alpha],
+            'ses_level': np.nan_to_num(ses_level[rows, best_alpha]),
+            'holt_level': np.nan_to_num(level),
+            'holt_trend': trend,
+            'hw_level': np.nan_to_num(hw_level),
+            'hw_trend': hw_trend,
+            'season': season,
+            'last_season': last_season,
+            'last_month': np.full(K, start + T - 1),
+        }
+
+    def forecast(self, fitted: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+        """(keys x horizon) forecasts from fitted states; spending is clipped at zero."""
+        m = self.m
+        h = np.arange(1, horizon + 1)[None, :]
+        model = fitted['model'][:, None]
+        ses = np.repeat(fitted['ses_level'][:, None], horizon, axis=1)
+        holt = fitted['holt_level'][:, None] + h * fitted['holt_trend'][:, None]
+        K = len(fitted['model'])
+        rows = np.arange(K)[:, None]
+        pos = (fitted['last_month'][:, None] + h) % m if m else np.zeros_like(h)
+        hw = fitted['hw_level'][:, None] + h * fitted['hw_trend'][:, None] + (fitted['season'][rows, pos] if m else 0.0)
+        naive = fitted['last_season'][rows, (h - 1) % m] if m else ses
+        out = np.select([model == 0, model == 1, model == 2], [ses, holt, hw], default=naive)
+        return np.clip(out, 0.0, None)
+
+    def fit_forecast(self, Y: np.ndarray, horizon: int, start: int = 0) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        fitted = self.fit(Y, start=start)
+        return fitted, self.forecast(fitted, horizon)
+
+
+def step_state(state: Dict[str, Any], y: float, season_length: int = SEASON_LENGTH) -> None:
+    """Fold one new month into a cached state in place (same update equations as fit)."""
+    t = state['last_month'] + 1
+    model = state['model']
+    a, b, g = state['alpha'], state['beta'], state['gamma']
+    if model == 'ses':
+        state['level'] += state['ses_alpha'] * (y - state['level'])
+    elif model == 'holt':
+        prev = state['level']
+        state['level'] = a * y + (1 - a) * (prev + state['trend'])
+        state['trend'] = b * (state['level'] - prev) + (1 - b) * state['trend']
+    elif model == 'holt_winters':
+        pos = t % season_length
+        s = state['season'][pos]
+        prev = state['level']
+        state['level'] = a * (y - s) + (1 - a) * (prev + state['trend'])
+        state['trend'] = b * (state['level'] - prev) + (1 - b) * state['trend']
+        state['season'][pos] = g * (y - state['level']) + (1 - g) * s
+    state['last_season'] = (state['last_season'] + [y])[-season_length:]
+    state['last_month'] = t
+
+
+def forecast_state(state: Dict[str, Any], horizon: int, season_length: int = SEASON_LENGTH) -> List[float]:
+    out = []
+    for h in range(1, horizon + 1):
+        model = state['model']
+        if model == 'ses':
+            v = state['level']
+        elif model == 'holt':
+            v = state['level'] + h * state['trend']
+        elif model == 'holt_winters':
+            v = state['level'] + h * state['trend'] + state['season'][(state['last_month'] + h) % season_length]
+        else:
+            v = state['last_season'][(h - 1) % season_length]
+        out.append(max(float(v), 0.0))
+    return out
+
+
+class ForecastCache:
+    """Fitted per-key forecast states, persisted as JSON and updated incrementally."""
+
+    def __init__(self, path: Optional[str] = None, engine: Optional[ForecastEngine] = None):
+        self.path = str(path) if path else None
+        self.engine = engine or ForecastEngine()
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self._mtime: Optional[float] = None
+
+    @classmethod
+    def load(cls, path: str, engine: Optional[ForecastEngine] = None) -> 'ForecastCache':
+        cache = cls(path, engine)
+        cache.reload_if_changed()
+        return cache
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the file when another process (the nightly refresh) has rewritten it."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return False
+        with open(self.path) as f:
+            self.states = json.load(f)
+        self._mtime = mtime
+        return True
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.states, f)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def put_fitted(self, keys: List[Any], fitted: Dict[str, np.ndarray]) -> None:
+        e = self.engine
+        fitted_at = datetime.utcnow().isoformat()
+        for i, key in enumerate(keys):
+            model = MODELS[int(fitted['model'][i])]
+            if model == 'holt_winters':
+                level, trend = fitted['hw_level'][i], fitted['hw_trend'][i]
+            elif model == 'holt':
+                level, trend = fitted['holt_level'][i], fitted['holt_trend'][i]
+            else:
+                level, trend = fitted['ses_level'][i], 0.0
+            self.states[str(key)] = {
+                'model': model,
+                'level': float(level),
+                'trend': float(trend),
+                'season': fitted['season'][i].tolist(),
+                'last_season': fitted['last_season'][i].tolist(),
+                'last_month': int(fitted['last_month'][i]),
+                'ses_alpha': float(fitted['ses_alpha'][i]),
+                'alpha': e.alpha, 'beta': e.beta, 'gamma': e.gamma,
+                'n_obs': int(fitted['n_obs'][i]),
+                'fitted_at': fitted_at,
+            }
+
+    def observe_month(self, key: Any, month: str, total: float) -> bool:
+        """Fold a completed month into a cached state. Months already covered are ignored
+        (the nightly refit picks up late corrections); skipped months count as zero spend."""
+        state = self.states.get(str(key))
+        if state is None:
+            return False
+        idx = month_index(month)
+        if idx <= state['last_month']:
+            return False
+        while state['last_month'] < idx - 1:
+            step_state(state, 0.0, self.engine.m)
+        step_state(state, float(total), self.engine.m)
+        return True
+
+    def forecast(self, key: Any, months: int = 3) -> Optional[Dict[str, Any]]:
+        state = self.states.get(str(key))
+        if state is None:
+            return None
+        values = forecast_state(state, months, self.engine.m)
+        return {
+            'forecast': [{'month_offset': i + 1, 'month': month_label(state['last_month'] + i + 1), 'predicted_spending': round(v, 2)}
+                         for i, v in enumerate(values)],
+            'model': state['model'],
+            'fitted_at': state['fitted_at'],
+        }
+
+
+def category_key(user_id: Any, category: str) -> str:
+    """Cache key of a user's series for one category (the plain user id keys the total)."""
+    return f'{user_id}:{category}'
+
+
+def load_spending_rows(session, since: Optional[str] = None, until: Optional[str] = None) -> Iterable[Tuple[Any, str, float]]:
+    """Daily debit totals per user and per (user, category) from fact_transactions.
+
+    Each grouped row is yielded under both keys; build_monthly_matrix sums them per month.
+    ``since`` ('YYYY-MM') skips earlier months. ``until`` ('YYYY-MM', default: the current
+    month) and later months are left out, so a fit only ever sees completed months, the
+    same rule update_forecasts applies.
+    """
+    from datetime import date
+    from sqlalchemy import func, select
+    from integration.db.models import Account, Transaction
+
+    category = func.coalesce(Transaction.category_final, Transaction.category_pred, 'Uncategorized')
+    stmt = (
+        select(Account.user_id, Transaction.txn_date, category, func.sum(Transaction.amount))
+        .join(Account, Account.account_id == Transaction.account_id)
+        .where(Transaction.direction == 'debit')
+        .group_by(Account.user_id, Transaction.txn_date, category)
+    )
+    if since:
+        stmt = stmt.where(Transaction.txn_date >= date(int(since[:4]), int(since[5:7]), 1))
+    until = until or datetime.utcnow().strftime('%Y-%m')
+    stmt = stmt.where(Transaction.txn_date < date(int(until[:4]), int(until[5:7]), 1))
+    for user_id, txn_date, cat, total in session.execute(stmt.execution_options(yield_per=10000)):
+        month, total = txn_date.isoformat()[:7], abs(float(total))
+        yield user_id, month, total
+        yield category_key(user_id, cat), month, total
+
+
+def refresh_forecasts(rows: Iterable[Tuple[Any, str, float]], cache: ForecastCache) -> int:
+    """Refit every key found in ``rows`` in one vectorized pass and store the states."""
+    keys, start, Y = build_monthly_matrix(rows)
+    if not keys:
+        return 0
+    fitted = cache.engine.fit(Y, start=start)
+    cache.put_fitted(keys, fitted)
+    cache.save()
+    return len(keys)
+
+
+def update_forecasts(rows: Iterable[Tuple[Any, str, float]], cache: ForecastCache, through_month: Optional[str] = None) -> int:
+    """Fold every completed month up to ``through_month`` (default: last month) into the
+    cached states with observe_month, without refitting. Keys not in the cache are left
+    for the next refresh_forecasts. Returns the number of states that moved forward."""
+    keys, start, Y = build_monthly_matrix(rows)
+    through = month_index(through_month) if through_month else month_index(datetime.utcnow().strftime('%Y-%m')) - 1
+    row_of = {str(k): i for i, k in enumerate(keys)}
+    updated = 0
+    for key, state in cache.states.items():
+        moved = False
+        for idx in range(state['last_month'] + 1, through + 1):
+            col, i = idx - start, row_of.get(key)
+            total = Y[i, col] if i is not None and 0 <= col < Y.shape[1] and not np.isnan(Y[i, col]) else 0.0
+            moved |= cache.observe_month(key, month_label(idx), total)
+        updated += moved
+    cache.save()
+    return updated
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(description='Refit spending forecasts for all users')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///./ghci.db'))
+    p.add_argument('--cache-path', default=os.path.join('data', 'forecast_cache.json'))
+    p.add_argument('--incremental', action='store_true',
+                   help='Fold completed months into the cached states instead of refitting')
+    args = p.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        cache = ForecastCache.load(args.cache_path)
+        if args.incremental:
+            # only months after the oldest cached state are needed
+            since = min((s['last_month'] for s in cache.states.values()), default=None)
+            n = update_forecasts(load_spending_rows(session, month_label(since + 1) if since is not None else None), cache)
+        else:
+            n = refresh_forecasts(load_spending_rows(session), cache)
+    finally:
+        session.close()
+    print(f"{'Updated' if args.incremental else 'Refreshed'} {n} forecast series -> {args.cache_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Nightly risk sweep over the whole customer base.
+
+Reads the last 90 days of ``risk_daily_totals`` (maintained at ingestion) one user-id
+range at a time into dense users x days matrices, computes the 30/60/90-day features and
+scores each range with one vectorized RiskAgent.score_batch call. Only the per-user
+results are kept across ranges.
+
+    python backend/services/risk_sweep.py --database-url sqlite:///./ghci.db
+"""
+import csv
+import os
+import sys
+from datetime import date
+from typing import Dict
+
+import numpy as np
+
+from agents.risk_agent import RiskAgent
+
+
+def sweep(session, as_of: date, threshold: float = 0.2, chunk_size: int = 10000) -> Dict[str, np.ndarray]:
+    from integration.pipelines.risk_features import WINDOWS, compute_risk_features, iter_daily_matrices
+
+    agent = RiskAgent()
+    parts = []
+    for user_ids, income, expense, debits in iter_daily_matrices(session, as_of, chunk_size=chunk_size):
+        features = compute_risk_features(income, expense, debits)
+        out = {'user_id': user_ids, **agent.score_batch(features, threshold=threshold)}
+        for name in ('income', 'expense', 'ratio', 'volatility'):
+            for j, w in enumerate(WINDOWS):
+                out[f'{name}_{w}d'] = features[name][:, j]
+        parts.append(out)
+    if not parts:
+        return {'user_id': np.zeros(0, dtype=np.int64)}
+    return {k: np.concatenate([part[k] for part in parts]) for k in parts[0]}
+
+
+def write_csv(result: Dict[str, np.ndarray], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    columns = list(result)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        w.writerows(zip(*(result[c].tolist() for c in columns)))
+    os.replace(tmp, path)
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(description='Score cash-flow risk for every user')
+    p.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///./ghci.db'))
+    p.add_argument('--output', default=os.path.join('data', 'risk_scores.csv'))
+    p.add_argument('--as-of', default=None, help='YYYY-MM-DD, defaults to today')
+    p.add_argument('--threshold', type=float, default=0.2)
+    args = p.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    as_of = date.fromisoformat(args.as_of) if args.as_of else date.today()
+    session = sessionmaker(bind=create_engine(args.database_url))()
+    try:
+        result = sweep(session, as_of, args.threshold)
+    finally:
+        session.close()
+    write_csv(result, args.output)
+    print(f"Scored {len(result['user_id'])} users as of {as_of} -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+TEXTS = ('coffee cafe latte', 'amazon order store', 'electricity power bill')
+LABELS = ('Dining', 'Shopping', 'Utilities')
+
+
+def _fit(texts, labels, vocabulary=(), C=1.0):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    vec = TfidfVectorizer().fit(list(texts) + list(vocabulary))
+    clf = LogisticRegression(C=C, max_iter=500).fit(vec.transform(texts), labels)
+    return vec, clf
+
+
+@pytest.fixture
+def compact_export(tmp_path):
+    """Factory: fit TF-IDF + LogisticRegression and the fraud pipeline on ``texts * repeat``
+    and write a compact export to ``tmp_path / name``; returns its path.
+
+    ``amounts`` and ``fraud`` are repeated alongside the texts (by default the second text
+    is the large, fraudulent one).
+    """
+    def export(texts=TEXTS, labels=LABELS, repeat=5, amounts=(100.0, 90000.0, 500.0), fraud=(0, 1, 0),
+               C=1.0, name='compact'):
+        import pandas as pd
+        from ML.export_compact import export_compact
+        from ML.train import fit_fraud_pipeline
+
+        texts, labels = list(texts) * repeat, list(labels) * repeat
+        vec, clf = _fit(texts, labels, C=C)
+        df = pd.DataFrame({'text_clean': texts, 'amount': list(amounts) * repeat, 'fraud': list(fraud) * repeat})
+        path = str(tmp_path / name)
+        export_compact(path, vec, clf, fit_fraud_pipeline(vec, df, amount_col='amount'))
+        return path
+    return export
+
+
+@pytest.fixture
+def model_pickles(tmp_path):
+    """Factory: pickle a TF-IDF vectorizer and category model fitted on ``texts * repeat`` to
+    ``tmp_path / name`` (the layout ``publish_pickles`` reads); returns its path.
+
+    ``vocabulary`` texts only extend the vectorizer, so later feedback on them has features.
+    """
+    def write(labels=LABELS, texts=TEXTS, repeat=5, vocabulary=(), name='pkl'):
+        import joblib
+
+        vec, clf = _fit(list(texts) * repeat, list(labels) * repeat, vocabulary)
+        path = str(tmp_path / name)
+        os.makedirs(path, exist_ok=True)
+        joblib.dump(vec, os.path.join(path, 'vectorizer.pkl'))
+        joblib.dump(clf, os.path.join(path, 'cat_model.pkl'))
+        return path
+    return write
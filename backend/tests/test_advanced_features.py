@@ -0,0 +1,170 @@
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "ML"))
+from advanced_ml import AdvancedTransactionClassifier, NUMERIC_COLS, extract_feature_frame
+
+TEXTS = [
+    "Starbucks Coffee Day purchase", "AMAZON.IN order #123", "Suspicious unknown UPI payment",
+    "", None, "Uber  ride   to airport", "Netflix/Hotstar subscription", "paytm gpay phonepe 42",
+    "mcdonalds fast-food", "HDFC Bank EMI payment",
+]
+AMOUNTS = [450, 7500, 25000, 0, 10, 320.5, 1300, -50, 99, 155000]
+
+
+def _row_features(clf, text, amount):
+    # the per-row logic extract_features used before it was vectorized
+    t = clf.preprocess_text(text)
+    return {
+        'text_clean': t,
+        'word_count': len(t.split()),
+        'char_count': len(t),
+        'amount': amount,
+        'amount_log': np.log1p(amount) if amount > 0 else 0,
+        'has_numbers': bool(re.search(r'\d', t)),
+        'has_brand': any(b in t for b in ['coffee shop', 'fast food', 'online shopping', 'ride sharing', 'streaming service', 'digital payment']),
+        'has_suspicious': any(w in t for w in ['unknown', 'suspicious', 'unauthorized', 'fake', 'fraud']),
+    }
+
+
+def test_feature_frame_matches_row_extraction():
+    clf = AdvancedTransactionClassifier()
+    frame = extract_feature_frame(TEXTS, AMOUNTS)
+    for got, (text, amount) in zip(frame.to_dict('records'), zip(TEXTS, AMOUNTS)):
+        want = _row_features(clf, text, amount)
+        assert got['text_clean'] == want['text_clean']
+        for col in NUMERIC_COLS:
+            assert np.isclose(float(got[col]), float(want[col])), (text, col)
+
+
+def test_predict_batch_matches_predict():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    clf = AdvancedTransactionClassifier()
+    frame = extract_feature_frame(TEXTS, AMOUNTS)
+    clf.vectorizer = TfidfVectorizer().fit(frame['text_clean'])
+    clf.scaler = StandardScaler().fit(frame[NUMERIC_COLS].values)
+    clf.label_encoder = LabelEncoder().fit(['Dining', 'Shopping', 'Bills'])
+    X = clf.transform(frame)
+    y = clf.label_encoder.transform(['Dining', 'Shopping', 'Bills', 'Bills', 'Bills', 'Shopping', 'Shopping', 'Bills', 'Dining', 'Bills'])
+    clf.category_model = LogisticRegression(max_iter=500).fit(X, y)
+    clf.fraud_model = LogisticRegression(max_iter=500).fit(X, [0, 0, 1, 0, 0, 0, 0, 0, 0, 1])
+
+    texts = ["Starbucks latte", "unknown transfer", "Flipkart order"]
+    batch = clf.predict_batch(texts, [300, 90000, None])
+    assert batch == [clf.predict(t, a) for t, a in zip(texts, [300, 90000, None])]
+
+
+def test_serving_tier_reports_latency_and_respects_budget():
+    from scipy import sparse
+    from sklearn.ensemble import RandomForestClassifier
+    from serving_tier import build_serving_tier, select_model
+
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 3, 300)
+    X = sparse.random(300, 120, density=0.05, random_state=0, format='csr')
+    X = sparse.hstack([X, sparse.csr_matrix(np.eye(3)[y] * 2.0)]).tocsr()
+    teacher = RandomForestClassifier(n_estimators=20, random_state=0).fit(X[:240], y[:240])
+
+    chosen, model, reports = build_serving_tier(X[:240], y[:240], X[240:], y[240:], teacher=teacher, budget_ms=1e6)
+    names = [r['name'] for r in reports]
+    assert names == ['linear', 'hist_gb', 'distilled', 'teacher']
+    for r in reports:
+        assert 0 < r['row_p50_ms'] <= r['row_p99_ms']
+        assert r['batch_size'] == 60
+    # generous budget: the most accurate non-teacher candidate wins
+    assert chosen == max(reports[:3], key=lambda r: r['accuracy'])['name']
+    assert model.predict(X[240:]).shape == (60,)
+    # nothing fits: fall back to the fastest
+    assert select_model(reports[:3], 0.0) == min(reports[:3], key=lambda r: r['row_p99_ms'])['name']
+
+
+def test_orchestrator_search_caches_fold_matrices(tmp_path):
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from ML.train_orchestrator import TrainingOrchestrator, fold_key
+
+    words = {'Dining': 'coffee cafe latte', 'Shopping': 'amazon order store', 'Bills': 'electricity bill power'}
+    rng = np.random.default_rng(1)
+    cats = rng.choice(list(words), 60)
+    texts = [' '.join(rng.choice(words[c].split(), 2)) + f' ref{i}' for i, c in enumerate(cats)]
+    fraud = (rng.random(60) < 0.3).astype(int)
+
+    orch = TrainingOrchestrator(cache_dir=str(tmp_path), n_jobs=2, n_splits=3, vec_params={'ngram_range': (1, 1)})
+    grids = {'category': [{'C': 0.01}, {'C': 10.0}], 'fraud': [{'C': 1.0, 'class_weight': 'balanced'}]}
+    res = orch.search('key1', texts, {'category': cats, 'fraud': fraud}, grids)
+    assert res['category']['best_params'] == {'C': 10.0}
+    assert res['category']['cv'][1]['mean_f1'] > 0.9
+    assert len(res['fraud']['cv'][0]['fold_f1']) == 3
+
+    # second run on the same dataset key is served from the cache
+    folds = orch.folds(cats)
+    assert all(orch._vectorize.check_call_in_cache('key1', fold_key(i, tr, ev), orch.vec_params, [], [])
+               for i, (tr, ev) in enumerate(folds))
+    cached = orch.fold_matrices('key1', texts, folds)
+    assert cached[0][0].shape[0] == len(folds[0][0])
+
+    # stratifying on another target gives other folds, which must not reuse the cached matrices
+    other = orch.folds(fraud)
+    assert not np.array_equal(other[0][0], folds[0][0])
+    for (tr, ev), (X_tr, X_ev) in zip(other, orch.fold_matrices('key1', texts, other)):
+        vec = TfidfVectorizer(**orch.vec_params).fit(np.asarray(texts)[tr])
+        assert np.allclose(X_tr.toarray(), vec.transform(np.asarray(texts)[tr]).toarray()) and X_ev.shape[0] == len(ev)
+
+
+def test_fraud_pipeline_fit_on_shared_matrix_matches_transform():
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from ML.train import fit_fraud_pipeline
+
+    texts = ['coffee cafe latte', 'grocery vegetables fruits', 'electricity power bill', 'unknown transfer'] * 5
+    df = pd.DataFrame({'text_clean': texts, 'amount': [100.0, 900.0, 500.0, 90000.0] * 5, 'fraud': [0, 0, 0, 1] * 5})
+    vec = TfidfVectorizer()
+    X_full = vec.fit_transform(texts)
+
+    shared = fit_fraud_pipeline(vec, df, amount_col='amount', X_text=X_full)
+    plain = fit_fraud_pipeline(vec, df, amount_col='amount')
+    assert np.allclose(shared.named_steps['clf'].coef_, plain.named_steps['clf'].coef_)
+    new = df.iloc[:3].assign(text_clean=['latte cafe', 'unknown', 'power bill'])
+    assert np.allclose(shared.predict_proba(new), plain.predict_proba(new))
+
+
+
+def test_serving_tier_scores_teacher_on_held_out_rows(tmp_path):
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(3)
+    words = {'Dining': 'coffee cafe latte', 'Shopping': 'amazon order store', 'Bills': 'electricity bill power'}
+    cats = rng.choice(list(words), 200)
+    # a quarter of the labels are noise, so only a model that saw the test rows can score them perfectly
+    labels = np.where(rng.random(200) < 0.25, rng.choice(list(words), 200), cats)
+    df = pd.DataFrame({'text': [' '.join(rng.choice(words[c].split(), 2)) + f' ref{i}' for i, c in enumerate(cats)],
+                       'amount': rng.uniform(10, 5000, 200).round(2), 'category': labels,
+                       'fraud': (rng.random(200) < 0.2).astype(int)})
+    path = str(tmp_path / 'train.csv')
+    df.to_csv(path, index=False)
+
+    clf = AdvancedTransactionClassifier()
+    frame = extract_feature_frame(df['text'], df['amount'])
+    clf.vectorizer = TfidfVectorizer().fit(frame['text_clean'])
+    clf.scaler = StandardScaler().fit(frame[NUMERIC_COLS].values)
+    clf.label_encoder = LabelEncoder().fit(df['category'])
+    X = clf.transform(frame)
+    clf.category_model = DecisionTreeClassifier(random_state=0).fit(X, clf.label_encoder.transform(df['category']))
+    clf.fraud_model = DecisionTreeClassifier(random_state=0).fit(X, df['fraud'])
+    assert clf.category_model.score(X, clf.label_encoder.transform(df['category'])) == 1.0
+
+    report = clf.build_serving_tier(path, budget_ms=1e6)
+    for task in ('category', 'fraud'):
+        teacher = [r for r in report['tasks'][task]['candidates'] if r['name'] == 'teacher'][0]
+        assert teacher['accuracy'] < 0.95
+    assert clf.category_model.score(X, clf.label_encoder.transform(df['category'])) == 1.0
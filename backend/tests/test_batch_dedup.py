@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.merchant_index import MerchantIndex
+from models.predict import ModelPredictor, amount_bucket, clean_text, dedupe_batch
+from services.batch_inference import BatchInference
+
+
+def test_dedupe_batch_groups_by_text_and_keys():
+    texts = [clean_text(t) for t in ['UPI/Swiggy', 'upi swiggy', 'Netflix.com', 'UPI-SWIGGY', 'netflix com']]
+    first, inverse = dedupe_batch(texts)
+    assert first.tolist() == [0, 2] and inverse.tolist() == [0, 0, 1, 0, 1]
+
+    first, inverse = dedupe_batch(texts, amount_bucket([200, 250, 649, 90000, 649]))
+    assert first.tolist() == [0, 2, 3] and inverse.tolist() == [0, 0, 1, 2, 1]
+    assert dedupe_batch([])[0].size == 0
+
+
+def test_batch_predict_matches_per_row_predict(compact_export):
+    predictor = ModelPredictor(compact_dir=compact_export(),
+                               merchant_index=MerchantIndex.from_entries({'netflix': ('Entertainment', 0.9)}))
+
+    rows = [{'description': d, 'amount': a} for d, a in [
+        ('Coffee Cafe Latte', 120.0), ('coffee-cafe latte', 95000.0), ('AMAZON order store', 300.0),
+        ('NETFLIX.COM 649', 649.0), ('coffee cafe latte', None), ('amazon order store', 300.0)]]
+    calls = []
+    transform = predictor.vectorizer.transform
+    predictor.vectorizer.transform = lambda batch: calls.append(len(batch)) or transform(batch)
+    batch = predictor.batch_predict([dict(r) for r in rows])
+    predictor.vectorizer.transform = transform
+    # category: coffee only (netflix resolved by the index, amazon by a keyword rule, repeats shared);
+    # fraud (predict + predict_proba): only the 95000 row is escalated by the cascade
+    assert calls == [1, 1, 1]
+
+    for r, b in zip(rows, batch):
+        single = predictor.predict(r['description'], r['amount'])
+        for key in ('category', 'category_confidence', 'fraud_risk_level', 'is_fraud', 'risk_factors'):
+            assert b.get(key) == single.get(key), key
+        assert np.isclose(b['fraud_probability'], single['fraud_probability'])
+    assert batch[0]['fraud_probability'] != batch[1]['fraud_probability']
+    assert batch[3]['category_source'] == 'merchant_index'
+
+
+def test_batch_inference_calls_predictor_once_per_text():
+    calls = []
+
+    def predictor(text):
+        calls.append(text)
+        return ('Dining', 0.9) if 'swiggy' in text.lower() else ('Other', 0.3)
+
+    rows = [{'description': d} for d in ['UPI/SWIGGY', 'upi swiggy', 'NETFLIX', 'UPI SWIGGY', 'netflix']]
+    res = BatchInference(predictor, db=None).run_batch(rows)
+    assert calls == ['UPI/SWIGGY', 'NETFLIX']
+    assert [r['predicted_category'] for r in res] == ['Dining', 'Dining', 'Other', 'Dining', 'Other']
@@ -0,0 +1,61 @@
+import csv
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from integration.db.db import Base
+from integration.db.models import Account, Transaction
+from services.batch_scoring import score_backlog
+
+DESCRIPTIONS = ['coffee cafe latte', 'amazon order store', 'electricity power bill']
+
+
+def _setup(tmp_path, compact_export, n=60):
+    compact_export(DESCRIPTIONS)
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    acct = Account(user_id=1, account_name='Main', account_type='savings')
+    db.add(acct)
+    db.commit()
+    db.add_all([
+        Transaction(account_id=acct.account_id, txn_date=date(2025, 1, 1), description_raw=DESCRIPTIONS[i % 3].upper(),
+                    description_clean=None if i % 2 else DESCRIPTIONS[i % 3], amount=[100, 90000, 500][i % 3],
+                    category_final='Manual' if i == 0 else None)
+        for i in range(n)
+    ])
+    db.commit()
+    return db
+
+
+def test_backlog_scoring_resumes_from_checkpoint(tmp_path, compact_export):
+    db = _setup(tmp_path, compact_export)
+    ckpt = str(tmp_path / 'ckpt.json')
+    fraud_csv = str(tmp_path / 'fraud.csv')
+    first = score_backlog(db, str(tmp_path / 'compact'), window=20, chunk_size=7, checkpoint_path=ckpt,
+                          fraud_output=fraud_csv, max_rows=20)
+    assert first['rows_this_run'] == 20 and first['last_id'] == 20
+    assert db.query(Transaction).filter(Transaction.category_pred.is_(None)).count() == 40
+
+    second = score_backlog(db, str(tmp_path / 'compact'), n_jobs=2, window=25, chunk_size=10, checkpoint_path=ckpt,
+                           resume=True, fraud_output=fraud_csv)
+    assert second['rows_this_run'] == 40 and second['rows'] == 60 and second['rows_per_sec'] > 0
+
+    db.expire_all()
+    rows = db.query(Transaction).order_by(Transaction.transaction_id).all()
+    assert [r.category_pred for r in rows[:3]] == ['Dining', 'Shopping', 'Utilities']
+    assert all(r.category_pred for r in rows) and float(rows[1].ml_confidence) > 0.3
+    # an existing manual category is kept
+    assert rows[0].category_final == 'Manual' and rows[3].category_final == 'Dining'
+    with open(fraud_csv) as fh:
+        flagged = [int(r[0]) for r in csv.reader(fh)]
+    assert flagged == [r.transaction_id for r in rows if r.transaction_id % 3 == 2]
+
+    # nothing left to score; --rescore walks everything again
+    assert score_backlog(db, str(tmp_path / 'compact'))['rows_this_run'] == 0
+    assert score_backlog(db, str(tmp_path / 'compact'), rescore=True, window=100)['rows_this_run'] == 60
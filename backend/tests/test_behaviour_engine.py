@@ -0,0 +1,100 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agents.behaviour_agent import BehaviourAgent
+from services.behaviour_engine import BehaviourEngine, ProfileStore
+from services.forecast_engine import month_label
+
+
+def _rows():
+    rows = []
+    for i in range(6):
+        month = month_label(2024 * 12 + i)
+        # user 1: mostly shopping, rising by 100 a month
+        rows.append((1, 'Shopping', month, 500 + 100 * i))
+        rows.append((1, 'Groceries', month, 200))
+        # user 2: dining heavy, flat
+        rows.append((2, 'Dining', month, 400))
+        rows.append((2, 'Groceries', month, 300))
+        # user 3: groceries and bills
+        rows.append((3, 'Groceries', month, 600))
+        rows.append((3, 'Bills', month, -300))
+    return rows
+
+
+def test_profiles_slopes_and_store_roundtrip(tmp_path):
+    store = BehaviourEngine(n_clusters=3, trend_window=6).fit(_rows())
+    assert len(store) == 3
+
+    p1 = store.get(1)
+    assert p1['profile'] == 'Impulsive'
+    assert p1['top_categories'][0] == 'Shopping'
+    assert p1['impulsive_score'] == 0.7
+    assert abs(p1['trends']['Shopping'] - 100.0) < 1e-9
+    assert abs(p1['trends'].get('Groceries', 0.0)) < 1e-9
+    assert store.get(2)['profile'] == 'Social Spender'
+    assert store.get(3)['profile'] == 'Budget-conscious'
+    assert store.get(99) is None
+
+    path = str(tmp_path / 'profiles.npz')
+    store.save(path)
+    loaded = ProfileStore.load(path)
+    assert loaded.get(1) == p1
+
+
+def test_agent_uses_store_and_matches_batch_slopes():
+    rows = _rows()
+    store = BehaviourEngine(n_clusters=3, trend_window=6).fit(rows)
+    agent = BehaviourAgent(profile_store=store)
+    txns = [{'date': f'{m}-15', 'amount': -a, 'category': c} for u, c, m, a in rows if u == 1]
+
+    assert agent.infer_profile(txns, user_id=1) == store.get(1)
+    trends = agent.detect_trends(txns)
+    assert trends['slopes']['Shopping'] == round(store.get(1)['trends']['Shopping'], 2)
+    assert trends['rising'] == ['Shopping']
+    # per-request path applies the same rules
+    assert agent.infer_profile(txns)['profile'] == 'Impulsive'
+    assert np.isclose(BehaviourAgent().infer_profile(txns)['impulsive_score'], 0.7)
+
+
+def test_request_paths_read_stored_profile():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routers.profile_router import router
+    from coordinator.coordinator_engine import CoordinatorEngine
+    from coordinator.scenario_simulator import ScenarioSimulator
+
+    store = BehaviourEngine(n_clusters=3, trend_window=6).fit(_rows())
+    coordinator = CoordinatorEngine(lambda text: ('Dining', 0.9))
+    coordinator.behaviour.profile_store = store
+    txns = [{'description': 'cafe', 'amount': 100.0, 'date': '2024-01-05'}]
+    assert coordinator.run_full_analysis(txns, user_id=3)['profile'] == store.get(3)
+    assert coordinator.run_full_analysis(txns)['profile']['profile'] == 'Social Spender'
+    assert ScenarioSimulator(coordinator).simulate_income_change(txns, 10.0, user_id=1)['profile'] == store.get(1)
+
+    app = FastAPI()
+    app.include_router(router, prefix='/api/v1')
+    app.state.coordinator = coordinator
+    client = TestClient(app)
+    assert client.get('/api/v1/profile/1').json() == {'user_id': 1, **store.get(1)}
+    assert client.get('/api/v1/profile/99').status_code == 404
+
+
+def test_agent_rereads_profiles_after_nightly_rewrite(tmp_path):
+    path = str(tmp_path / 'profiles.npz')
+    agent = BehaviourAgent(profile_path=path)
+    assert agent.get_profile(1) is None
+
+    rows = _rows()
+    BehaviourEngine(n_clusters=3, trend_window=6).fit(rows).save(path)
+    assert agent.get_profile(1)['profile'] == 'Impulsive' and agent.get_profile(4) is None
+
+    rows += [(4, 'Dining', r[2], 400) for r in rows if r[0] == 2]
+    store = BehaviourEngine(n_clusters=3, trend_window=6).fit(rows)
+    store.save(path)
+    os.utime(path, (agent._profile_mtime + 1, agent._profile_mtime + 1))
+    assert agent.get_profile(4) == store.get(4)
@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.cascade import Cascade, keyword_category
+from models.merchant_index import MerchantIndex
+from models.predict import ModelPredictor
+
+
+def _predictor(compact_export, cascade):
+    path = compact_export(['coffee cafe latte', 'grocery vegetables fruits', 'electricity power bill'],
+                          ['Dining', 'Groceries', 'Utilities'])
+    return ModelPredictor(compact_dir=path, cascade=cascade,
+                          merchant_index=MerchantIndex.from_entries({'local kirana': ('Groceries', 0.97)}))
+
+
+def test_keyword_rules_need_one_category():
+    assert keyword_category('upi swiggy order') == 'Dining'
+    assert keyword_category('amazon flipkart sale') == 'Shopping'
+    assert keyword_category('uber netflix') is None
+    assert Cascade(keyword_rules=False).keyword('swiggy') is None
+
+
+def test_fraud_model_only_for_escalated_rows(compact_export):
+    predictor = _predictor(compact_export, Cascade(fraud_amount=25000, review_amount=2000))
+    calls = []
+    model_scores = predictor._fraud_model_scores
+    predictor._fraud_model_scores = lambda texts, amounts: calls.append(len(texts)) or model_scores(texts, amounts)
+
+    rows = [('LOCAL KIRANA 881', 450.0), ('UPI SWIGGY 1', 300.0), ('coffee cafe latte', 150.0),
+            ('electricity power bill', 5000.0), ('local kirana', 60000.0), ('unknown refund', 300.0)]
+    results = [predictor.predict(t, a) for t, a in rows]
+    assert [r['fraud_stage'] for r in results] == ['skipped', 'skipped', 'skipped', 'model', 'model', 'model']
+    assert calls == [1, 1, 1]
+    assert [r['category_source'] for r in results[:3]] == ['merchant_index', 'keyword_rule', 'model']
+    assert results[0]['fraud_probability'] == 0.0 and results[0]['fraud_risk_level'] == 'LOW'
+
+    stats = predictor.cascade.stats.snapshot()
+    assert stats['lookup']['rows'] == 6 and stats['lookup']['hits'] == 3
+    assert stats['fraud'] == dict(stats['fraud'], rows=6, hits=3, skipped=3)
+    assert stats['model']['avg_ms_per_row'] is not None
+
+    batch = predictor.batch_predict([{'text': t, 'amount': a} for t, a in rows])
+    scored = predictor.score_batch([t for t, _ in rows], [a for _, a in rows])
+    for r, b, f in zip(results, batch, scored['fraud_probability']):
+        assert b['fraud_stage'] == r['fraud_stage']
+        assert np.isclose(b['fraud_probability'], r['fraud_probability']) and np.isclose(f, r['fraud_probability'])
+
+
+def test_disabled_cascade_scores_every_row(compact_export):
+    predictor = _predictor(compact_export, Cascade(enabled=False))
+    result = predictor.predict('UPI SWIGGY 1', 300.0)
+    assert result['fraud_stage'] == 'model' and result['category_source'] == 'rules'
+    assert predictor.predict('LOCAL KIRANA', 450.0)['category_source'] == 'merchant_index'
+
+
+def test_cascade_keeps_fraud_recall_on_labelled_data(tmp_path):
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from ML.export_compact import export_compact
+    from ML.train import fit_fraud_pipeline
+    from models.predict import clean_text
+
+    df = pd.read_csv(Path(__file__).parent.parent.parent / 'ML' / 'data' / 'extended_multi.csv')
+    df['text_clean'] = df['text_clean'].map(clean_text)
+    train, test = train_test_split(df, test_size=0.3, stratify=df['fraud'], random_state=42)
+    vec = TfidfVectorizer(ngram_range=(1, 2)).fit(train['text_clean'])
+    clf = LogisticRegression(max_iter=1000).fit(vec.transform(train['text_clean']), train['category'])
+    export_compact(str(tmp_path / 'compact'), vec, clf, fit_fraud_pipeline(vec, train, amount_col='amount'))
+
+    recall = {}
+    for enabled in (True, False):
+        predictor = ModelPredictor(compact_dir=str(tmp_path / 'compact'), cascade=Cascade(enabled=enabled),
+                                   merchant_index=MerchantIndex())
+        flagged = [predictor.predict(t, a)['is_fraud'] for t, a in zip(test['text_clean'], test['amount'])]
+        recall[enabled] = np.mean(np.array(flagged)[test['fraud'].to_numpy() == 1])
+    assert recall[False] > 0.9 and recall[True] >= recall[False]
+
+
+def test_risk_gate_matches_stems_and_risk_categories():
+    cascade = Cascade(review_amount=2000)
+    assert cascade.escalate('fraudulent transaction alert', 300.0, {'category': 'Transfer'})
+    assert cascade.escalate('chargebacklfrom bank', 120.0, {'category': 'Transfer'})
+    assert cascade.escalate('fjaudulent transaction alert', 300.0, {'category': 'Fraud'})
+    assert not cascade.escalate('dinner at local restaurant', 60.0, {'category': 'Dining'})
+    assert not Cascade(risk_categories=['Suspicious']).escalate('fjaudulent alert', 300.0, {'category': 'Fraud'})
+
+
+def test_failed_batch_fraud_call_uses_rules(compact_export):
+    predictor = _predictor(compact_export, Cascade())
+    predictor._fraud_model_scores = lambda texts, amounts: None
+
+    class Exploding:
+        def predict(self, frame):
+            raise AssertionError('fraud pipeline should not be called again per row')
+        predict_proba = predict
+
+    predictor.fraud_pipeline = Exploding()
+    result = predictor.predict('unknown scam transfer', 60000.0)
+    assert result['fraud_stage'] == 'rules' and result['fraud_probability'] > 0.5
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from ML.export_compact import export_compact
+from ML.train import fit_fraud_pipeline
+from ML.train_out_of_core import make_vectorizer
+from models.predict import ModelPredictor, load_compact
+
+WORDS = {'Dining': 'coffee cafe latte swiggy', 'Shopping': 'amazon order store flipkart', 'Bills': 'electricity bill power broadband'}
+
+
+def _data(n=90, seed=0):
+    rng = np.random.default_rng(seed)
+    cats = rng.choice(list(WORDS), n)
+    texts = [' '.join(rng.choice(WORDS[c].split(), 3)) + f' ref{i % 7}' for i, c in enumerate(cats)]
+    return texts, cats
+
+
+@pytest.mark.parametrize('make_model', ['lr', 'sgd', 'nb'])
+def test_compact_category_model_matches_sklearn(tmp_path, make_model):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import MultinomialNB
+
+    texts, cats = _data()
+    vec = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True).fit(texts)
+    X = vec.transform(texts)
+    clf = {'lr': lambda: LogisticRegression(max_iter=500), 'sgd': lambda: SGDClassifier(loss='log_loss', random_state=0),
+           'nb': lambda: MultinomialNB()}[make_model]().fit(X, cats)
+
+    export_compact(str(tmp_path), vectorizer=vec, cat_model=clf)
+    loaded = load_compact(str(tmp_path))
+    assert isinstance(loaded['vectorizer'].vocab, np.memmap)
+
+    queries = ['coffee latte at cafe', 'AMAZON order', 'never seen tokens', '', 'power bill ref3 ref3']
+    X_q = vec.transform(queries)
+    assert np.allclose(loaded['vectorizer'].transform(queries).toarray(), X_q.toarray())
+    assert np.allclose(loaded['cat_model'].predict_proba(loaded['vectorizer'].transform(queries)), clf.predict_proba(X_q))
+    assert loaded['cat_model'].predict(X_q).tolist() == clf.predict(X_q).tolist()
+
+
+def test_compact_fraud_pipeline_and_hashing_vectorizer(tmp_path):
+    texts, cats = _data()
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'text_clean': texts, 'amount': rng.gamma(2, 500, len(texts)), 'fraud': (cats == 'Shopping').astype(int)})
+
+    vec = make_vectorizer(n_features=2 ** 10, idf=np.linspace(1, 3, 2 ** 10))
+    vec.transform(['warm up'])
+    fraud = fit_fraud_pipeline(vec, df, amount_col='amount')
+    manifest = export_compact(str(tmp_path), fraud_pipeline=fraud)
+    assert manifest['vectorizers']['fraud_text']['kind'] == 'hashing'
+
+    loaded = load_compact(str(tmp_path))
+    test = df.iloc[:10].drop(columns='fraud')
+    assert np.allclose(loaded['fraud_pipeline'].predict_proba(test), fraud.predict_proba(test))
+
+
+def test_model_predictor_prefers_compact_export(tmp_path):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    texts, cats = _data()
+    vec = TfidfVectorizer().fit(texts)
+    clf = LogisticRegression(max_iter=500).fit(vec.transform(texts), cats)
+    df = pd.DataFrame({'text_clean': texts, 'amount': np.arange(len(texts), dtype=float), 'fraud': (cats == 'Bills').astype(int)})
+    manifest = export_compact(str(tmp_path), vec, clf, fit_fraud_pipeline(vec, df, amount_col='amount'))
+    # the fraud pipeline shares the category vectorizer, so it is stored once
+    assert list(manifest['vectorizers']) == ['text'] and manifest['models']['fraud']['vectorizer'] == 'text'
+
+    predictor = ModelPredictor(compact_dir=str(tmp_path))
+    assert predictor.artifact_format == 'compact'
+    res = predictor.predict('electricity power bill', 1200)
+    assert res['top_categories'][0]['category'] == 'Bills'
+    assert 0.0 <= res['fraud_probability'] <= 1.0
@@ -0,0 +1,77 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from integration.db.db import Base
+from integration.db.models import Account, FeedbackLog, Transaction
+from ML.compact_models import compact
+from ML.feedback_retrain import update_from_feedback
+from models.cascade import Cascade
+from models.predict import ModelPredictor
+from models.shared_hosting import prepare_shared_models, publish_version, read_current, version_dir, version_info
+
+TRAIN = {'Dining': 'coffee cafe latte', 'Shopping': 'amazon order store', 'Bills': 'electricity power bill'}
+
+
+@pytest.mark.parametrize('dtype', [None, 'int8'])
+def test_feedback_update_publishes_version_and_advances_watermark(tmp_path, model_pickles, dtype):
+    # the corrected texts are in the frozen vocabulary but not in the training rows
+    pickles = model_pickles(list(TRAIN), list(TRAIN.values()), vocabulary=['netflix subscription', 'coffee beans store'])
+    store = str(tmp_path / 'store')
+    v1 = prepare_shared_models(store, pickles)
+    if dtype:
+        compact(version_dir(store, v1), str(tmp_path / 'small'), threshold=0.0, dtype=dtype)
+        v1 = publish_version(store, str(tmp_path / 'small'))
+
+    db = sessionmaker(bind=create_engine('sqlite:///:memory:'))()
+    Base.metadata.create_all(db.get_bind())
+    acct = Account(user_id=1, account_name='Main', account_type='savings')
+    db.add(acct)
+    db.commit()
+    txns = [Transaction(account_id=acct.account_id, txn_date=date(2025, 1, 1), description_raw=d.upper(), amount=100)
+            for d in ['Netflix Subscription', 'Coffee Beans Store']]
+    db.add_all(txns)
+    db.commit()
+    db.add_all([
+        FeedbackLog(transaction_id=txns[0].transaction_id, predicted_category='Bills', corrected_category='Shopping'),
+        FeedbackLog(transaction_id=txns[0].transaction_id, predicted_category='Bills', corrected_category='Entertainment'),
+        FeedbackLog(transaction_id=txns[1].transaction_id, predicted_category='Shopping', corrected_category='Dining'),
+    ])
+    db.commit()
+
+    summary = update_from_feedback(db, store)
+    v2 = summary['published']
+    assert v2 and read_current(store) == v2 and v2 != v1
+    assert summary['n_feedback'] == 2 and summary['new_classes'] == ['Entertainment']
+    assert summary['feedback_accuracy_after'] == 1.0
+    info = version_info(store, v2)
+    assert info['parent'] == v1 and info['feedback_watermark'] == 3
+    # the update keeps the parent's compaction
+    with open(f"{version_dir(store, v1)}/manifest.json") as fh:
+        parent_spec = json.load(fh)['models']['category']
+    with open(f"{version_dir(store, v2)}/manifest.json") as fh:
+        spec = json.load(fh)['models']['category']
+    assert spec.get('dtype') == parent_spec.get('dtype')
+    assert np.load(f"{version_dir(store, v2)}/{spec['coef']}").dtype == np.load(f"{version_dir(store, v1)}/{parent_spec['coef']}").dtype
+    assert ('coef_scale' in spec) == (dtype == 'int8')
+
+    # cascade off: 'netflix' would otherwise be settled by a keyword rule before the model
+    updated = ModelPredictor(compact_dir=version_dir(store, v2), cascade=Cascade(enabled=False))
+    top = lambda text: updated.predict(text)['top_categories'][0]['category']
+    assert top('netflix subscription') == 'Entertainment'
+    assert top('coffee beans store') == 'Dining'
+    # the rest of the model is untouched
+    assert [top(t) for t in TRAIN.values()] == list(TRAIN)
+
+    # nothing new since the watermark: no version is published
+    assert update_from_feedback(db, store)['published'] is None
+    assert np.array_equal(np.load(f"{version_dir(store, v1)}/text_vocab.npy"), np.load(f"{version_dir(store, v2)}/text_vocab.npy"))
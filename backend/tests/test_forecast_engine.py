@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from services.forecast_engine import ForecastCache, ForecastEngine, build_monthly_matrix, month_index, month_label
+
+
+def _rows():
+    rows = []
+    for i in range(36):
+        month = month_label(2022 * 12 + i)
+        rows.append(('seasonal', month, 1000 + (800 if i % 12 == 11 else 0)))
+        rows.append(('flat', month, 500))
+    # short series that starts late
+    for i in range(30, 36):
+        rows.append(('new', month_label(2022 * 12 + i), 100 * (i - 29)))
+    return rows
+
+
+def test_fit_is_vectorized_over_keys_and_matches_cache():
+    keys, start, Y = build_monthly_matrix(_rows())
+    assert Y.shape == (3, 36)
+    assert np.isnan(Y[keys.index('new'), :30]).all()
+
+    engine = ForecastEngine()
+    fitted, values = engine.fit_forecast(Y, 12, start=start)
+    seasonal = values[keys.index('seasonal')]
+    # December spike is forecast again
+    assert seasonal[11] > seasonal[:11].max() + 400
+    assert np.allclose(values[keys.index('flat')], 500)
+
+    cache = ForecastCache(engine=engine)
+    cache.put_fitted(keys, fitted)
+    for i, key in enumerate(keys):
+        cached = [f['predicted_spending'] for f in cache.forecast(key, 12)['forecast']]
+        assert np.allclose(cached, values[i].round(2))
+
+
+def test_observe_month_updates_state_incrementally():
+    keys, start, Y = build_monthly_matrix(_rows())
+    cache = ForecastCache()
+    cache.put_fitted(keys, cache.engine.fit(Y, start=start))
+    before = cache.forecast('flat', 1)
+    assert cache.observe_month('flat', month_label(2025 * 12), 500)
+    assert not cache.observe_month('flat', month_label(2024 * 12), 900)
+    after = cache.forecast('flat', 1)
+    assert after['forecast'][0]['month'] == '2025-02'
+    assert before['forecast'][0]['month'] == '2025-01'
+
+
+def test_db_rows_keyed_by_user_and_category_and_incremental_update(tmp_path):
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from integration.db.db import Base
+    from integration.db.models import Account, Transaction
+    from services.forecast_engine import category_key, load_spending_rows, refresh_forecasts, update_forecasts
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    acct = Account(user_id=7)
+    db.add(acct)
+    db.commit()
+
+    def add(month, category, amount):
+        db.add(Transaction(account_id=acct.account_id, txn_date=date(2025, month, 5), description_raw='x',
+                           amount=amount, direction='debit', category_final=category))
+        db.commit()
+
+    for m in range(1, 7):
+        add(m, 'Dining', 100)
+        add(m, 'Rent', 1000)
+    # the month in progress (here July) is not a full observation yet
+    add(7, 'Dining', 5)
+    cache = ForecastCache(str(tmp_path / 'cache.json'))
+    assert refresh_forecasts(load_spending_rows(db, until='2025-07'), cache) == 3
+    assert cache.states['7']['last_month'] == month_index('2025-06')
+    assert set(cache.states) == {'7', category_key(7, 'Dining'), category_key(7, 'Rent')}
+    assert np.isclose(cache.forecast(7, 1)['forecast'][0]['predicted_spending'], 1100)
+
+    add(7, 'Dining', 395)
+    assert update_forecasts(load_spending_rows(db, since='2025-07'), cache, through_month='2025-07') == 3
+    dining = cache.forecast(category_key(7, 'Dining'), 1)['forecast'][0]
+    assert dining['month'] == '2025-08' and dining['predicted_spending'] > 100
+    # Rent had no July rows: the month is folded in as zero spend
+    assert cache.states[category_key(7, 'Rent')]['last_month'] == month_index('2025-07')
+    assert ForecastCache.load(str(tmp_path / 'cache.json')).states == cache.states
+
+
+def test_router_serves_refreshed_cache_without_restart(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routers.forecast_router import router
+    from services.forecast_engine import refresh_forecasts
+
+    path = str(tmp_path / 'cache.json')
+    app = FastAPI()
+    app.include_router(router, prefix='/api/v1')
+    app.state.forecast_cache = ForecastCache.load(path)
+    app.state.coordinator = None
+    client = TestClient(app)
+    assert client.post('/api/v1/forecast', json={'user_id': 1, 'months': 1}).status_code == 503
+
+    # the nightly job writes the file from another process
+    nightly = ForecastCache(path)
+    refresh_forecasts([(1, month_label(2024 * 12 + i), 100.0) for i in range(6)], nightly)
+    r = client.post('/api/v1/forecast', json={'user_id': 1, 'months': 1}).json()
+    assert r['source'] == 'cache' and np.isclose(r['forecast'][0]['predicted_spending'], 100.0)
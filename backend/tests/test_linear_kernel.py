@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.predict import LinearKernel, apply_link
+
+TEXTS = ['coffee cafe latte', 'amazon order store', 'electricity power bill', 'uber ride taxi',
+         'cafe coffee bill', 'store order uber', 'power electricity latte', 'taxi amazon cafe']
+
+
+def _fitted(clf, n_classes):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    labels = ['Dining', 'Shopping', 'Utilities', 'Transport'][:n_classes]
+    texts = TEXTS * 4
+    vec = TfidfVectorizer().fit(texts)
+    X = vec.transform(texts)
+    clf.fit(X, [labels[i % n_classes] for i in range(len(texts))])
+    return clf, vec.transform(TEXTS + ['unseen words only', 'coffee'])
+
+
+@pytest.mark.parametrize('make,n_classes', [
+    (lambda: LogisticRegression(max_iter=500), 4),                       # softmax
+    (lambda: LogisticRegression(C=100.0, max_iter=500), 2),              # logistic
+    (lambda: SGDClassifier(loss='log_loss', random_state=0), 3),         # one-vs-rest
+])
+def test_kernel_matches_sklearn(make, n_classes):
+    clf, X = _fitted(make(), n_classes)
+    kernel = LinearKernel.from_estimator(clf)
+    assert kernel.weights.dtype == np.float32 and kernel.weights.flags['C_CONTIGUOUS']
+
+    np.testing.assert_allclose(kernel.predict_proba(X), clf.predict_proba(X), atol=1e-5)
+    np.testing.assert_array_equal(kernel.predict(X), clf.predict(X))
+    labels, probs = kernel.top_k(X[:1], k=2)
+    expected = np.argsort(-clf.predict_proba(X[:1])[0])[:2]
+    assert labels[0].tolist() == clf.classes_[expected].tolist()
+    np.testing.assert_allclose(probs[0], clf.predict_proba(X[:1])[0][expected], atol=1e-5)
+
+
+def test_links_are_stable_for_extreme_scores():
+    scores = np.array([[1000.0, -1000.0, 0.0], [-800.0, -800.0, -799.0]])
+    for link in ('softmax', 'ovr'):
+        p = apply_link(scores.copy(), link)
+        assert np.isfinite(p).all() and np.allclose(p.sum(axis=1), 1.0)
+    assert np.isfinite(apply_link(np.array([[1000.0], [-1000.0]]), 'logistic')).all()
+
+
+def test_wrap_leaves_unsupported_models_alone():
+    from sklearn.naive_bayes import MultinomialNB
+    nb = MultinomialNB()
+    assert LinearKernel.wrap(nb) is nb
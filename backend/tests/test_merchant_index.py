@@ -0,0 +1,138 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from integration.db.db import Base
+from integration.db.models import Account, FeedbackLog, Transaction
+from models.merchant_index import MerchantIndex, load_merchant_rows, normalize_merchant
+from models.predict import ModelPredictor
+
+
+def test_normalize_drops_references_and_rails():
+    assert normalize_merchant('UPI/SWIGGY/412345678@ybl') == 'swiggy'
+    assert normalize_merchant('POS 4411 SWIGGY 12/03') == 'swiggy'
+    assert normalize_merchant('NEFT 99812') == ''
+
+
+def test_build_from_db_with_user_overrides(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    a1, a2 = Account(user_id=1), Account(user_id=2)
+    db.add_all([a1, a2])
+    db.commit()
+    rows = [
+        *[Transaction(account_id=a1.account_id, txn_date=date(2025, 1, 1), description_raw=f'UPI/SWIGGY/{i}', amount=200,
+                      category_pred='Dining', ml_confidence=0.95) for i in range(4)],
+        Transaction(account_id=a1.account_id, txn_date=date(2025, 1, 2), description_raw='LOWCONF MART 1', amount=50,
+                    category_pred='Groceries', ml_confidence=0.4),
+        Transaction(account_id=a2.account_id, txn_date=date(2025, 1, 3), description_raw='AMAZON PAY 77', amount=900,
+                    category_pred='Shopping', ml_confidence=0.7),
+    ]
+    db.add_all(rows)
+    db.commit()
+    db.add(FeedbackLog(transaction_id=rows[-1].transaction_id, predicted_category='Shopping', corrected_category='Bills'))
+    db.commit()
+
+    index = MerchantIndex.build(*load_merchant_rows(db, min_confidence=0.9))
+    assert index.lookup('POS SWIGGY 0001') == ('Dining', 1.0, 'merchant')
+    assert index.lookup('lowconf mart') is None
+    assert index.lookup('AMAZON PAY 12', user_id=2) == ('Bills', 0.99, 'user')
+    # one user's correction stays theirs
+    assert index.lookup('AMAZON PAY 12') is None
+
+    index.add('zepto 55', 'Groceries')
+    index.add('swiggy', 'Groceries', user_id=1)
+    path = str(tmp_path / 'merchant_index.npz')
+    index.save(path)
+    loaded = MerchantIndex.load(path)
+    assert loaded.lookup('ZEPTO/881') == ('Groceries', 0.99, 'merchant')
+    matches = loaded.lookup_many(['swiggy', 'swiggy', 'unknown shop'], [1, 2, None])
+    assert [m and m[:2] for m in matches] == [('Groceries', 0.99), ('Dining', 1.0), None]
+
+
+def test_global_entries_need_several_users():
+    repeated = [(7, 'AMAZON PAY 1', 'Bills')] * 5 + [(None, 'amazon pay', 'Bills')] * 5
+    assert MerchantIndex.build(repeated).lookup('amazon pay') is None
+    agreed = [(u, f'AMAZON PAY {u}', 'Shopping') for u in (1, 2, 3)]
+    assert MerchantIndex.build(agreed).lookup('amazon pay') == ('Shopping', 1.0, 'merchant')
+    # a user's latest correction is their single vote
+    changed = agreed + [(3, 'amazon pay', 'Bills')]
+    assert MerchantIndex.build(changed).lookup('amazon pay') is None
+
+
+def test_feedback_endpoint_learns_per_user(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routers.feedback_router import router
+
+    class Queue:
+        def submit_many(self, items):
+            return list(range(len(items)))
+
+    monkeypatch.chdir(tmp_path)
+    index = MerchantIndex()
+    app = FastAPI()
+    app.include_router(router, prefix='/api/v1')
+    app.state.feedback_queue = Queue()
+    app.state.predictor_obj = type('Predictor', (), {'merchant_index': index})()
+    client = TestClient(app)
+    body = {'transaction_id': '1', 'merchant_name': 'ACME STORE 12', 'predicted_category': 'Shopping',
+            'user_corrected_category': 'Bills', 'confidence_score': 0.4}
+    assert client.post('/api/v1/feedback', json=body).status_code == 200
+    assert index.lookup('acme store') is None
+    assert client.post('/api/v1/feedback', json=dict(body, user_id=5)).status_code == 200
+    assert index.lookup('acme store', user_id=5) == ('Bills', 0.99, 'user')
+    assert index.lookup('acme store') is None and index.lookup('acme store', user_id=6) is None
+
+
+def test_predictor_skips_model_for_known_merchants(tmp_path):
+    index = MerchantIndex.from_entries({'swiggy': ('Dining', 0.97)})
+    predictor = ModelPredictor(compact_dir=str(tmp_path / 'missing'), merchant_index=index)
+
+    class Exploding:
+        classes_ = ['Dining']
+        def transform(self, texts):
+            raise AssertionError('model should not run for a known merchant')
+
+    predictor.vectorizer = predictor.cat_model = Exploding()
+    result = predictor.predict('UPI/SWIGGY/4412', 250.0)
+    assert result['category'] == 'Dining' and result['category_confidence'] == 0.97
+    assert result['category_source'] == 'merchant_index'
+
+    scored = predictor.score_batch(['swiggy 1', 'swiggy 2'])
+    assert scored['category'].tolist() == ['Dining', 'Dining']
+
+
+def test_open_index_follows_nightly_rebuild(tmp_path):
+    path = str(tmp_path / 'merchant_index.npz')
+    index = MerchantIndex.open(path, check_interval=0)
+    assert len(index) == 0 and index.lookup('swiggy') is None
+    MerchantIndex.from_entries({'swiggy': ('Dining', 0.97)}).save(path)
+    assert index.lookup('swiggy') == ('Dining', 0.97, 'merchant')
+    MerchantIndex.from_entries({'swiggy': ('Groceries', 0.95)}).save(path)
+    os.utime(path, (1, 1))
+    assert index.lookup_many(['swiggy 9'])[0] == ('Groceries', 0.95, 'merchant')
+
+
+def test_user_overrides_are_shared_between_workers(tmp_path):
+    path, log = str(tmp_path / 'merchant_index.npz'), str(tmp_path / 'merchant_overrides.jsonl')
+    MerchantIndex.from_entries({'acme store': ('Shopping', 0.95)}).save(path)
+    worker_a = MerchantIndex.open(path, log, check_interval=0)
+    worker_b = MerchantIndex.open(path, log, check_interval=0)
+    assert worker_a.record_override(5, 'ACME STORE 12', 'Bills')
+    assert worker_b.lookup('acme store', user_id=5) == ('Bills', 0.99, 'user')
+    assert worker_b.lookup('acme store', user_id=6) == ('Shopping', 0.95, 'merchant')
+    # survives a restart and the nightly rebuild
+    MerchantIndex.from_entries({'acme store': ('Groceries', 0.95)}).save(path)
+    os.utime(path, (1, 1))
+    assert worker_b.lookup('acme store', user_id=5) == ('Bills', 0.99, 'user')
+    restarted = MerchantIndex.open(path, log)
+    assert restarted.lookup('acme store', user_id=5) == ('Bills', 0.99, 'user')
+    assert restarted.lookup('acme store') == ('Groceries', 0.95, 'merchant')
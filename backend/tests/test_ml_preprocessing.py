@@ -0,0 +1,98 @@
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from ML.data_preprocessing import balance_classes, balance_smote, svd_smote
+
+
+def _data():
+    X = sparse.random(40, 500, density=0.02, random_state=0, format='csr')
+    y = np.array([0] * 30 + [1] * 7 + [2] * 3)
+    return X, y
+
+
+@pytest.mark.parametrize('method,size', [('oversample', 90), ('undersample', 9), ('svd_smote', 90)])
+def test_balancing_stays_sparse(method, size):
+    X, y = _data()
+    X_res, y_res, cw = balance_classes(X, y, method=method)
+    assert sparse.issparse(X_res) and X_res.shape == (size, 500)
+    assert np.unique(y_res, return_counts=True)[1].tolist() == [size // 3] * 3
+    assert cw is None
+
+
+def test_class_weight_keeps_data():
+    X, y = _data()
+    X_res, y_res, cw = balance_classes(X, y, method='class_weight')
+    assert X_res is X and cw == 'balanced'
+
+
+def test_svd_smote_interpolates_between_real_rows():
+    X, y = _data()
+    X_res, y_res = svd_smote(X, y, n_components=5)
+    minority = X[y == 2]
+    allowed = set(minority.indices.tolist())
+    synth = X_res[40:][y_res[40:] == 2]
+    assert set(synth.indices.tolist()) <= allowed
+    assert synth.data.min() >= 0 and synth.data.max() <= minority.data.max()
+
+
+def test_smote_memory_guard_downgrades():
+    X, y = _data()
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        X_res, y_res = balance_smote(X, y, budget_bytes=1024)
+    assert sparse.issparse(X_res)
+    assert any('svd_smote' in str(m.message) for m in w)
+    # within budget: plain SMOTE (needs more than k_neighbors rows per class)
+    X_dense, _ = balance_smote(X, np.array([0] * 28 + [1] * 6 + [2] * 6), budget_bytes=10 ** 9)
+    assert isinstance(X_dense, np.ndarray)
+
+
+def test_augmentation_is_columnwise_and_deterministic(tmp_path):
+    import pandas as pd
+    from ML.data_preprocessing import augment_data, augment_to_csv, augment_texts
+
+    df = pd.DataFrame({'text': ['coffee shop', 'uber ride home', 'x', ''], 'label': [0, 1, 0, 1]})
+    out = augment_data(df, text_col='text', n_augments=3, random_state=7, chunk_size=3)
+    assert len(out) == 4 + 12
+    aug = out.iloc[4:]
+    assert aug['label'].tolist() == [0, 0, 0, 1, 1, 1, 0, 0, 0, 1, 1, 1]
+    # a typo is a permutation of the source characters
+    for src, new in zip(np.repeat(df['text'], 3), aug['text']):
+        assert sorted(src) == sorted(new)
+    # same seed and chunking -> same rows, regardless of n_jobs; streaming writes the same data
+    assert augment_data(df, text_col='text', n_augments=3, random_state=7, chunk_size=3, n_jobs=2).equals(out)
+    path = str(tmp_path / 'aug.csv')
+    assert augment_to_csv(df, path, text_col='text', n_augments=3, random_state=7, chunk_size=3) == 16
+    assert pd.read_csv(path, keep_default_na=False)['text'].tolist() == out['text'].tolist()
+
+    src, texts = augment_texts(['pay the bill'], 2, methods=['synonym'], synonym_map={'bill': ['invoice']}, seed=1)
+    assert src.tolist() == [0, 0] and texts.tolist() == ['pay the invoice'] * 2
+
+
+def test_out_of_core_artifacts_load_in_model_predictor(tmp_path, monkeypatch):
+    from ML.train_out_of_core import train_out_of_core
+    import models.predict as predict_mod
+
+    data = Path(__file__).parent.parent.parent / 'ML' / 'data' / 'training_data.csv'
+    meta = train_out_of_core(str(data), output_dir=str(tmp_path), category_col='category', fraud_col='fraud',
+                             amount_col='amount', chunksize=20, n_features=2 ** 12, use_idf=True, checkpoint_every=2)
+    assert meta['chunks'] == 5 and meta['rows_seen'] == 95
+    assert meta['results']['category']['rows_scored'] == 75
+    assert not (tmp_path / 'artifacts' / 'ooc_checkpoint.pkl').exists()
+
+    models_dir = tmp_path / 'models'
+    monkeypatch.setattr(predict_mod, 'VECT_PATH', str(models_dir / 'vectorizer.pkl'))
+    monkeypatch.setattr(predict_mod, 'MODEL_PATH', str(models_dir / 'cat_model.pkl'))
+    monkeypatch.setattr(predict_mod, 'FRAUD_PATH', str(models_dir / 'fraud_pipeline.pkl'))
+    predictor = predict_mod.ModelPredictor(cascade=predict_mod.Cascade(enabled=False))
+    assert predictor.cat_model is not None and predictor.fraud_pipeline is not None
+    res = predictor.predict('Starbucks Coffee purchase', 450)
+    assert res['top_categories'][0]['category'] in set(predictor.cat_model.classes_)
+    assert 0.0 <= res['fraud_probability'] <= 1.0
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.predict import ModelPredictor, load_compact
+
+CATEGORIES = {'Dining': 'coffee cafe pizza', 'Shopping': 'amazon store order', 'Utilities': 'electricity bill power'}
+
+
+def _export(compact_export):
+    rng = np.random.default_rng(0)
+    noise = [f'ref{i}' for i in range(300)]
+    texts, labels = [], []
+    for _ in range(40):
+        for label, words in CATEGORIES.items():
+            texts.append(' '.join(list(rng.choice(words.split(), 2)) + list(rng.choice(noise, 3))))
+            labels.append(label)
+    df = pd.DataFrame({'text_clean': texts, 'amount': rng.uniform(10, 5000, len(texts)), 'fraud': 0})
+    df['fraud'] = (df['amount'] > 4000).astype(int)
+    compact_export(texts, labels, repeat=1, amounts=df['amount'], fraud=df['fraud'], C=0.5)
+    return texts, labels, df
+
+
+def test_pruned_float32_keeps_scores(tmp_path, compact_export):
+    from ML.compact_models import compact
+    texts, labels, df = _export(compact_export)
+    report = compact(str(tmp_path / 'compact'), str(tmp_path / 'small'), threshold=0.15, dtype='float32',
+                     texts=texts, labels=labels)
+    kept = report['vectorizers']['text']
+    assert kept['kept'] < kept['features'] and report['bytes_after'] < report['bytes_before']
+    ev = report['evaluation']
+    assert ev['agreement'] >= 0.99 and abs(ev['accuracy_delta']) <= 0.01
+
+    original, small = load_compact(str(tmp_path / 'compact')), load_compact(str(tmp_path / 'small'))
+    assert small['cat_model'].coef.dtype == np.float32 and small['cat_model'].coef.shape[0] == kept['kept']
+    # norms still use every term: identical to the original model with the pruned weights zeroed
+    keep = small['vectorizer'].feature_map >= 0
+    W = np.array(original['cat_model'].coef)
+    W[~keep] = 0.0
+    X = original['vectorizer'].transform(texts)
+    expected = original['cat_model']._proba(np.asarray(X @ W) + original['cat_model'].intercept)
+    np.testing.assert_allclose(small['cat_model'].predict_proba(small['vectorizer'].transform(texts)), expected, atol=1e-5)
+
+    frame = df[['text_clean', 'amount']].assign(amount_log=np.log1p(df['amount']))
+    fraud_before = original['fraud_pipeline'].predict_proba(frame).argmax(axis=1)
+    assert np.mean(small['fraud_pipeline'].predict_proba(frame).argmax(axis=1) == fraud_before) >= 0.95
+
+    predictor = ModelPredictor(compact_dir=str(tmp_path / 'small'))
+    assert predictor.artifact_format == 'compact'
+    assert predictor.predict('coffee pizza ref7', 120.0)['category'] == 'Dining'
+
+
+def test_int8_and_dropped_terms(tmp_path, compact_export):
+    from ML.compact_models import compact
+    texts, labels, _ = _export(compact_export)
+    report = compact(str(tmp_path / 'compact'), str(tmp_path / 'int8'), threshold=0.15, dtype='int8',
+                     drop_terms=True, texts=texts, labels=labels)
+    assert report['evaluation']['agreement'] >= 0.95
+    small = load_compact(str(tmp_path / 'int8'))
+    model = small['cat_model']
+    assert model.coef.dtype == np.int8 and model.coef_scale.shape == (3,)
+    assert len(small['vectorizer'].vocab) == report['vectorizers']['text']['kept']
+    assert model.dense_coef().dtype == np.float64
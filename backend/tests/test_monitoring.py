@@ -0,0 +1,115 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from ML.monitoring import PredictionMonitor, build_reference, divergence
+
+CATS = ['Dining', 'Shopping', 'Utilities']
+
+
+def _records(rng, n, probs, hour=0, conf=(0.5, 1.0)):
+    return [{'predicted_category': str(rng.choice(CATS, p=probs)), 'category_confidence': float(rng.uniform(*conf)),
+             'predicted_fraud': int(rng.random() < 0.02), 'fraud_confidence': 0.1,
+             'timestamp': f'2025-11-18T{hour:02d}:{int(rng.integers(60)):02d}:00Z'} for _ in range(n)]
+
+
+def test_streaming_matches_full_scan_and_revisions():
+    rng = np.random.default_rng(0)
+    records = [dict(r, method=str(rng.choice(['rule', 'ml']))) for r in _records(rng, 200, [0.5, 0.3, 0.2])]
+    monitor = PredictionMonitor(keep_buckets=2)
+    for r in records:
+        monitor.observe(r)
+    corrected = dict(records[0], predicted_category='Utilities', category_confidence=0.95, method='user_corrected')
+    monitor.revise(records[0], corrected)
+    records[0] = corrected
+
+    summary = monitor.totals.summary()
+    conf = np.array([r['category_confidence'] for r in records])
+    assert summary['n'] == 200 and np.isclose(summary['avg_confidence'], conf.mean())
+    assert summary['high_confidence'] == int((conf > 0.8).sum())
+    assert summary['categories'] == {c: sum(r['predicted_category'] == c for r in records) for c in CATS}
+    assert summary['sources']['user_corrected'] == 1
+    assert summary['confidence_hist'] == np.histogram(conf, bins=10, range=(0, 1))[0].tolist()
+
+    for hour in (1, 2):
+        monitor.observe(_records(rng, 1, [1, 0, 0], hour=hour)[0])
+    assert [b['start'] for b in monitor.buckets()] == ['2025-11-18T01:00:00Z', '2025-11-18T02:00:00Z']
+    assert monitor.totals.n == 202
+
+
+def test_catch_up_reads_only_new_lines(tmp_path):
+    rng = np.random.default_rng(1)
+    log, state = tmp_path / 'predictions.jsonl', str(tmp_path / 'monitoring.json')
+    lines = [json.dumps(r) for r in _records(rng, 5, [1, 0, 0])]
+    log.write_text('\n'.join(lines[:3]) + '\n' + lines[3][:20])  # last line still being written
+    monitor = PredictionMonitor(state, str(log))
+    assert monitor.catch_up() == 3 and monitor.catch_up() == 0
+    monitor.save()
+
+    with open(log, 'a') as fh:
+        fh.write(lines[3][20:] + '\n' + lines[4] + '\n')
+    reloaded = PredictionMonitor.load(state, str(log))
+    assert reloaded.catch_up() == 2 and reloaded.totals.n == 5
+
+
+def test_drift_against_training_reference():
+    rng = np.random.default_rng(2)
+    train = _records(rng, 2000, [0.5, 0.3, 0.2])
+    reference = build_reference([r['predicted_category'] for r in train], [r['category_confidence'] for r in train],
+                                fraud=[r['predicted_fraud'] for r in train])
+    assert divergence({'a': 5, 'b': 5}, {'a': 0.5, 'b': 0.5})['psi'] < 1e-9
+
+    stable = PredictionMonitor(reference=reference)
+    for r in _records(rng, 500, [0.5, 0.3, 0.2]):
+        stable.observe(r)
+    assert stable.drift()['status'] == 'ok'
+
+    shifted = PredictionMonitor(reference=reference)
+    for r in _records(rng, 500, [0.1, 0.1, 0.8], conf=(0.2, 0.6)):
+        shifted.observe(r)
+    drift = shifted.drift()
+    assert drift['status'] == 'alert'
+    assert {a['metric'] for a in drift['alerts']} == {'categories_psi', 'confidence_psi'}
+    assert PredictionMonitor(reference=reference).drift()['status'] == 'insufficient_data'
+
+
+def test_fraud_rate_counts_only_model_scored_rows():
+    rng = np.random.default_rng(3)
+    train = _records(rng, 1000, [0.5, 0.3, 0.2])
+    reference = build_reference([r['predicted_category'] for r in train], [r['category_confidence'] for r in train],
+                                fraud=[0.2])
+    monitor = PredictionMonitor(reference=reference)
+    served = [dict(r, amount=5000.0, fraud_stage='model', is_fraud=i % 5 == 0, fraud_probability=0.5)
+              for i, r in enumerate(_records(rng, 300, [0.5, 0.3, 0.2]))]
+    # cascade-skipped rows and rows without an amount carry default (not predicted) fraud fields
+    served += [dict(r, amount=100.0, fraud_stage='skipped', is_fraud=False, fraud_probability=0.0)
+               for r in _records(rng, 300, [0.5, 0.3, 0.2])]
+    served += [dict(r, amount=None, is_fraud=False, fraud_probability=0.0) for r in _records(rng, 100, [0.5, 0.3, 0.2])]
+    for r in served:
+        monitor.observe(r)
+    drift = monitor.drift()
+    assert monitor.totals.fraud_n == 300 and np.isclose(drift['fraud_rate']['current'], 0.2)
+    assert 'fraud_rate' not in {a['metric'] for a in drift['alerts']}
+
+
+def test_workers_share_log_and_owner_state(tmp_path):
+    rng = np.random.default_rng(4)
+    log, state = str(tmp_path / 'predictions.jsonl'), str(tmp_path / 'monitoring.json')
+    workers = [PredictionMonitor.load(state, log, read_only=True) for _ in range(2)]
+    workers[0].record(_records(rng, 3, [1, 0, 0]))
+    workers[1].record(_records(rng, 2, [0, 1, 0]))
+    assert [w.sync() for w in workers] == [5, 5] and workers[0].totals.n == workers[1].totals.n == 5
+    workers[0].save()
+    assert not (tmp_path / 'monitoring.json').exists()
+
+    # the cron owner folds the log into the state file; workers pick it up without recounting
+    owner = PredictionMonitor.load(state, log)
+    assert owner.sync() == 5
+    workers[1].record(_records(rng, 1, [0, 0, 1]))
+    for w in workers:
+        w.sync()
+        assert w.totals.n == 6 and w.totals.summary()['categories'] == {'Dining': 3, 'Shopping': 2, 'Utilities': 1}
+    assert PredictionMonitor.load(state, log).totals.n == 5
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agents.risk_agent import RiskAgent
+
+
+def test_score_batch_matches_single_user_path():
+    agent = RiskAgent()
+    users = [
+        [{'type': 'credit', 'amount': 50000}, {'type': 'debit', 'amount': 20000}, {'type': 'debit', 'amount': 5000}],
+        [{'type': 'credit', 'amount': 10000}, {'type': 'debit', 'amount': 11000}],
+        [{'type': 'credit', 'amount': 10000}, {'type': 'debit', 'amount': 9000}, {'type': 'debit', 'amount': 9000}],
+        [{'type': 'debit', 'amount': 100}],
+    ]
+    singles = [agent.predict_cashflow_gap(t) for t in users]
+    # expenses are compared with income over the same period, not averaged
+    assert [s['risk'] for s in singles] == ['low', 'medium', 'high', 'high']
+
+    features = {
+        'income': np.array([[s['total_income']] for s in singles]),
+        'expense': np.array([[s['total_expense']] for s in singles]),
+    }
+    batch = agent.score_batch(features)
+    assert batch['risk'].tolist() == [s['risk'] for s in singles]
+    assert batch['stress_score'].tolist() == [agent.stress_score(s) for s in singles]
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from coordinator.coordinator_engine import CoordinatorEngine
+from coordinator.scenario_simulator import ScenarioSimulator, expand_grid
+
+
+def _predictor(text):
+    t = text.lower()
+    if 'coffee' in t:
+        return 'Dining', 0.9
+    if 'salary' in t:
+        return 'Income', 0.9
+    return 'Shopping', 0.8
+
+
+TXNS = [
+    {'merchant_name': 'Salary', 'category': 'Income', 'amount': 50000, 'type': 'credit', 'date': '2025-01-01'},
+    {'merchant_name': 'Coffee', 'category': 'Dining', 'amount': 450, 'type': 'debit', 'date': '2025-01-03'},
+    {'merchant_name': 'Amazon', 'category': 'Shopping', 'amount': 7500, 'type': 'debit', 'date': '2025-01-09'},
+    {'merchant_name': 'Coffee', 'category': 'Dining', 'amount': 300, 'type': 'debit', 'date': '2025-02-02'},
+    {'merchant_name': 'Amazon', 'category': 'Shopping', 'amount': 2000, 'type': 'debit', 'date': '2025-02-11'},
+]
+
+
+def test_simulate_batch_matches_single_scenarios():
+    sim = ScenarioSimulator(CoordinatorEngine(_predictor))
+    specs = expand_grid('reduce_category', 'percent', [10, 50], {'category': 'Dining'})
+    specs.append({'scenario': 'income_change', 'params': {'delta': -49000}})
+    out = sim.simulate_batch(TXNS, specs)
+
+    singles = [
+        sim.simulate_category_reduction(TXNS, 'Dining', 10),
+        sim.simulate_category_reduction(TXNS, 'Dining', 50),
+        sim.simulate_income_change(TXNS, -49000),
+    ]
+    for row, risk, single in zip(out['outcomes'], out['risk'], singles):
+        res = dict(zip(out['columns'], row))
+        assert abs(res['total_spent'] - single['summary']['total_spent']) < 1e-6
+        assert abs(res['avg_expense'] - single['risk']['avg_expense']) < 1e-6
+        assert abs(res['forecast_spending'] - single['forecast']['forecast'][0]['predicted_spending']) < 1e-6
+        assert risk == single['risk']['risk']
+        assert res['stress_score'] == single['stress_score']
+
+
+def test_simulate_batch_reallocate_moves_category_totals():
+    sim = ScenarioSimulator(CoordinatorEngine(_predictor))
+    out = sim.simulate_batch(TXNS, [{'scenario': 'reallocate', 'params': {'from_cat': 'Shopping', 'to_cat': 'Savings', 'amount': 1000}}])
+    cats = out['categories']
+    row = out['by_category'][0]
+    base = out['baseline_by_category']
+    assert row[cats.index('Shopping')] == base[cats.index('Shopping')] - 1000
+    assert row[cats.index('Savings')] == 1000
+    assert out['outcomes'][0][0] == out['baseline']['total_spent']
+
+
+def test_simulate_batch_treats_missing_amount_as_zero():
+    sim = ScenarioSimulator(CoordinatorEngine(_predictor))
+    specs = [{'scenario': 'reduce_category', 'params': {'category': 'Dining', 'percent': 10}}]
+    with_none = TXNS + [{'merchant_name': 'Coffee', 'amount': None, 'type': 'debit', 'date': '2025-02-05'}]
+    out, base = sim.simulate_batch(with_none, specs), sim.simulate_batch(TXNS, specs)
+    total = out['columns'].index('total_spent')
+    assert out['outcomes'][0][total] == base['outcomes'][0][total]
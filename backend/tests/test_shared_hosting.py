@@ -0,0 +1,95 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.shared_hosting import (SharedModelPredictor, list_versions, prepare_shared_models, prune_versions,
+                                   publish_version, read_current, set_current, version_dir)
+
+
+def test_prepare_publishes_once_and_workers_attach_read_only(tmp_path, model_pickles):
+    pickles, store = model_pickles(['Dining', 'Shopping', 'Bills']), str(tmp_path / 'store')
+
+    v1 = prepare_shared_models(store, str(pickles))
+    assert v1 and read_current(store) == v1
+    # a second parent start reuses the published version
+    assert prepare_shared_models(store, str(pickles)) == v1 and list_versions(store) == [v1]
+
+    worker = SharedModelPredictor(store)
+    assert worker.version == v1
+    coef = worker.cat_model.coef
+    assert isinstance(coef, np.memmap) and not coef.flags.writeable
+    assert worker.predict('latte at the cafe')['top_categories'][0]['category'] == 'Dining'
+
+
+def test_pointer_swap_is_picked_up_and_old_versions_pruned(tmp_path, model_pickles):
+    store = str(tmp_path / 'store')
+    a = model_pickles(['Dining', 'Shopping', 'Bills'], name='a')
+    b = model_pickles(['Food', 'Retail', 'Utilities'], name='b')
+    prepare_shared_models(store, a)
+    worker = SharedModelPredictor(store, check_interval=0.0)
+    v1 = worker.version
+
+    from models.shared_hosting import publish_pickles
+    v2 = publish_pickles(store, b, version='v2')
+    assert read_current(store) == 'v2'
+    assert worker.predict('latte at the cafe')['top_categories'][0]['category'] == 'Food'
+    assert worker.version == 'v2'
+
+    with pytest.raises(FileExistsError):
+        publish_version(store, version_dir(store, v2), version='v2')
+    with pytest.raises(FileNotFoundError):
+        set_current(store, 'missing')
+
+    set_current(store, v1)
+    assert worker.refresh(force=True) and worker.version == v1
+    assert prune_versions(store, keep=1) == ['v2'] and list_versions(store) == [v1]
+
+
+def test_hot_reload_warms_in_background_and_rejects_bad_versions(tmp_path, model_pickles):
+    import time
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routers.predict_router import router
+    from models.shared_hosting import publish_pickles
+
+    store = str(tmp_path / 'store')
+    a = model_pickles(['Dining', 'Shopping', 'Bills'], name='a')
+    b = model_pickles(['Food', 'Retail', 'Utilities'], name='b')
+    v1 = prepare_shared_models(store, a)
+    worker = SharedModelPredictor(store, check_interval=None)
+
+    # publishing alone does not touch a worker without a watcher
+    publish_pickles(store, b, version='v2', metadata={'note': 'retrained'})
+    assert worker.version == v1
+    worker.load(wait=True)
+    assert worker.version == 'v2' and worker.state['canary_ms'] is not None
+
+    # a version whose coefficients do not match its vocabulary fails the canary and is not swapped in
+    bad = version_dir(store, publish_pickles(store, a, version='v3', activate=False))
+    np.save(os.path.join(bad, 'category_coef.npy'), np.zeros((2, 3)))
+    set_current(store, 'v3')
+    worker.load(wait=True)
+    assert worker.version == 'v2' and worker.state['last_error'].startswith('v3')
+
+    app = FastAPI()
+    app.include_router(router, prefix='/api/v1')
+    app.state.predictor = worker
+    client = TestClient(app)
+    worker.start_watching(poll_interval=0.01)
+    try:
+        assert client.post('/api/v1/model/reload', json={'version': v1}).status_code == 200
+        deadline = time.time() + 5
+        while worker.version != v1 and time.time() < deadline:
+            time.sleep(0.01)
+        status = client.get('/api/v1/model/status').json()
+        assert status['model_version'] == v1 and status['registry']['watching']
+        assert status['registry']['available_versions'] == sorted([v1, 'v2', 'v3'])
+        assert client.post('/api/v1/model/reload', json={'version': 'nope'}).status_code == 404
+    finally:
+        worker.stop_watching()
+    assert worker.predict('latte at the cafe')['top_categories'][0]['category'] == 'Dining'
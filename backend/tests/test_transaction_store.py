@@ -0,0 +1,55 @@
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+def _backend(tmp_path, monkeypatch):
+    # the app journals feedback next to the working directory
+    monkeypatch.chdir(tmp_path)
+    import enhanced_backend
+    return importlib.reload(enhanced_backend)
+
+
+def test_store_aggregates_follow_inserts_and_corrections(tmp_path, monkeypatch):
+    store = _backend(tmp_path, monkeypatch).TransactionStore(capacity=2)
+    rows = [store.add({'description': f'txn {i}', 'amount': float(10 * i), 'category': c, 'confidence': 0.5 + 0.1 * (i % 3)})
+            for i, c in enumerate(['Dining', 'Shopping', 'Dining', 'Dining', 'Bills'])]
+    assert len({r['id'] for r in rows}) == 5 and store.get(rows[3]['id']) is rows[3]
+
+    store.update(rows[1]['id'], category='Dining', confidence=0.95)
+    store.update(rows[4]['id'], category='Dining', confidence=0.95)
+    summary = store.category_summary()
+    assert set(summary) == {'Dining'}
+    dining = summary['Dining']
+    assert dining['count'] == 5 and dining['total'] == sum(r['amount'] for r in rows)
+    assert np.isclose(dining['avg_confidence'], np.mean([r['confidence'] for r in rows]))
+    assert len(dining['sample_transactions']) == 3
+    assert store.amounts[:5].tolist() == [r['amount'] for r in rows]
+    assert store.category_names[store.category_codes[1]] == 'Dining'
+    assert [r['id'] for r in store.recent(2)] == [rows[3]['id'], rows[4]['id']]
+
+
+def test_endpoints_read_running_aggregates(tmp_path, monkeypatch):
+    backend = _backend(tmp_path, monkeypatch)
+    client = TestClient(backend.app)
+    csv = 'description,amount,date\nStarbucks coffee,450,2025-01-01\nAmazon order,1200,2025-01-02\nStarbucks coffee,300,2025-01-03\n'
+    uploaded = client.post('/api/v1/upload-transactions', files={'file': ('t.csv', csv, 'text/csv')}).json()['transactions']
+
+    txn = uploaded[1]
+    r = client.post('/api/v1/feedback/correct', json={'transaction_id': txn['id'], 'original_category': txn['category'],
+                                                       'corrected_category': 'Dining', 'confidence': 0.9})
+    assert r.status_code == 200 and r.json()['updated_transaction']['category'] == 'Dining'
+    assert client.post('/api/v1/feedback/correct', json={'transaction_id': 'missing', 'original_category': 'x',
+                                                         'corrected_category': 'y', 'confidence': 0.9}).status_code == 404
+
+    analytics = client.get('/api/v1/analytics/categories').json()
+    assert analytics['total_spent'] == 1950 and analytics['category_count'] == 1
+    assert analytics['categories']['Dining']['count'] == 3
+    performance = client.get('/api/v1/model/performance').json()
+    assert performance['total_predictions'] == 3 and np.isclose(performance['user_correction_rate'], 1 / 3)
+    assert client.get('/api/v1/transactions').json()['total'] == 3
@@ -20,6 +20,22 @@ class GHCIConfig:
     MODELS_DIR: Path = ROOT_DIR / "ML" / "models"
     DATA_DIR: Path = ROOT_DIR / "data"
     LOGS_DIR: Path = ROOT_DIR / "logs"
+    FORECAST_CACHE_PATH: Path = Path(os.getenv("FORECAST_CACHE_PATH", str(DATA_DIR / "forecast_cache.json")))
+    FEEDBACK_JOURNAL_PATH: Path = Path(os.getenv("FEEDBACK_JOURNAL_PATH", str(DATA_DIR / "backend_feedback_journal.jsonl")))
+    BEHAVIOUR_PROFILES_PATH: Path = Path(os.getenv("BEHAVIOUR_PROFILES_PATH", str(DATA_DIR / "behaviour_profiles.npz")))
+    
+    # Prediction monitoring (ML/monitoring.py): streaming aggregates tailing the prediction log
+    PREDICTION_LOG_PATH: Path = Path(os.getenv("PREDICTION_LOG_PATH", str(ROOT_DIR / "ML" / "logs" / "predictions.jsonl")))
+    MONITOR_STATE_PATH: Path = Path(os.getenv("MONITOR_STATE_PATH", str(ROOT_DIR / "ML" / "logs" / "monitoring.json")))
+    MONITOR_REFERENCE_PATH: Path = Path(os.getenv("MONITOR_REFERENCE_PATH", str(ROOT_DIR / "ML" / "logs" / "monitoring_reference.json")))
+    MONITOR_BUCKET_SECONDS: int = int(os.getenv("MONITOR_BUCKET_SECONDS", "3600"))
+    
+    # Model hosting: "local" loads pickles per worker; "shared" attaches every worker
+    # read-only to the memory-mapped store (backend/models/shared_hosting.py)
+    MODEL_HOSTING: str = os.getenv("MODEL_HOSTING", "local")
+    MODEL_STORE_DIR: Path = Path(os.getenv("MODEL_STORE_DIR", str(MODELS_DIR / "store")))
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    MODEL_POLL_INTERVAL: float = float(os.getenv("MODEL_POLL_INTERVAL", "5"))
     
     # ML Settings
     MODEL_VERSION: str = "1.0.0"
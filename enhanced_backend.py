@@ -4,6 +4,7 @@ from pydantic import BaseModel
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, timedelta
 import re
 from typing import List, Dict, Optional
@@ -28,11 +29,143 @@ try:
 except:
     ML_AVAILABLE = False
 
+class TransactionStore:
+    """Transactions indexed by id, with columnar amount/confidence/category arrays and
+    per-category running aggregates kept current on insert and correction.
+
+    Lookups are O(1) and category analytics O(#categories); nothing rescans the rows.
+    """
+
+    SAMPLE_SIZE = 3
+
+    def __init__(self, capacity: int = 1024):
+        self._rows: Dict[str, dict] = {}   # id -> row
+        self._position: Dict[str, int] = {}  # id -> index into the columns
+        self._order: List[str] = []
+        self.amounts = np.zeros(capacity)
+        self.confidences = np.zeros(capacity)
+        self.category_codes = np.zeros(capacity, dtype=np.int32)
+        self.category_names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.category_stats: Dict[str, dict] = {}
+        self.total_spent = 0.0
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def next_id(self) -> str:
+        self._seq += 1
+        return f"TXN_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._seq}"
+
+    def _code(self, category: str) -> int:
+        if category not in self._codes:
+            self._codes[category] = len(self.category_names)
+            self.category_names.append(category)
+        return self._codes[category]
+
+    def _account(self, row: dict, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a row from its category's running aggregates."""
+        category = row.get("category") or "Other"
+        stats = self.category_stats.setdefault(category, {"total": 0.0, "count": 0, "confidence_sum": 0.0, "sample": []})
+        stats["total"] += sign * row["amount"]
+        stats["count"] += sign
+        stats["confidence_sum"] += sign * (row.get("confidence") or 0)
+        if sign > 0 and len(stats["sample"]) < self.SAMPLE_SIZE:
+            stats["sample"].append(row["id"])
+        elif sign < 0 and row["id"] in stats["sample"]:
+            stats["sample"].remove(row["id"])
+        if not stats["count"]:
+            del self.category_stats[category]
+        self.total_spent += sign * row["amount"]
+
+    def _write_columns(self, pos: int, row: dict) -> None:
+        if pos >= len(self.amounts):
+            grow = len(self.amounts)
+            self.amounts = np.concatenate([self.amounts, np.zeros(grow)])
+            self.confidences = np.concatenate([self.confidences, np.zeros(grow)])
+            self.category_codes = np.concatenate([self.category_codes, np.zeros(grow, dtype=np.int32)])
+        self.amounts[pos] = row["amount"]
+        self.confidences[pos] = row.get("confidence") or 0
+        self.category_codes[pos] = self._code(row.get("category") or "Other")
+
+    def add(self, row: dict) -> dict:
+        if not row.get("id"):
+            row["id"] = self.next_id()
+        if row["id"] in self._rows:
+            raise ValueError(f"Duplicate transaction id {row['id']}")
+        self._rows[row["id"]] = row
+        self._position[row["id"]] = len(self._order)
+        self._order.append(row["id"])
+        self._write_columns(self._position[row["id"]], row)
+        self._account(row, 1)
+        return row
+
+    def get(self, transaction_id: str) -> Optional[dict]:
+        return self._rows.get(transaction_id)
+
+    def update(self, transaction_id: str, **fields) -> dict:
+        """Apply a correction (category, confidence, ...) and move the row between category aggregates."""
+        row = self._rows[transaction_id]
+        self._account(row, -1)
+        row.update(fields)
+        self._account(row, 1)
+        self._write_columns(self._position[transaction_id], row)
+        return row
+
+    def recent(self, n: int) -> List[dict]:
+        return [self._rows[i] for i in self._order[-n:]]
+
+    def category_summary(self) -> Dict[str, dict]:
+        return {
+            category: {
+                "total": stats["total"],
+                "count": stats["count"],
+                "avg_confidence": stats["confidence_sum"] / stats["count"],
+                "sample_transactions": [
+                    {"id": i, "description": self._rows[i]["description"], "amount": self._rows[i]["amount"],
+                     "confidence": self._rows[i].get("confidence", 0)}
+                    for i in stats["sample"]
+                ],
+            }
+            for category, stats in self.category_stats.items()
+        }
+
+
 # Data storage
-transactions_db = []
+transactions_db = TransactionStore()
 feedback_log = []
 user_corrections = {}
 
+# Corrections are appended to a journal (one line each) instead of rewriting a JSON file per write
+try:
+    from integration.pipelines.feedback_queue import FeedbackQueue
+    feedback_journal = FeedbackQueue('feedback_log.jsonl')
+except Exception:
+    feedback_journal = None
+
+# Known merchants resolve before any model: the nightly index plus corrections from the journal.
+# This app has a single user; their corrections are overrides for that user, never global entries.
+LOCAL_USER = 'local'
+try:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+    from models.merchant_index import MerchantIndex
+    merchant_index = MerchantIndex.load('merchant_index.npz') if os.path.exists('merchant_index.npz') else MerchantIndex()
+    if os.path.exists('feedback_log.jsonl'):
+        with open('feedback_log.jsonl', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                merchant_index.add(entry.get('description', ''), entry.get('corrected_category'), user_id=LOCAL_USER)
+except Exception:
+    merchant_index = None
+
+# Streaming aggregates over transactions_db (confidence, methods, drift), updated per insert/correction
+from ML.monitoring import PredictionMonitor, load_reference
+prediction_monitor = PredictionMonitor(reference=load_reference(os.path.join('ML', 'logs', 'monitoring_reference.json')))
+
 # Models
 class Transaction(BaseModel):
     id: Optional[str] = None
@@ -59,6 +192,17 @@ class CategoryPrediction(BaseModel):
 def categorize_transaction(description: str, amount: float) -> CategoryPrediction:
     description_lower = description.lower()
     
+    # Known merchant (past correction or consistently confident prediction)
+    if merchant_index is not None:
+        match = merchant_index.lookup(description, user_id=LOCAL_USER)
+        if match is not None:
+            return CategoryPrediction(
+                category=match[0],
+                confidence=match[1],
+                reasoning="Known merchant",
+                method="merchant_index"
+            )
+    
     # Try ML model first
     if ML_AVAILABLE:
         try:
@@ -144,12 +288,21 @@ async def upload_transactions(file: UploadFile = File(...)):
         if not all(col in df.columns for col in required_cols):
             raise HTTPException(status_code=400, detail=f"CSV must have columns: {required_cols}")
         
+        # Statements repeat narrations: categorize each distinct one once. Rules and the
+        # merchant index only read the text; the ML features also use the exact amount.
+        from models.predict import clean_text, dedupe_batch
+        descriptions = df['description'].astype(str).tolist()
+        amounts = df['amount'].astype(float).tolist()
+        first, inverse = dedupe_batch([clean_text(d) for d in descriptions] if not ML_AVAILABLE else descriptions,
+                                      *([amounts] if ML_AVAILABLE else []))
+        predictions = [categorize_transaction(descriptions[i], amounts[i]) for i in first]
+        
         processed_transactions = []
-        for _, row in df.iterrows():
-            prediction = categorize_transaction(row['description'], float(row['amount']))
+        for (_, row), group in zip(df.iterrows(), inverse):
+            prediction = predictions[group]
             
             transaction = {
-                "id": f"TXN_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(transactions_db)}",
+                "id": transactions_db.next_id(),
                 "description": row['description'],
                 "amount": float(row['amount']),
                 "date": row['date'],
@@ -160,7 +313,8 @@ async def upload_transactions(file: UploadFile = File(...)):
                 "timestamp": datetime.now().isoformat()
             }
             
-            transactions_db.append(transaction)
+            transactions_db.add(transaction)
+            prediction_monitor.observe(transaction)
             processed_transactions.append(transaction)
         
         return {
@@ -177,7 +331,7 @@ async def submit_feedback(correction: FeedbackCorrection):
     """Submit user correction for ML learning"""
     
     # Find the transaction
-    transaction = next((t for t in transactions_db if t["id"] == correction.transaction_id), None)
+    transaction = transactions_db.get(correction.transaction_id)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
@@ -195,18 +349,25 @@ async def submit_feedback(correction: FeedbackCorrection):
     
     feedback_log.append(feedback_entry)
     user_corrections[correction.transaction_id] = correction.corrected_category
+    if merchant_index is not None:
+        merchant_index.add(transaction["description"], correction.corrected_category, user_id=LOCAL_USER)
     
     # Update transaction
-    transaction["category"] = correction.corrected_category
-    transaction["confidence"] = 0.95
-    transaction["method"] = "user_corrected"
-    transaction["reasoning"] = "User correction applied"
+    before = dict(transaction)
+    transactions_db.update(
+        correction.transaction_id,
+        category=correction.corrected_category,
+        confidence=0.95,
+        method="user_corrected",
+        reasoning="User correction applied",
+    )
+    prediction_monitor.revise(before, transaction)
     
-    # Save feedback to file for future ML training
+    # Save feedback for future ML training (append-only, O(1) per correction)
     try:
-        with open('feedback_log.json', 'w') as f:
-            json.dump(feedback_log, f, indent=2)
-    except:
+        if feedback_journal is not None:
+            feedback_journal.submit_many([feedback_entry])
+    except Exception:
         pass
     
     return {
@@ -219,7 +380,7 @@ async def submit_feedback(correction: FeedbackCorrection):
 async def get_transactions():
     """Get all transactions with predictions"""
     return {
-        "transactions": transactions_db[-50:],  # Last 50 transactions
+        "transactions": transactions_db.recent(50),  # Last 50 transactions
         "total": len(transactions_db),
         "ml_available": ML_AVAILABLE,
         "corrections_count": len(feedback_log)
@@ -228,65 +389,31 @@ async def get_transactions():
 @app.get("/api/v1/analytics/confidence")
 async def get_confidence_analytics():
     """Get confidence score analytics"""
-    if not transactions_db:
+    totals = prediction_monitor.totals
+    if not totals.n:
         return {"message": "No transactions available"}
     
-    confidences = [t.get("confidence", 0) for t in transactions_db]
-    methods = {}
-    for t in transactions_db:
-        method = t.get("method", "unknown")
-        methods[method] = methods.get(method, 0) + 1
-    
+    summary = totals.summary()
     return {
-        "avg_confidence": sum(confidences) / len(confidences),
-        "high_confidence": len([c for c in confidences if c > 0.8]),
-        "low_confidence": len([c for c in confidences if c < 0.5]),
-        "methods_used": methods,
-        "total_transactions": len(transactions_db)
+        "avg_confidence": summary["avg_confidence"],
+        "high_confidence": summary["high_confidence"],
+        "low_confidence": summary["low_confidence"],
+        "methods_used": summary["sources"],
+        "confidence_histogram": summary["confidence_hist"],
+        "total_transactions": totals.n
     }
 
 @app.get("/api/v1/analytics/categories")
 async def get_category_analytics():
     """Get category-wise spending analytics"""
-    if not transactions_db:
+    if not len(transactions_db):
         return {"categories": {}, "total_spent": 0}
     
-    categories = {}
-    total_spent = 0
-    
-    for transaction in transactions_db:
-        category = transaction.get("category", "Other")
-        amount = transaction.get("amount", 0)
-        
-        if category not in categories:
-            categories[category] = {
-                "total": 0,
-                "count": 0,
-                "avg_confidence": 0,
-                "transactions": []
-            }
-        
-        categories[category]["total"] += amount
-        categories[category]["count"] += 1
-        categories[category]["transactions"].append({
-            "id": transaction["id"],
-            "description": transaction["description"],
-            "amount": amount,
-            "confidence": transaction.get("confidence", 0)
-        })
-        total_spent += amount
-    
-    # Calculate average confidence per category
-    for category in categories:
-        confidences = [t["confidence"] for t in categories[category]["transactions"]]
-        categories[category]["avg_confidence"] = sum(confidences) / len(confidences)
-        # Keep only summary, not all transactions
-        categories[category]["sample_transactions"] = categories[category]["transactions"][:3]
-        del categories[category]["transactions"]
-    
+    # running per-category aggregates: O(#categories)
+    categories = transactions_db.category_summary()
     return {
         "categories": categories,
-        "total_spent": total_spent,
+        "total_spent": transactions_db.total_spent,
         "category_count": len(categories)
     }
 
@@ -313,12 +440,13 @@ async def predict_category(request: Request):
 @app.get("/api/v1/model/performance")
 async def get_model_performance():
     """Get model performance metrics"""
-    if not transactions_db:
+    totals = prediction_monitor.totals
+    if not totals.n:
         return {"message": "No data available"}
     
-    total = len(transactions_db)
-    high_conf = len([t for t in transactions_db if t.get("confidence", 0) > 0.8])
-    user_corrected = len([t for t in transactions_db if t.get("method") == "user_corrected"])
+    total = totals.n
+    high_conf = totals.high_confidence
+    user_corrected = totals.sources.get("user_corrected", 0)
     
     return {
         "total_predictions": total,
@@ -329,6 +457,11 @@ async def get_model_performance():
         "accuracy_estimate": (high_conf + user_corrected) / total if total > 0 else 0
     }
 
+@app.get("/api/v1/monitoring/summary")
+async def get_monitoring_summary(buckets: int = 24):
+    """Time-bucketed prediction aggregates and drift against the training reference"""
+    return prediction_monitor.report(buckets)
+
 @app.get("/api/v1/status")
 async def get_status():
     return {
@@ -1,23 +1,29 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from typing import List
+
+from fastapi import APIRouter
 
-from integration.api.deps import get_db_dep
 from integration.api.schemas.feedback_schema import FeedbackIn
-from integration.pipelines.transaction_processor import save_feedback
+from integration.pipelines.feedback_queue import get_feedback_queue
 
 router = APIRouter()
 
 
 @router.post("/integration/feedback")
-def post_feedback(item: FeedbackIn, db: Session = Depends(get_db_dep)):
-    save_feedback(
-        db,
+def post_feedback(item: FeedbackIn):
+    # journaled now, written to feedback_logs by the batched flusher
+    seq = get_feedback_queue().submit(
         transaction_id=item.transaction_id,
         predicted_category=item.predicted_category,
         corrected_category=item.corrected_category,
         confidence_score=item.confidence_score,
         feedback_source="user_manual",
     )
-    return {"status": "recorded"}
+    return {"status": "recorded", "seq": seq}
+
+
+@router.post("/integration/feedback/bulk")
+def post_feedback_bulk(items: List[FeedbackIn]):
+    seqs = get_feedback_queue().submit_many([dict(it.dict(), feedback_source="user_manual") for it in items])
+    return {"status": "recorded", "count": len(seqs)}
@@ -6,8 +6,9 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from integration.api.deps import get_db_dep
-from integration.pipelines.transaction_processor import fetch_unclassified_transactions, fetch_recent_transactions
-from integration.pipelines.ml_payload_builder import build_ml_payload
+from integration.pipelines.transaction_processor import fetch_recent_transactions
+from integration.pipelines.ml_payload_builder import fetch_ml_payload
+from integration.pipelines.anomaly_detector import StreamingAnomalyDetector
 from integration.api.schemas.transaction_schema import MLItem, ApplyMLItem, TransactionOut
 from integration.db.models import Transaction
 
@@ -15,14 +16,14 @@ router = APIRouter()
 
 
 @router.get("/integration/transactions/unclassified", response_model=List[MLItem])
-def get_unclassified(limit: int = 500, db: Session = Depends(get_db_dep)):
-    txns = fetch_unclassified_transactions(db, limit=limit)
-    payload = build_ml_payload(txns)
-    return payload
+def get_unclassified(limit: int = 500, after_id: int = 0, db: Session = Depends(get_db_dep)):
+    # page through the backlog by passing the last transaction_id back as after_id
+    return fetch_ml_payload(db, limit=limit, after_id=after_id)
 
 
 @router.post("/integration/transactions/apply-ml")
 def apply_ml(items: List[ApplyMLItem], db: Session = Depends(get_db_dep)):
+    detector = StreamingAnomalyDetector(db)
     for it in items:
         txn = db.get(Transaction, it.transaction_id)
         if not txn:
@@ -31,6 +32,9 @@ def apply_ml(items: List[ApplyMLItem], db: Session = Depends(get_db_dep)):
         txn.ml_confidence = it.confidence
         if not txn.category_final:
             txn.category_final = it.predicted_category
+            # first category for this row: score it against (and fold it into) the category's stats
+            flagged, _ = detector.observe_category(txn.account.user_id, txn.amount, txn.category_final)
+            txn.is_anomaly = bool(txn.is_anomaly) or flagged
     db.commit()
     return {"updated": len(items)}
 
@@ -11,6 +11,9 @@ class Settings:
     )
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./data/uploads")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    FEEDBACK_JOURNAL_PATH: str = os.getenv("FEEDBACK_JOURNAL_PATH", "./data/feedback_journal.jsonl")
+    FEEDBACK_BATCH_SIZE: int = int(os.getenv("FEEDBACK_BATCH_SIZE", "500"))
+    FEEDBACK_FLUSH_INTERVAL: float = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "2"))
 
 
 def get_settings() -> Settings:
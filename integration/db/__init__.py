@@ -1,6 +1,6 @@
 """DB package for integration layer."""
 
 from .db import engine, SessionLocal, Base, get_db
-from .models import Account, Transaction, Portfolio, FeedbackLog
+from .models import Account, Transaction, Portfolio, FeedbackLog, AnomalyStat, RiskDailyTotal
 
-__all__ = ["engine", "SessionLocal", "Base", "get_db", "Account", "Transaction", "Portfolio", "FeedbackLog"]
+__all__ = ["engine", "SessionLocal", "Base", "get_db", "Account", "Transaction", "Portfolio", "FeedbackLog", "AnomalyStat", "RiskDailyTotal"]
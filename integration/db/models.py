@@ -8,6 +8,7 @@ from sqlalchemy import (
     Column,
     Date,
     DateTime,
+    Float,
     ForeignKey,
     Integer,
     Numeric,
@@ -81,3 +82,32 @@ class FeedbackLog(Base):
     created_at = Column(DateTime, server_default=func.now())
 
     transaction = relationship("Transaction", back_populates="feedbacks")
+
+
+class AnomalyStat(Base):
+    """Running amount statistics per user and key, used for streaming anomaly flags."""
+
+    __tablename__ = "anomaly_stats"
+    __table_args__ = (UniqueConstraint("user_id", "stat_key", name="uq_user_stat_key"),)
+
+    stat_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    stat_key = Column(String(120), nullable=False)
+    count = Column(Float, nullable=False, default=0.0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class RiskDailyTotal(Base):
+    """Per-user daily income/expense totals backing the rolling risk feature windows."""
+
+    __tablename__ = "risk_daily_totals"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_user_day"),)
+
+    total_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    day = Column(Date, nullable=False)
+    income = Column(Float, nullable=False, default=0.0)
+    expense = Column(Float, nullable=False, default=0.0)
+    debit_count = Column(Integer, nullable=False, default=0)
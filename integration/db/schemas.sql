@@ -46,3 +46,24 @@ CREATE TABLE IF NOT EXISTS feedback_logs (
     feedback_source VARCHAR(50),
     created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
 );
+
+CREATE TABLE IF NOT EXISTS anomaly_stats (
+    stat_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    stat_key VARCHAR(120) NOT NULL,
+    count DOUBLE PRECISION NOT NULL DEFAULT 0,
+    mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+    UNIQUE (user_id, stat_key)
+);
+
+CREATE TABLE IF NOT EXISTS risk_daily_totals (
+    total_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    income DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense DOUBLE PRECISION NOT NULL DEFAULT 0,
+    debit_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (user_id, day)
+);
@@ -3,12 +3,14 @@ from __future__ import annotations
 import logging
 import re
 from decimal import Decimal
-from typing import IO
+from typing import IO, Optional
 
 from sqlalchemy.orm import Session
 
-from integration.db.models import Transaction
+from integration.db.models import Account, Transaction
 from integration.ingestion.csv_parser import parse_csv
+from integration.pipelines.anomaly_detector import StreamingAnomalyDetector
+from integration.pipelines.risk_features import RiskFeatureRecorder
 
 logger = logging.getLogger(__name__)
 
@@ -27,16 +29,41 @@ def classify_direction(amount: Decimal) -> str:
     return "credit" if amount > 0 else "debit"
 
 
-def ingest_csv_to_db(db: Session, file_obj: IO, account_id: int, source_type: str = "csv") -> int:
+def ingest_csv_to_db(
+    db: Session,
+    file_obj: IO,
+    account_id: int,
+    source_type: str = "csv",
+    detector: Optional[StreamingAnomalyDetector] = None,
+    risk_recorder: Optional[RiskFeatureRecorder] = None,
+) -> int:
     """Parse CSV, clean and insert into fact_transactions.
 
+    ``is_anomaly`` is set per row from the owner's running statistics (see
+    StreamingAnomalyDetector); pass a detector to tune thresholds or share it across calls.
+    Categories are not known yet, so rows are scored per direction here; the per-category
+    statistics are updated when apply-ml assigns them.
+    Daily income/expense totals for the rolling risk features are updated in the same
+    transaction (see RiskFeatureRecorder).
+
     Returns number of inserted records.
     """
     rows = parse_csv(file_obj, account_id)
+    account = db.get(Account, account_id)
+    user_id = account.user_id if account else None
+    if detector is None and user_id is not None:
+        detector = StreamingAnomalyDetector(db)
+    if risk_recorder is None and user_id is not None:
+        risk_recorder = RiskFeatureRecorder(db)
     inserted = 0
     for r in rows:
         desc_clean = clean_description(r.get("description_raw", ""))
         direction = classify_direction(r.get("amount", Decimal("0.00")))
+        is_anomaly = False
+        if detector is not None and user_id is not None:
+            is_anomaly, _ = detector.observe(user_id, r["amount"], direction=direction)
+        if risk_recorder is not None and user_id is not None:
+            risk_recorder.observe(user_id, r["txn_date"], r["amount"])
 
         txn = Transaction(
             account_id=r["account_id"],
@@ -47,10 +74,13 @@ def ingest_csv_to_db(db: Session, file_obj: IO, account_id: int, source_type: st
             currency=r.get("currency", "INR"),
             direction=direction,
             source_type=source_type,
+            is_anomaly=is_anomaly,
         )
         db.add(txn)
         inserted += 1
 
+    if risk_recorder is not None:
+        risk_recorder.flush()
     db.commit()
     logger.info("Inserted %d transactions for account %s", inserted, account_id)
     return inserted
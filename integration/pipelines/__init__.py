@@ -5,13 +5,27 @@ from .transaction_processor import (
     fetch_unclassified_transactions,
     save_feedback,
 )
-from .ml_payload_builder import build_ml_payload
+from .ml_payload_builder import build_ml_payload, build_payload_arrays, fetch_ml_payload, iter_ml_payload
 from .portfolio_aggregator import recompute_monthly_portfolio
+from .anomaly_detector import StreamingAnomalyDetector
+from .feedback_queue import FeedbackQueue, get_feedback_queue, write_feedback_batch
+from .risk_features import RiskFeatureRecorder, compute_risk_features, iter_daily_matrices, load_daily_matrix
 
 __all__ = [
     "fetch_recent_transactions",
     "fetch_unclassified_transactions",
     "build_ml_payload",
+    "build_payload_arrays",
+    "fetch_ml_payload",
+    "iter_ml_payload",
     "recompute_monthly_portfolio",
     "save_feedback",
+    "FeedbackQueue",
+    "get_feedback_queue",
+    "write_feedback_batch",
+    "StreamingAnomalyDetector",
+    "RiskFeatureRecorder",
+    "compute_risk_features",
+    "iter_daily_matrices",
+    "load_daily_matrix",
 ]
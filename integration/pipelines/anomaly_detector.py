@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from integration.db.models import AnomalyStat
+
+USER_KEY = "user:*"
+
+
+def update_running_stats(stat: AnomalyStat, x: float, decay: Optional[float] = None) -> None:
+    """Fold one observation into (count, mean, m2) in O(1).
+
+    Plain Welford when ``decay`` is None. With ``decay`` in (0, 1) older observations
+    are down-weighted exponentially, so the statistics follow drifting spending levels
+    (the effective count then saturates at ``1 / decay``).
+    """
+    count = stat.count or 0.0
+    mean = stat.mean or 0.0
+    m2 = stat.m2 or 0.0
+    if decay:
+        count *= 1.0 - decay
+        m2 *= 1.0 - decay
+    count += 1.0
+    delta = x - mean
+    mean += delta / count
+    m2 += delta * (x - mean)
+    stat.count, stat.mean, stat.m2 = count, mean, m2
+
+
+def running_zscore(stat: AnomalyStat, x: float) -> float:
+    if not stat.count:
+        return 0.0
+    std = math.sqrt(max(stat.m2, 0.0) / stat.count)
+    if std == 0:
+        return 0.0
+    return (x - stat.mean) / std
+
+
+class StreamingAnomalyDetector:
+    """Flags unusual amounts as they are ingested, using persisted running statistics.
+
+    Statistics are kept per user (``user:*``) and per user + category, falling back to the
+    transaction direction while the category is still unknown. Ingestion runs before
+    categorization, so it scores against ``user:*`` / ``dir:*``; the ``cat:*`` statistics are
+    built by ``observe_category`` when a transaction first gets a category (apply-ml, or a
+    correction of a not yet categorized row). Each observation is scored against the history
+    seen so far and then folded into it, so nothing is recomputed over the full history.
+    State lives in ``anomaly_stats`` and is committed with the caller's session.
+    """
+
+    def __init__(self, db: Session, z_threshold: float = 3.0, min_count: int = 10, decay: Optional[float] = None):
+        self.db = db
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.decay = decay
+        self._stats: Dict[Tuple[int, str], AnomalyStat] = {}
+        self._loaded_users: Set[int] = set()
+
+    def _load_user(self, user_id: int) -> None:
+        rows = self.db.execute(select(AnomalyStat).where(AnomalyStat.user_id == user_id)).scalars().all()
+        for r in rows:
+            self._stats[(user_id, r.stat_key)] = r
+        self._loaded_users.add(user_id)
+
+    def _get(self, user_id: int, key: str) -> AnomalyStat:
+        if user_id not in self._loaded_users:
+            self._load_user(user_id)
+        stat = self._stats.get((user_id, key))
+        if stat is None:
+            stat = AnomalyStat(user_id=user_id, stat_key=key, count=0.0, mean=0.0, m2=0.0)
+            self.db.add(stat)
+            self._stats[(user_id, key)] = stat
+        return stat
+
+    def observe(self, user_id: int, amount, category: Optional[str] = None, direction: Optional[str] = None) -> Tuple[bool, float]:
+        """Score ``amount`` against the user's history, then update it. Returns (is_anomaly, z)."""
+        x = abs(float(amount))
+        keys = [USER_KEY, f"cat:{category}" if category else f"dir:{direction or 'unknown'}"]
+        stats = [self._get(user_id, k) for k in keys]
+
+        # prefer the most specific key that has enough history
+        z = 0.0
+        for stat in reversed(stats):
+            if (stat.count or 0.0) >= self.min_count:
+                z = running_zscore(stat, x)
+                break
+        for stat in stats:
+            update_running_stats(stat, x, self.decay)
+        return abs(z) > self.z_threshold, z
+
+    def observe_category(self, user_id: int, amount, category: str) -> Tuple[bool, float]:
+        """Score an already ingested amount against its category's history, then update it.
+
+        Only the ``cat:{category}`` statistics are touched; ``user:*`` counted the amount at ingestion.
+        """
+        stat = self._get(user_id, f"cat:{category}")
+        x = abs(float(amount))
+        z = running_zscore(stat, x) if (stat.count or 0.0) >= self.min_count else 0.0
+        update_running_stats(stat, x, self.decay)
+        return abs(z) > self.z_threshold, z
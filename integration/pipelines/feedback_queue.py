@@ -0,0 +1,319 @@
+"""Write-behind feedback ingestion.
+
+Corrections are accepted immediately: each one is appended to a local JSON-lines
+journal (durable before ``submit`` returns) and queued in memory. A background thread
+flushes the queue in batches, when ``max_batch`` items are waiting or every
+``flush_interval`` seconds. A batch is one multi-row INSERT into feedback_logs plus one
+executemany UPDATE of category_final, instead of a get + commit per item.
+
+After a batch commits, its last sequence number is written to ``<journal>.committed``.
+On startup, journal lines past that mark are queued again, so nothing accepted is lost
+on a crash. Delivery is at-least-once: a crash between the DB commit and the mark
+replays that batch. Once everything is committed, the journal is truncated.
+
+A journal has one writer. When several worker processes share a journal path, each
+queue is given a ``worker_id`` (the gateway uses its pid) and writes its own segment,
+``<journal>.<worker_id>``, holding an exclusive lock on it while open. On startup a
+queue also adopts the uncommitted lines of segments whose worker is gone (their lock is
+free), re-journals them in its own segment and removes the old one.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, select
+
+from integration.db.models import FeedbackLog, Transaction
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): segments of other workers are left alone
+    fcntl = None
+
+FlushFn = Callable[[List[Dict[str, Any]]], Any]
+
+
+def write_feedback_batch(db, items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Insert a batch of corrections and set category_final (last correction wins).
+
+    Items for unknown transactions are skipped, so one bad id cannot fail the batch.
+    """
+    ids = {int(it["transaction_id"]) for it in items}
+    existing = set(db.execute(select(Transaction.transaction_id).where(Transaction.transaction_id.in_(ids))).scalars())
+    rows = [it for it in items if int(it["transaction_id"]) in existing]
+    if rows:
+        db.execute(insert(FeedbackLog), [
+            {
+                "transaction_id": int(it["transaction_id"]),
+                "predicted_category": it.get("predicted_category"),
+                "corrected_category": it["corrected_category"],
+                "confidence_score": it.get("confidence_score"),
+                "feedback_source": it.get("feedback_source", "user_manual"),
+            }
+            for it in rows
+        ])
+        final = {int(it["transaction_id"]): it["corrected_category"] for it in rows}
+        table = Transaction.__table__
+        db.execute(
+            table.update().where(table.c.transaction_id == bindparam("tid")).values(category_final=bindparam("category")),
+            [{"tid": tid, "category": cat} for tid, cat in final.items()],
+        )
+    db.commit()
+    return {"inserted": len(rows), "skipped": len(items) - len(rows)}
+
+
+def session_writer(session_factory) -> FlushFn:
+    """Flush function writing each batch through a fresh session from ``session_factory``."""
+    def flush(items):
+        db = session_factory()
+        try:
+            return write_feedback_batch(db, items)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    return flush
+
+
+class FeedbackQueue:
+    def __init__(
+        self,
+        journal_path: str,
+        flush_fn: Optional[FlushFn] = None,
+        max_batch: int = 500,
+        flush_interval: float = 2.0,
+        fsync: bool = True,
+        worker_id: Optional[str] = None,
+    ):
+        self.base_path = journal_path
+        self.journal_path = journal_path if worker_id is None else f"{journal_path}.{worker_id}"
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.stats = {"accepted": 0, "flushed": 0, "batches": 0, "errors": 0, "last_error": None}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if worker_id is not None and not _try_lock(self._journal):
+            self._journal.close()
+            raise RuntimeError(f"Feedback journal {self.journal_path} is in use by another process")
+        self._committed = _read_committed(self._committed_path)
+        self._seq = self._committed
+        self._recover()
+        if worker_id is not None:
+            self._adopt_orphans()
+
+    # -- journal -------------------------------------------------------------
+    @property
+    def _committed_path(self) -> str:
+        return self.journal_path + ".committed"
+
+    def _write_committed(self, seq: int) -> None:
+        tmp = self._committed_path + ".tmp"
+        with open(tmp, "w") as fh:
+            fh.write(str(seq))
+        os.replace(tmp, self._committed_path)
+        self._committed = seq
+
+    def _recover(self) -> None:
+        items, last = _read_uncommitted(self.journal_path, self._committed)
+        self._seq = max(self._seq, last)
+        self._pending.extend(items)
+
+    def _adopt_orphans(self) -> None:
+        """Move uncommitted lines of dead workers' segments into this worker's segment."""
+        if fcntl is None:
+            return
+        for path in sorted(glob.glob(glob.escape(self.base_path) + ".*")):
+            if path == self.journal_path or path.endswith((".committed", ".tmp")):
+                continue
+            with open(path, "a+", encoding="utf-8") as fh:
+                if not _try_lock(fh):
+                    continue  # its worker is still running
+                items, _ = _read_uncommitted(path, _read_committed(path + ".committed"))
+                if items:
+                    self._append([{k: v for k, v in it.items() if k != "seq"} for it in items], queue=True)
+                # empty it before unlinking, so a worker that opened the same file meanwhile finds nothing
+                fh.truncate(0)
+                for stale in (path, path + ".committed"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+
+    def _truncate_journal(self) -> None:
+        # in place, so the lock held on this file descriptor stays
+        self._journal.flush()
+        self._journal.truncate(0)
+
+    # -- public API ----------------------------------------------------------
+    def submit(self, transaction_id, corrected_category: str, predicted_category: Optional[str] = None,
+               confidence_score: Optional[float] = None, feedback_source: str = "user_manual", **extra) -> int:
+        """Journal one correction and queue it; returns its sequence number."""
+        return self.submit_many([{
+            "transaction_id": transaction_id,
+            "predicted_category": predicted_category,
+            "corrected_category": corrected_category,
+            "confidence_score": confidence_score,
+            "feedback_source": feedback_source,
+            **extra,
+        }])[-1]
+
+    def submit_many(self, items: List[Dict[str, Any]]) -> List[int]:
+        """Journal a batch of corrections with a single write (and fsync)."""
+        records = self._append(items, queue=self.flush_fn is not None)
+        with self._lock:
+            self.stats["accepted"] += len(records)
+        if len(self._pending) >= self.max_batch:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+        return [r["seq"] for r in records]
+
+    def _append(self, items: List[Dict[str, Any]], queue: bool) -> List[Dict[str, Any]]:
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock:
+            records = []
+            for it in items:
+                self._seq += 1
+                records.append({"seq": self._seq, "received_at": now, **it})
+            self._journal.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            if queue:
+                self._pending.extend(records)
+        return records
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything queued so far, ``max_batch`` items per DB batch. Returns items written."""
+        if self.flush_fn is None:
+            return 0
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[: self.max_batch]
+                if not batch:
+                    break
+                try:
+                    self.flush_fn(batch)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    self.stats["last_error"] = str(e)
+                    break
+                with self._lock:
+                    del self._pending[: len(batch)]
+                    self._write_committed(batch[-1]["seq"])
+                    if not self._pending:
+                        self._truncate_journal()
+                self.stats["batches"] += 1
+                self.stats["flushed"] += len(batch)
+                written += len(batch)
+        return written
+
+    def start(self) -> "FeedbackQueue":
+        """Flush in a daemon thread on the timer or when a batch fills up."""
+        if self._thread is None and self.flush_fn is not None:
+            self._stop.clear()
+
+            def run():
+                while not self._stop.is_set():
+                    self._wake.wait(self.flush_interval)
+                    self._wake.clear()
+                    self.flush()
+
+            self._thread = threading.Thread(target=run, name="feedback-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the flusher and write what is still queued (the journal keeps anything that fails)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+        self._journal.close()
+
+
+def _try_lock(fh) -> bool:
+    """Non-blocking exclusive lock on an open file; released when the file is closed."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _read_committed(path: str) -> int:
+    try:
+        with open(path) as fh:
+            return int(fh.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _read_uncommitted(path: str, committed: int):
+    """Journal lines of ``path`` past ``committed``, and the highest seq seen."""
+    items, last = [], committed
+    if not os.path.exists(path):
+        return items, last
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash mid-write
+            last = max(last, item["seq"])
+            if item["seq"] > committed:
+                items.append(item)
+    return items, last
+
+
+_default_queue: Optional[FeedbackQueue] = None
+_default_lock = threading.Lock()
+
+
+def get_feedback_queue() -> FeedbackQueue:
+    """Process-wide queue writing to the integration DB (journal path from Settings)."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            from integration.config.settings import get_settings
+            from integration.db.db import SessionLocal
+
+            settings = get_settings()
+            _default_queue = FeedbackQueue(
+                settings.FEEDBACK_JOURNAL_PATH,
+                session_writer(SessionLocal),
+                max_batch=settings.FEEDBACK_BATCH_SIZE,
+                flush_interval=settings.FEEDBACK_FLUSH_INTERVAL,
+                worker_id=str(os.getpid()),
+            ).start()
+        return _default_queue
+
+
+def close_feedback_queue() -> None:
+    global _default_queue
+    with _default_lock:
+        if _default_queue is not None:
+            _default_queue.close()
+            _default_queue = None
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
 
 from integration.db.models import Transaction
 
@@ -19,3 +23,61 @@ def build_ml_payload(transactions: List[Transaction]) -> List[dict]:
         )
         payload.append({"transaction_id": t.transaction_id, "text": text})
     return payload
+
+
+def build_payload_arrays(rows: Sequence[tuple]) -> Dict[str, np.ndarray]:
+    """Model-ready arrays from (id, description, amount, direction) tuples.
+
+    ``text`` is formatted exactly like build_ml_payload (amounts are Numeric(14, 2), so
+    two decimals reproduce ``str(Decimal)``).
+    """
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    amounts = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+    descriptions = np.array([r[1] or "" for r in rows], dtype=object)
+    directions = np.array([r[3] or "" for r in rows], dtype=object)
+    text = np.array([f"{d} {a:.2f} {s}" for d, a, s in zip(descriptions, amounts, directions)], dtype=object)
+    return {"transaction_id": ids, "description": descriptions, "amount": amounts, "direction": directions, "text": text}
+
+
+def iter_ml_payload(
+    db: Session,
+    after_id: int = 0,
+    chunk_size: int = 5000,
+    limit: Optional[int] = None,
+    unclassified_only: bool = True,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream payload chunks in transaction_id order, starting after ``after_id``.
+
+    Only the four needed columns are selected (no ORM entities), through a streaming
+    cursor fetched ``chunk_size`` rows at a time. Resume from the last
+    ``transaction_id`` of the previous chunk to walk the whole backlog.
+    """
+    stmt = (
+        select(
+            Transaction.transaction_id,
+            # same precedence as build_ml_payload: an empty cleaned description falls back to raw
+            func.coalesce(func.nullif(Transaction.description_clean, ""), Transaction.description_raw, ""),
+            cast(Transaction.amount, Float),
+            Transaction.direction,
+        )
+        .where(Transaction.transaction_id > after_id)
+        .order_by(Transaction.transaction_id)
+    )
+    if unclassified_only:
+        stmt = stmt.where(Transaction.category_pred.is_(None))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": chunk_size})
+    try:
+        for rows in result.partitions(chunk_size):
+            yield build_payload_arrays(rows)
+    finally:
+        result.close()
+
+
+def fetch_ml_payload(db: Session, limit: int = 500, after_id: int = 0) -> List[dict]:
+    """[{transaction_id, text}] for the next ``limit`` unclassified rows after ``after_id``."""
+    payload: List[dict] = []
+    for chunk in iter_ml_payload(db, after_id=after_id, chunk_size=max(limit, 1), limit=limit):
+        payload.extend({"transaction_id": int(i), "text": t} for i, t in zip(chunk["transaction_id"], chunk["text"]))
+    return payload
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from integration.db.models import RiskDailyTotal
+
+WINDOWS = (30, 60, 90)
+
+
+class RiskFeatureRecorder:
+    """Folds ingested transactions into ``risk_daily_totals``.
+
+    Amounts are accumulated in memory per (user, day) and written with one lookup per
+    ingestion call in :meth:`flush`, so the rolling windows never have to be rebuilt
+    from fact_transactions.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._pending: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+
+    def observe(self, user_id: int, day: date, amount) -> None:
+        x = float(amount)
+        acc = self._pending[(user_id, day)]
+        if x > 0:
+            acc[0] += x
+        else:
+            acc[1] += -x
+            acc[2] += 1
+
+    def flush(self) -> int:
+        """Add pending totals to the table; the caller commits. Returns rows touched."""
+        if not self._pending:
+            return 0
+        keys = list(self._pending)
+        existing = {
+            (r.user_id, r.day): r
+            for r in self.db.execute(
+                select(RiskDailyTotal).where(tuple_(RiskDailyTotal.user_id, RiskDailyTotal.day).in_(keys))
+            ).scalars()
+        }
+        for key, (income, expense, debits) in self._pending.items():
+            row = existing.get(key)
+            if row is None:
+                row = RiskDailyTotal(user_id=key[0], day=key[1], income=0.0, expense=0.0, debit_count=0)
+                self.db.add(row)
+            row.income += income
+            row.expense += expense
+            row.debit_count += debits
+        self._pending.clear()
+        return len(keys)
+
+
+def _dense(rows, user_ids: np.ndarray, first: date, horizon: int):
+    income = np.zeros((len(user_ids), horizon))
+    expense = np.zeros((len(user_ids), horizon))
+    debits = np.zeros((len(user_ids), horizon))
+    if rows:
+        u = np.searchsorted(user_ids, np.array([r[0] for r in rows], dtype=np.int64))
+        d = np.array([(r[1] - first).days for r in rows])
+        income[u, d] = [r[2] for r in rows]
+        expense[u, d] = [r[3] for r in rows]
+        debits[u, d] = [r[4] for r in rows]
+    return income, expense, debits
+
+
+def iter_daily_matrices(db: Session, as_of: date, horizon: int = max(WINDOWS), chunk_size: int = 10000):
+    """Dense (users x horizon) income/expense/debit-count matrices ending at ``as_of``, one
+    user-id range at a time.
+
+    Yields ``(user_ids, income, expense, debits)`` for at most ``chunk_size`` users, in
+    user_id order, so memory is bounded by the chunk rather than the customer base.
+    Column ``j`` is day ``as_of - horizon + 1 + j``. Only the last ``horizon`` days are read.
+    """
+    first = as_of - timedelta(days=horizon - 1)
+    in_window = (RiskDailyTotal.day >= first, RiskDailyTotal.day <= as_of)
+    after = None
+    while True:
+        ids = select(RiskDailyTotal.user_id).where(*in_window).distinct().order_by(RiskDailyTotal.user_id).limit(chunk_size)
+        if after is not None:
+            ids = ids.where(RiskDailyTotal.user_id > after)
+        user_ids = np.array(db.execute(ids).scalars().all(), dtype=np.int64)
+        if not len(user_ids):
+            return
+        rows = db.execute(
+            select(RiskDailyTotal.user_id, RiskDailyTotal.day, RiskDailyTotal.income, RiskDailyTotal.expense, RiskDailyTotal.debit_count)
+            .where(*in_window, RiskDailyTotal.user_id.between(int(user_ids[0]), int(user_ids[-1])))
+        ).all()
+        yield (user_ids, *_dense(rows, user_ids, first, horizon))
+        if len(user_ids) < chunk_size:
+            return
+        after = int(user_ids[-1])
+
+
+def load_daily_matrix(db: Session, as_of: date, horizon: int = max(WINDOWS)):
+    """All users' matrices from ``iter_daily_matrices`` in one piece (small populations only)."""
+    chunks = list(iter_daily_matrices(db, as_of, horizon))
+    if not chunks:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, horizon)), np.zeros((0, horizon)), np.zeros((0, horizon))
+    return tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+
+def compute_risk_features(income: np.ndarray, expense: np.ndarray, debits: Optional[np.ndarray] = None, windows=WINDOWS) -> Dict[str, np.ndarray]:
+    """Rolling features for every user at once; each array is (users x len(windows)).
+
+    Matrices are ordered oldest -> newest day, so window ``w`` is the last ``w`` columns.
+    ``volatility`` is the standard deviation of daily net flow within the window.
+    """
+    n = income.shape[0]
+    k = len(windows)
+    out = {name: np.zeros((n, k)) for name in ('income', 'expense', 'ratio', 'volatility', 'avg_expense')}
+    net = income - expense
+    for j, w in enumerate(windows):
+        inc = income[:, -w:].sum(axis=1)
+        exp = expense[:, -w:].sum(axis=1)
+        out['income'][:, j] = inc
+        out['expense'][:, j] = exp
+        out['ratio'][:, j] = np.divide(exp, inc, out=np.full(n, np.inf), where=inc > 0)
+        out['ratio'][(inc == 0) & (exp == 0), j] = 0.0
+        out['volatility'][:, j] = net[:, -w:].std(axis=1)
+        if debits is not None:
+            cnt = debits[:, -w:].sum(axis=1)
+            out['avg_expense'][:, j] = np.divide(exp, cnt, out=np.zeros(n), where=cnt > 0)
+    return out
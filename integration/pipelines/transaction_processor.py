@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 from integration.db.models import Account, Transaction, FeedbackLog
+from integration.pipelines.anomaly_detector import StreamingAnomalyDetector
 
 
 def fetch_recent_transactions(db: Session, user_id: int, limit: int = 100) -> List[Transaction]:
@@ -43,6 +44,10 @@ def save_feedback(
 
     txn = db.get(Transaction, transaction_id)
     if txn:
+        if not txn.category_final and corrected_category:
+            # corrected before apply-ml categorized it: this is the row's first category
+            flagged, _ = StreamingAnomalyDetector(db).observe_category(txn.account.user_id, txn.amount, corrected_category)
+            txn.is_anomaly = bool(txn.is_anomaly) or flagged
         txn.category_final = corrected_category
 
     db.commit()
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from integration.db.db import Base
+from integration.db.models import Account, AnomalyStat, Transaction
+from integration.ingestion.ingestion_service import ingest_csv_to_db
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _setup_in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_ingestion_flags_anomalies_from_running_stats():
+    db = _setup_in_memory_db()
+    acct = Account(user_id=1, account_name="Test", account_type="savings")
+    db.add(acct)
+    db.commit()
+    db.refresh(acct)
+
+    normal = "".join(f"2025-01-{d:02d},coffee,-{200 + d}\n" for d in range(1, 21))
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n" + normal), acct.account_id)
+    # state survives across calls: a later upload is scored against the persisted history
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n2025-01-25,tv,-90000\n2025-01-26,coffee,-215\n"), acct.account_id)
+
+    flagged = db.query(Transaction).filter(Transaction.is_anomaly.is_(True)).all()
+    assert [t.description_raw for t in flagged] == ["tv"]
+    stat = db.query(AnomalyStat).filter_by(user_id=1, stat_key="dir:debit").one()
+    assert stat.count == 22
+
+
+def test_apply_ml_builds_category_stats_and_flags():
+    from integration.api.endpoints.transaction_routes import apply_ml
+    from integration.api.schemas.transaction_schema import ApplyMLItem
+
+    db = _setup_in_memory_db()
+    acct = Account(user_id=1, account_name="Test", account_type="savings")
+    db.add(acct)
+    db.commit()
+    db.refresh(acct)
+
+    # coffee is cheap, rent is large: neither stands out by direction, but 5000 is odd for coffee
+    days = range(1, 16)
+    rows = "".join(f"2025-01-{d:02d},coffee,-{200 + d}\n2025-01-{d:02d},rent,-{5000 + d}\n" for d in days)
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n" + rows + "2025-01-20,coffee,-5000\n"), acct.account_id)
+    assert not db.query(Transaction).filter(Transaction.is_anomaly.is_(True)).count()
+
+    txns = db.query(Transaction).order_by(Transaction.transaction_id).all()
+    categories = {"coffee": "Dining", "rent": "Rent"}
+    apply_ml([ApplyMLItem(transaction_id=t.transaction_id, predicted_category=categories[t.description_raw], confidence=0.9)
+              for t in txns], db)
+
+    flagged = db.query(Transaction).filter(Transaction.is_anomaly.is_(True)).all()
+    assert [(t.description_raw, t.txn_date.day) for t in flagged] == [("coffee", 20)]
+    stat = db.query(AnomalyStat).filter_by(user_id=1, stat_key="cat:Dining").one()
+    assert stat.count == 16
+    # re-applying does not count the rows twice
+    apply_ml([ApplyMLItem(transaction_id=txns[0].transaction_id, predicted_category="Dining", confidence=0.9)], db)
+    assert db.query(AnomalyStat).filter_by(user_id=1, stat_key="cat:Dining").one().count == 16
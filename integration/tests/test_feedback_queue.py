@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from integration.db.db import Base
+from integration.db.models import Account, FeedbackLog, Transaction
+from integration.pipelines.feedback_queue import FeedbackQueue, session_writer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _setup_file_db(tmp_path, n=3):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fb.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    acct = Account(user_id=1, account_name="Test", account_type="savings")
+    db.add(acct)
+    db.commit()
+    db.add_all([
+        Transaction(account_id=acct.account_id, txn_date=date(2025, 1, 10), description_raw=f"pay {i}", amount=Decimal("100"))
+        for i in range(n)
+    ])
+    db.commit()
+    return Session, db
+
+
+def test_queue_batches_writes_and_skips_unknown_transactions(tmp_path):
+    Session, db = _setup_file_db(tmp_path)
+    batches = []
+    writer = session_writer(Session)
+    queue = FeedbackQueue(str(tmp_path / "journal.jsonl"), lambda items: batches.append(len(items)) or writer(items), max_batch=3)
+
+    queue.submit(1, "Dining", predicted_category="Other", confidence_score=0.4)
+    queue.submit(2, "Rent")
+    assert queue.pending() == 2 and db.query(FeedbackLog).count() == 0
+    # the third correction fills the batch and flushes it (no flusher thread started)
+    queue.submit_many([{"transaction_id": 1, "corrected_category": "Groceries"}])
+    assert batches == [3] and queue.pending() == 0
+    queue.submit(999, "Ghost")
+    queue.close()
+
+    db.expire_all()
+    assert db.query(FeedbackLog).count() == 3
+    assert db.get(Transaction, 1).category_final == "Groceries"
+    assert db.get(Transaction, 2).category_final == "Rent"
+    assert os.path.getsize(tmp_path / "journal.jsonl") == 0
+
+
+def test_journal_replays_uncommitted_items_after_a_crash(tmp_path):
+    Session, db = _setup_file_db(tmp_path)
+    journal = str(tmp_path / "journal.jsonl")
+
+    def broken(items):
+        raise RuntimeError("db down")
+
+    q1 = FeedbackQueue(journal, broken, max_batch=2)
+    q1.submit(1, "Dining")
+    q1.submit(2, "Rent")
+    assert q1.stats["errors"] == 1 and q1.pending() == 2
+    # process dies without close(); a new queue picks the items up from the journal
+    q2 = FeedbackQueue(journal, session_writer(Session), flush_interval=0.02).start()
+    assert q2.pending() == 2
+    deadline = time.time() + 5
+    while q2.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    assert q2.submit(3, "Travel") == 3
+    q2.close()
+
+    db.expire_all()
+    assert [r.corrected_category for r in db.query(FeedbackLog).order_by(FeedbackLog.feedback_id)] == ["Dining", "Rent", "Travel"]
+    assert FeedbackQueue(journal, session_writer(Session)).pending() == 0
+
+
+def test_worker_segments_keep_each_workers_corrections(tmp_path):
+    Session, db = _setup_file_db(tmp_path)
+    journal = str(tmp_path / "journal.jsonl")
+
+    def broken(items):
+        raise RuntimeError("db down")
+
+    a = FeedbackQueue(journal, session_writer(Session), worker_id="a")
+    b = FeedbackQueue(journal, broken, max_batch=1, worker_id="b")
+    assert a.submit(1, "Dining") == 1 and b.submit(2, "Rent") == 1
+    # a flush in one worker truncates only its own segment
+    assert a.flush() == 1
+    assert os.path.getsize(journal + ".a") == 0 and b.pending() == 1
+    with pytest.raises(RuntimeError):
+        FeedbackQueue(journal, broken, worker_id="b")
+
+    # b dies with its correction unflushed; the next worker to start adopts it
+    b._journal.close()
+    c = FeedbackQueue(journal, session_writer(Session), worker_id="c")
+    assert c.pending() == 1 and not os.path.exists(journal + ".b")
+    assert c.flush() == 1
+    a.close()
+    c.close()
+
+    db.expire_all()
+    assert db.get(Transaction, 1).category_final == "Dining"
+    assert db.get(Transaction, 2).category_final == "Rent"
+    assert FeedbackQueue(journal, session_writer(Session), worker_id="d").pending() == 0
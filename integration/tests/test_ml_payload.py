@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+from integration.db.db import Base
+from integration.db.models import Account, Transaction
+from integration.pipelines.ml_payload_builder import build_ml_payload, fetch_ml_payload, iter_ml_payload
+from integration.pipelines.transaction_processor import fetch_unclassified_transactions
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _setup_in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_projection_payload_matches_orm_payload_and_pages_by_id():
+    db = _setup_in_memory_db()
+    acct = Account(user_id=1, account_name="Main", account_type="savings")
+    db.add(acct)
+    db.commit()
+    rows = [
+        ("STARBUCKS #12", "starbucks", Decimal("450"), "debit", None),
+        ("SALARY JAN", None, Decimal("50000.5"), "credit", None),
+        ("UPI/123", "", Decimal("-12.34"), None, None),
+        ("RENT", "rent", Decimal("20000"), "debit", "Housing"),
+        ("AMAZON", "amazon", Decimal("999.99"), "debit", None),
+    ]
+    db.add_all([
+        Transaction(account_id=acct.account_id, txn_date=date(2025, 1, i + 1), description_raw=raw,
+                    description_clean=clean, amount=amt, direction=d, category_pred=cat)
+        for i, (raw, clean, amt, d, cat) in enumerate(rows)
+    ])
+    db.commit()
+
+    expected = build_ml_payload(fetch_unclassified_transactions(db))
+    assert fetch_ml_payload(db, limit=500) == expected
+    assert [p["transaction_id"] for p in expected] == [1, 2, 3, 5]
+
+    # walk the backlog two rows at a time with the after_id cursor
+    first = fetch_ml_payload(db, limit=2)
+    second = fetch_ml_payload(db, limit=2, after_id=first[-1]["transaction_id"])
+    assert first + second == expected
+    assert fetch_ml_payload(db, limit=2, after_id=5) == []
+
+    chunks = list(iter_ml_payload(db, chunk_size=3, unclassified_only=False))
+    assert [len(c["transaction_id"]) for c in chunks] == [3, 2]
+    assert chunks[0]["description"].tolist() == ["starbucks", "SALARY JAN", "UPI/123"]
+    assert chunks[1]["amount"].tolist() == [20000.0, 999.99]
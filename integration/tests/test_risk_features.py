@@ -0,0 +1,62 @@
+from datetime import date
+from io import StringIO
+
+import numpy as np
+
+from integration.db.db import Base
+from integration.db.models import Account, RiskDailyTotal
+from integration.ingestion.ingestion_service import ingest_csv_to_db
+from integration.pipelines.risk_features import compute_risk_features, iter_daily_matrices, load_daily_matrix
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _setup_in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_ingestion_maintains_rolling_risk_windows():
+    db = _setup_in_memory_db()
+    a1 = Account(user_id=1, account_name="Saver", account_type="savings")
+    a2 = Account(user_id=2, account_name="Spender", account_type="savings")
+    db.add_all([a1, a2])
+    db.commit()
+
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n2025-01-01,salary,50000\n2025-01-10,rent,-20000\n"), a1.account_id)
+    # same day again in a later upload is added to the existing daily row
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n2025-01-10,grocery,-5000\n2025-03-25,grocery,-3000\n"), a1.account_id)
+    ingest_csv_to_db(db, StringIO("Date,Description,Amount\n2025-03-05,salary,10000\n2025-03-20,tv,-15000\n"), a2.account_id)
+
+    row = db.query(RiskDailyTotal).filter_by(user_id=1, day=date(2025, 1, 10)).one()
+    assert row.expense == 25000 and row.debit_count == 2
+
+    user_ids, income, expense, debits = load_daily_matrix(db, date(2025, 3, 31))
+    assert user_ids.tolist() == [1, 2]
+    f = compute_risk_features(income, expense, debits)
+    # windows are 30/60/90 days; January falls only in the 90-day window
+    assert f["income"][0].tolist() == [0.0, 0.0, 50000.0]
+    assert f["expense"][0].tolist() == [3000.0, 3000.0, 28000.0]
+    assert np.isinf(f["ratio"][0, 0])
+    assert abs(f["ratio"][0, 2] - 0.56) < 1e-9
+    assert f["ratio"][1].tolist() == [1.5, 1.5, 1.5]
+    assert f["avg_expense"][0, 2] == 28000 / 3
+    assert f["volatility"][1, 0] > 0
+
+
+def test_daily_matrices_stream_by_user_range():
+    db = _setup_in_memory_db()
+    db.add_all([RiskDailyTotal(user_id=u, day=date(2025, 3, d), income=100.0 * u, expense=10.0 * d, debit_count=1)
+                for u in (3, 1, 7, 5, 9) for d in (1, 15)])
+    db.add(RiskDailyTotal(user_id=4, day=date(2024, 1, 1), income=1.0, expense=1.0, debit_count=1))
+    db.commit()
+
+    chunks = list(iter_daily_matrices(db, date(2025, 3, 31), chunk_size=2))
+    assert [c[0].tolist() for c in chunks] == [[1, 3], [5, 7], [9]]
+    whole = load_daily_matrix(db, date(2025, 3, 31))
+    assert whole[0].tolist() == [1, 3, 5, 7, 9]
+    for streamed, full in zip(zip(*chunks), whole):
+        assert np.array_equal(np.concatenate(streamed), full)
+    assert whole[1].sum(axis=1).tolist() == [200.0, 600.0, 1000.0, 1400.0, 1800.0]